@@ -0,0 +1,130 @@
+"""
+IN THIS PYTHON FILE WE COMPARE THE STREAMING ATTACHMENT INJECTOR (SEE 'src/html_rewrite.py') WITH THE OLD
+BEAUTIFULSOUP REWRITE, WHICH PARSED THE WHOLE TRANSCRIPT INTO A TREE AND SEARCHED IT ONCE PER MESSAGE WITH ATTACHMENTS.
+
+THE SCRIPT BUILDS TRANSCRIPTS OF 1K, 10K AND 50K MESSAGES WITH THE SAME MARKUP AS CHAT_EXPORTER (ONE MESSAGE OUT OF
+'ATTACHMENT_EVERY' HAS AN ATTACHMENT), TIMES BOTH REWRITES AND CHECKS THAT THEY PRODUCE THE SAME DOCUMENT.
+IT FAILS (EXIT CODE 1) IF THE TWO RESULTS ARE DIFFERENT. THE REWRITE OF A REAL CHAT_EXPORTER DOCUMENT IS CHECKED BY THE
+'modify_transcript' SCENARIO OF THE BENCHMARK SUITE (SEE 'benchmarks/suite/scenarios.py').
+
+THE BEAUTIFULSOUP REWRITE GROWS WITH MESSAGES x DOCUMENT: IT ALREADY TAKES MINUTES ON 10K MESSAGES, SO BY DEFAULT IT IS ONLY
+RUN UP TO 10K MESSAGES; USE '--soup-limit 50000' FOR THE FULL COMPARISON (EXPECT IT TO RUN FOR AN HOUR OR MORE).
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/html_rewrite.py [--soup-limit 50000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from html_rewrite import inject_attachments # The streaming rewrite used by the bot
+
+SIZES = (1_000, 10_000, 50_000) # Number of messages in the transcript for each round
+ATTACHMENT_EVERY = 20 # One message out of ATTACHMENT_EVERY has an attachment
+SOUP_LIMIT = 10_000 # Default maximum number of messages for the BeautifulSoup rewrite
+
+MESSAGE = """<div class="chatlog__message-group">
+    <div id="chatlog__message-container-{id}" class="chatlog__message-container" data-message-id="{id}">
+        <div class="chatlog__message">
+            <div class="chatlog__message-aside">
+                <img class="chatlog__avatar" src="https://cdn.discordapp.com/embed/avatars/0.png"  data-user-id="1" />
+            </div>
+            <div class="chatlog__message-primary">
+                <div class="chatlog__header">
+                    <span class="chatlog__author-name" title="user#0001" data-user-id="1">user</span>
+                    <span class="chatlog__timestamp" data-timestamp="01-01-2024 12:00">01-01-2024 12:00</span>
+                </div>
+                <div class="chatlog__content chatlog__markdown" data-message-id="{id}" id="message-{id}">
+                    <span class="chatlog__markdown-preserve">Message number {id} &lt;div&gt; with some text</span>
+                    {attachments}
+                </div>
+            </div>
+        </div>
+    </div>
+</div>
+"""
+
+def build_transcript(size):
+    """
+    RETURNS A TRANSCRIPT OF 'size' MESSAGES (UTF-8 BYTES) AND ITS ATTACHMENTS MARKUP (LIKE 'attachment_markup').
+    HALF OF THE MESSAGES WITH AN ATTACHMENT ALREADY HAVE A 'chatlog__attachments' DIV; THE OTHER HALF HAVE THE ATTACHMENT
+    BLOCK OF CHAT_EXPORTER ('<div class=chatlog__attachment>', UNQUOTED), WHICH MUST NOT BE TAKEN FOR IT.
+    """
+    parts = ["<html><body><div class=\"chatlog\">"]
+    markup = {}
+    for i in range(size):
+        message_id = 10**18 + i
+        attachments = ""
+        if i % ATTACHMENT_EVERY == 0:
+            markup[str(message_id)] = f'<img src="attachments/{i:064x}.png" alt="file{i}.png" style="max-width:100%;"/>'
+            if i % (ATTACHMENT_EVERY * 2) == 0:
+                attachments = '<div class="chatlog__attachments"></div>'
+            else:
+                attachments = f'<div class=chatlog__attachment><a href="https://cdn.discordapp.com/attachments/1/{i}/file{i}.png"><img class=chatlog__attachment-media src="https://cdn.discordapp.com/attachments/1/{i}/file{i}.png" alt="Image attachment" loading="lazy"></a></div>'
+        parts.append(MESSAGE.format(id=message_id, attachments=attachments))
+    parts.append("</div></body></html>")
+    return "".join(parts).encode("utf-8"), markup
+
+def inject_attachments_soup(transcript, markup):
+    """
+    THE OLD REWRITE: A BEAUTIFULSOUP TREE OF THE WHOLE DOCUMENT AND ONE 'find' PER MESSAGE WITH ATTACHMENTS.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(transcript, 'html.parser')
+
+    for message_id, attachments_html in markup.items():
+        message_div = soup.find('div', {'data-message-id': message_id})
+        if not message_div:
+            continue
+
+        attachments_div = message_div.find('div', class_='chatlog__attachments')
+        if not attachments_div:
+            attachments_div = soup.new_tag('div', attrs={'class': 'chatlog__attachments'})
+            message_div.append(attachments_div)
+
+        attachments_div.append(BeautifulSoup(attachments_html, 'html.parser'))
+
+    return str(soup).encode("utf-8")
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming vs BeautifulSoup attachment injection")
+    parser.add_argument("--soup-limit", type=int, default=SOUP_LIMIT, help="largest transcript (in messages) rewritten with BeautifulSoup")
+    args = parser.parse_args()
+
+    try:
+        import bs4 # noqa: F401
+    except ImportError:
+        print("bs4 is not installed: only the streaming rewrite is timed")
+        args.soup_limit = 0
+
+    failed = False
+    print(f"{'messages':>10}{'size':>12}{'attachments':>13}{'streaming':>12}{'beautifulsoup':>15}{'speedup':>10}")
+    for size in SIZES:
+        transcript, markup = build_transcript(size)
+        streamed, stream_time = timed(inject_attachments, transcript, markup)
+        line = f"{size:>10,}{len(transcript) / 1024 / 1024:>10.1f}MB{len(markup):>13,}{stream_time:>11.3f}s"
+
+        if size <= args.soup_limit:
+            from bs4 import BeautifulSoup
+            souped, soup_time = timed(inject_attachments_soup, transcript, markup)
+            line += f"{soup_time:>14.3f}s{soup_time / stream_time:>9.0f}x"
+            # BeautifulSoup re-serializes the document, so we compare both results after the same normalization
+            if str(BeautifulSoup(streamed, 'html.parser')).encode("utf-8") != souped:
+                print(f"[FAIL] the two rewrites are different for {size:,} messages")
+                failed = True
+        else:
+            line += f"{'skipped':>15}{'-':>10}"
+        print(line)
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+IN THIS PYTHON FILE WE COMPARE THE MEMORY AND THE STARTUP TIME OF THE GATEWAY PROFILES OF THE BOT (SEE 'src/gateway.py').
+
+THE SCRIPT BUILDS A REAL DISCORD.PY CONNECTION STATE FOR EVERY PROFILE AND FEEDS IT WHAT THE GATEWAY SENDS AT STARTUP FOR
+A LARGE SERVER WITH 'MEMBERS' MEMBERS ('ONLINE' OF THEM ONLINE): THE GUILD_CREATE EVENT AND, IF THE PROFILE CHUNKS THE
+GUILDS AT STARTUP, ALL THE MEMBERS IN CHUNKS OF 1000 (WITH THEIR PRESENCES IF THE PROFILE HAS THE 'presences' INTENT),
+PROCESSED LIKE DISCORD.PY DOES. NOTHING IS SENT ON THE NETWORK, SO THE TIME DOES NOT INCLUDE THE DOWNLOAD OF THE CHUNKS
+(ON A REAL SERVER DISCORD SENDS THEM SLOWLY: THE REAL STARTUP IS MUCH LONGER).
+
+THE PROFILES:
+- all:    'discord.Intents.all()', THE DEFAULT MEMBER CACHE AND THE CHUNKING AT STARTUP (THE OLD SETTINGS OF THE BOT).
+- config: THE SETTINGS IN 'src/config.py' ('bot_intents', 'member_cache', 'chunk_guilds_at_startup').
+
+IT FAILS (EXIT CODE 1) IF THE 'config' PROFILE KEEPS MORE MEMORY THAN THE 'all' PROFILE.
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/member_cache.py [--members 100000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import discord
+from discord.state import ChunkRequest
+from gateway import bot_options
+
+MEMBERS = 100_000 # Members of the fake server
+ONLINE = 0.2 # Fraction of the members that are online (they have a presence)
+CHUNK_SIZE = 1000 # Members per GUILD_MEMBERS_CHUNK event (the size used by Discord)
+GUILD_ID, BOT_ID = 1000, 5000
+
+def profiles():
+    return {
+        "all": {"intents": discord.Intents.all(), "member_cache_flags": discord.MemberCacheFlags.from_intents(discord.Intents.all()), "chunk_guilds_at_startup": True},
+        "config": bot_options(),
+    }
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None, "global_name": f"User {user_id}"}
+
+def member_payload(user_id):
+    return {"user": user_payload(user_id), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+def presence_payload(user_id):
+    return {"user": {"id": str(user_id)}, "status": "online", "activities": [{"name": "a game", "type": 0}], "client_status": {"desktop": "online"}}
+
+def start(options, members):
+    """
+    RUNS THE STARTUP OF ONE PROFILE AND RETURNS THE CLIENT (TO KEEP ITS CACHE ALIVE) AND THE NUMBER OF CACHED MEMBERS.
+    """
+    client = discord.Client(**options)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+
+    # GUILD_CREATE OF A LARGE SERVER: THE CHANNELS, THE ROLES AND ONLY THE BOT AMONG THE MEMBERS
+    guild = state._add_guild_from_data({
+        "id": str(GUILD_ID), "name": "Benchmark", "owner_id": "1", "member_count": members, "large": True, "features": [], "emojis": [], "stickers": [],
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [{"id": str(GUILD_ID + 1 + i), "type": 0, "name": f"channel-{i}", "position": i, "permission_overwrites": []} for i in range(200)],
+        "members": [member_payload(BOT_ID)], "voice_states": [], "presences": [], "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+    })
+
+    if options["chunk_guilds_at_startup"]:
+        # THE SAME CHUNK REQUEST REGISTERED BY 'ConnectionState.chunk_guild' (WITHOUT SENDING IT ON THE GATEWAY)
+        request = ChunkRequest(GUILD_ID, 0, None, state._get_guild, cache=state.member_cache_flags.joined)
+        state._chunk_requests[request.nonce] = request
+        presences = options["intents"].presences
+        online_every = int(1 / ONLINE)
+        for first in range(0, members, CHUNK_SIZE):
+            ids = range(10**6 + first, 10**6 + min(first + CHUNK_SIZE, members))
+            state.parse_guild_members_chunk({
+                "guild_id": str(GUILD_ID), "nonce": request.nonce, "members": [member_payload(user_id) for user_id in ids],
+                "presences": [presence_payload(user_id) for user_id in ids if presences and user_id % online_every == 0],
+                "chunk_index": first // CHUNK_SIZE, "chunk_count": -(-members // CHUNK_SIZE),
+            })
+
+    return client, len(guild.members)
+
+def run(members):
+    results = {}
+    for name, options in profiles().items():
+        gc.collect()
+        begin = time.perf_counter()
+        client, cached = start(options, members)
+        elapsed = time.perf_counter() - begin
+        del client
+        gc.collect()
+
+        tracemalloc.start()
+        client, cached = start(options, members)
+        gc.collect()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del client
+
+        results[name] = memory
+        intents = [flag for flag, enabled in options["intents"] if enabled]
+        print(f"{name:<7} {elapsed:7.2f}s  {memory / 2**20:8.1f} MiB kept  {cached:>8} members cached  chunk={options['chunk_guilds_at_startup']}  intents={len(intents)}")
+
+    if results["config"] > results["all"]:
+        print("[FAIL] the configured profile keeps more memory than 'all'")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--members", type=int, default=MEMBERS)
+    sys.exit(run(parser.parse_args().members))
@@ -0,0 +1,8 @@
+"""
+THE END-TO-END REPLAY HARNESS: THE WHOLE BOT ('src/main.py', STARTED BY 'launch_bot.py') AGAINST A LOCAL MOCK OF THE
+DISCORD GATEWAY AND REST API ('mock_discord.py'), DRIVEN BY A STREAM OF INTERACTIONS ('streams.py') PLAYED BY SIMULATED
+USERS AND STAFF MEMBERS ('player.py'). THE RUNNER ('__main__.py') REPORTS WHAT THE USERS WOULD SEE.
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/replay [--users 300] [--window 60] [--output result.json]
+"""
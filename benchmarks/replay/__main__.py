@@ -0,0 +1,161 @@
+"""
+IN THIS PYTHON FILE WE RUN THE REPLAY HARNESS: THE WHOLE BOT AGAINST THE MOCK DISCORD, UNDER A STREAM OF INTERACTIONS.
+
+1. THE STREAM IS READ FROM A FILE ('--stream', SEE 'streams.py') OR GENERATED: BY DEFAULT 300 USERS OPEN A TICKET IN THE
+   MINUTE AFTER AN ANNOUNCEMENT, WRITE 2 MESSAGES AND THEIR TICKET IS CLOSED ABOUT 30 SECONDS LATER ('--save' WRITES IT,
+   TO REPLAY EXACTLY THE SAME TRAFFIC AFTER A CHANGE).
+2. THE MOCK DISCORD STARTS (SEE 'mock_discord.py') AND THE BOT RUNS IN ITS OWN PROCESS ('src/main.py' UNMODIFIED, SEE
+   'launch_bot.py'), WITH ITS DATABASE AND LOGS IN A TEMPORARY FOLDER ('--data' TO CHOOSE IT AND KEEP IT).
+3. ONCE THE BOT IS READY, THE STREAM IS PLAYED (SEE 'player.py'); THE REQUESTS OF THE STARTUP ARE NOT COUNTED.
+4. THE REPORT: THE THROUGHPUT, THE P50/P90/P99 OF THE TIME TO TICKET, OF THE CLOSE REPLY AND OF THE CLOSE LATENCY, THE
+   OUTCOMES OF THE EVENTS, THE REST REQUESTS AND THE 429s BY ROUTE, THE EXPIRED INTERACTIONS AND THE ROUTES THE MOCK DOES
+   NOT KNOW. THE EXIT CODE IS 1 IF AN EVENT FAILED.
+
+RUN IT FROM THE ROOT OF THE REPOSITORY (A RUN TAKES AS LONG AS THE STREAM, ABOUT 2 MINUTES WITH THE DEFAULTS):
+    python benchmarks/replay [--users 300] [--window 60] [--set channel_pool_size=5] [--output result.json]
+    python benchmarks/replay --stream recorded.jsonl --speed 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import streams
+from mock_discord import RATE_LIMITS, MockDiscord, MockStats
+from player import Player
+
+LATENCY = 0.05 # Seconds of network latency of every REST call (between the bot and Discord)
+TIMEOUT = 120 # Seconds a user waits for an answer before the event is counted as failed
+STARTUP_TIMEOUT = 60 # Seconds the bot has to connect and become ready
+
+async def start_bot(mock, data, overrides):
+    """
+    STARTS THE BOT IN ITS OWN PROCESS (ITS OUTPUT GOES TO 'bot-output.txt' IN THE DATA FOLDER) AND WAITS UNTIL IT IS READY.
+    """
+    output = open(os.path.join(data, "bot-output.txt"), "wb")
+    process = await asyncio.create_subprocess_exec(sys.executable, os.path.join(HERE, "launch_bot.py"), "--api", mock.url, "--data", data,
+                                                   *(f"--set={override}" for override in overrides), stdout=output, stderr=subprocess.STDOUT)
+    output.close()
+    ready, exited = asyncio.create_task(mock.ready.wait()), asyncio.create_task(process.wait())
+    done, _ = await asyncio.wait((ready, exited), timeout=STARTUP_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    ready.cancel()
+    exited.cancel()
+    if ready not in done:
+        await stop_bot(process)
+        raise SystemExit(f"The bot did not start (see {os.path.join(data, 'bot-output.txt')})")
+    return process
+
+async def stop_bot(process):
+    """
+    STOPS THE BOT LIKE CTRL+C (SO IT CLOSES ITS DATABASE AND WRITES ITS LOGS), OR KILLS IT AFTER 15 SECONDS.
+    """
+    if process.returncode is not None:
+        return
+    process.send_signal(signal.SIGINT if os.name != "nt" else signal.SIGTERM)
+    try:
+        await asyncio.wait_for(process.wait(), 15)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+def parse_rate_limits(options):
+    if options.no_rate_limits:
+        return None
+    limits = dict(RATE_LIMITS)
+    for value in options.rate_limit:
+        route, _, limit = value.rpartition("=")
+        requests, _, seconds = limit.partition("/")
+        limits[route] = (int(requests), float(seconds))
+    return limits
+
+def print_report(report):
+    results, discord = report["results"], report["discord"]
+    stream = report["stream"]
+    print(f"Replayed {stream['events']} events ({stream['opens']} opens, {stream['messages']} messages, {stream['closes']} closes) in {report['seconds']:.1f} s")
+    print(f"Throughput: {results['tickets_per_second']} tickets opened/s, {results['closes_per_second']} tickets closed/s")
+    for key, title in (("time_to_ticket", "Time to ticket"), ("close_reply", "Close reply"), ("close_latency", "Close latency")):
+        values = results[key]
+        if values["count"]:
+            print(f"{title:<15} {values['count']:>5}  p50 {values['p50_ms']:>9.1f} ms  p90 {values['p90_ms']:>9.1f} ms  p99 {values['p99_ms']:>9.1f} ms  max {values['max_ms']:>9.1f} ms")
+    print("Outcomes: " + ", ".join(f"{outcome} {count}" for outcome, count in results["outcomes"].items()))
+    print(f"Discord: {discord['rest_requests']} REST requests, {discord['rate_limited']} rate limited (429), "
+          f"{discord['expired_interactions']} expired interactions, {discord['gateway_events']} gateway events")
+    for route, count in discord["requests_by_route"].items():
+        limited = discord["rate_limited_by_route"].get(route, 0)
+        print(f"    {count:>6}  {route}" + (f"  ({limited} x 429)" if limited else ""))
+    if discord["rate_limited_by_route"].get("global"):
+        print(f"    global rate limit: {discord['rate_limited_by_route']['global']} x 429")
+    for route, count in discord["unhandled_routes"].items():
+        print(f"[WARNING] The mock does not know {route} ({count} requests answered 404)")
+
+async def run(options):
+    events = streams.load(options.stream) if options.stream else streams.announcement(
+        options.users, options.window, messages=options.messages, attachment_every=options.attachment_every,
+        close_after=None if options.no_close else options.close_after, seed=options.seed)
+    if options.save:
+        streams.save(events, options.save)
+
+    data = options.data or tempfile.mkdtemp(prefix="ticket-replay-")
+    os.makedirs(data, exist_ok=True)
+    async with MockDiscord(options.latency, parse_rate_limits(options)) as mock:
+        process = await start_bot(mock, data, options.set)
+        try:
+            mock.stats = MockStats() # Only the replay is counted, not the startup
+            player = Player(mock, options.timeout)
+            started = time.monotonic()
+            await player.play(events, options.speed)
+            seconds = time.monotonic() - started
+        finally:
+            await stop_bot(process)
+
+    kinds = [event["kind"] for event in events]
+    report = {
+        "stream": {"source": options.stream or "announcement", "events": len(events), "opens": kinds.count("open"),
+                   "messages": kinds.count("message"), "closes": kinds.count("close")},
+        "parameters": {"latency": options.latency, "speed": options.speed, "rate_limits": not options.no_rate_limits, "set": options.set},
+        "seconds": round(seconds, 2),
+        "results": player.results(),
+        "discord": mock.stats.to_dict(),
+    }
+    print_report(report)
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    failed = any(not outcome.endswith(": ok") for outcome in player.outcomes)
+    if options.data or failed:
+        print(f"The database, the logs and the output of the bot are in {data}")
+    else:
+        shutil.rmtree(data, ignore_errors=True)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--stream", help="replay the events of this file instead of generating them (see streams.py)")
+    parser.add_argument("--users", type=int, default=300, help="generated stream: users who open a ticket")
+    parser.add_argument("--window", type=float, default=60.0, help="generated stream: seconds in which the tickets are opened")
+    parser.add_argument("--messages", type=int, default=2, help="generated stream: messages written in every ticket")
+    parser.add_argument("--attachment-every", type=int, default=0, help="generated stream: every N-th message has a file (0 = none)")
+    parser.add_argument("--close-after", type=float, default=30.0, help="generated stream: seconds between the open and the close of a ticket")
+    parser.add_argument("--no-close", action="store_true", help="generated stream: do not close the tickets")
+    parser.add_argument("--seed", type=int, default=1, help="generated stream: the seed of the random generator")
+    parser.add_argument("--save", help="write the stream to this file")
+    parser.add_argument("--speed", type=float, default=1.0, help="play the stream this many times faster")
+    parser.add_argument("--latency", type=float, default=LATENCY, help="seconds of network latency of every REST call")
+    parser.add_argument("--rate-limit", action="append", default=[], metavar="'METHOD /ROUTE=REQUESTS/SECONDS'", help="replace the rate limit of a route")
+    parser.add_argument("--no-rate-limits", action="store_true", help="disable the rate limits of the mock")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="replace a value of config.py for the bot")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT, help="seconds a user waits for an answer")
+    parser.add_argument("--data", help="keep the database, the logs and the output of the bot in this folder")
+    parser.add_argument("--output", help="also write the report to this JSON file")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,74 @@
+"""
+IN THIS PYTHON FILE WE START THE BOT ('src/main.py', UNMODIFIED) CONNECTED TO THE MOCK DISCORD OF THE REPLAY HARNESS.
+
+BEFORE 'src/main.py' RUNS, THE VALUES OF config.py ARE REPLACED IN MEMORY (THE FILE IS NOT CHANGED):
+- THE IDS OF THE GUILD, ROLES, CATEGORIES AND CHANNELS OF THE MOCK (SEE 'World' IN 'mock_discord.py');
+- THE DATABASE, THE ATTACHMENT STORE, THE TRANSCRIPT ARCHIVE AND THE LOG FILE, MOVED TO THE '--data' FOLDER (THE REAL
+  DATA OF THE BOT IS NEVER TOUCHED); THE METRICS ENDPOINT IS DISABLED;
+- THE VALUES GIVEN WITH '--set NAME=VALUE' (PYTHON LITERALS, E.G. '--set channel_pool_size=5'), TO MEASURE A CHANGE OF
+  THE CONFIGURATION.
+THEN DISCORD.PY IS POINTED TO THE MOCK: THE BASE URL OF THE REST API AND THE URL OF THE GATEWAY.
+
+IT IS STARTED BY THE RUNNER ('python benchmarks/replay'), NOT BY HAND:
+    python benchmarks/replay/launch_bot.py --api http://127.0.0.1:PORT --data FOLDER [--set NAME=VALUE ...]
+"""
+
+import argparse
+import ast
+import os
+import runpy
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "..", "src")
+sys.path.insert(0, SRC) # 'src/main.py' imports the other modules of the bot by name
+
+from mock_discord import API, World
+
+def configure(data, overrides):
+    """
+    REPLACES THE VALUES OF config.py (SEE ABOVE).
+    """
+    import config
+
+    values = {
+        "TOKEN": "replay-token",
+        **World.bot_config(),
+        "database_path": os.path.join(data, "database", "ticket.db"),
+        "attachment_store_path": os.path.join(data, "attachments"),
+        "transcript_archive_path": os.path.join(data, "transcripts"),
+        "log_file": os.path.join(data, "logs", "bot.log"),
+        "metrics_port": None,
+    }
+    for override in overrides:
+        name, _, value = override.partition("=")
+        if not hasattr(config, name):
+            raise SystemExit(f"config.py has no value named '{name}'")
+        values[name] = ast.literal_eval(value)
+    for name, value in values.items():
+        setattr(config, name, value)
+    os.makedirs(os.path.dirname(values["database_path"]), exist_ok=True)
+
+def point_to(api):
+    """
+    SENDS THE REST CALLS AND THE GATEWAY CONNECTION OF DISCORD.PY TO THE MOCK AT 'api'.
+    """
+    import discord
+    import yarl
+    from discord.gateway import DiscordWebSocket
+
+    discord.http.Route.BASE = api + API # Also used by the interaction responses and the followups
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(api.replace("http", "ws", 1) + "/gateway-ws")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Start the bot connected to the mock Discord of the replay harness")
+    parser.add_argument("--api", required=True, help="the address of the mock Discord")
+    parser.add_argument("--data", required=True, help="the folder of the database, the transcripts and the logs of the bot")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE", help="replace a value of config.py")
+    options = parser.parse_args()
+
+    configure(options.data, options.set)
+    point_to(options.api)
+    main = os.path.join(SRC, "main.py")
+    sys.argv = [main]
+    runpy.run_path(main, run_name="__main__")
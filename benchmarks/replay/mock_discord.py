@@ -0,0 +1,734 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE MOCK DISCORD OF THE REPLAY HARNESS: A LOCAL SERVER THAT SPEAKS ENOUGH OF THE DISCORD
+GATEWAY AND REST API TO RUN 'src/main.py' UNMODIFIED (SEE 'launch_bot.py', WHICH ONLY POINTS DISCORD.PY TO IT).
+
+THE SERVER HOSTS ONE GUILD ('World': A TICKET CATEGORY, THE TRANSCRIPT AND SETUP CHANNELS, THE STAFF AND ADMIN ROLES) AND:
+- /gateway-ws:      THE GATEWAY OF THE BOT: HELLO, HEARTBEAT ACK, READY AND GUILD_CREATE AFTER THE IDENTIFY, THEN THE
+                    EVENTS OF THE GUILD (CHANNEL_CREATE/UPDATE/DELETE, MESSAGE_CREATE) AND THE INTERACTIONS OF THE USERS.
+- /api/v10/...:     THE REST CALLS OF THE TICKET FLOW (CHANNELS, MESSAGES, HISTORY, PINS, PERMISSIONS, MEMBERS, DMS,
+                    COMMANDS, INTERACTION CALLBACKS AND FOLLOWUPS). AN UNKNOWN ROUTE ANSWERS 404 AND IS REPORTED.
+- /attachments/...: THE FILES OF THE MESSAGES OF THE USERS (RANDOM BYTES OF THE SIZE WRITTEN IN THE URL).
+
+THE RATE LIMITS BEHAVE LIKE THE ONES OF DISCORD: EVERY ANSWER OF A LIMITED ROUTE HAS THE 'X-RateLimit-*' HEADERS, A
+REQUEST OVER THE LIMIT OF ITS BUCKET (PER ROUTE AND MAJOR PARAMETER: CHANNEL, GUILD OR INTERACTION TOKEN) OR OVER THE
+GLOBAL LIMIT OF THE TOKEN ('GLOBAL_LIMIT' PER SECOND) ANSWERS 429 WITH 'retry_after'. THE LIMITS OF THE ROUTES
+('RATE_LIMITS') ARE APPROXIMATIONS: DISCORD DOES NOT DOCUMENT THEM AND CHANGES THEM, SO THEY CAN BE REPLACED (SEE
+'--rate-limit' IN '__main__.py'). LIKE ON DISCORD, AN INTERACTION THAT IS NOT ANSWERED WITHIN 'INTERACTION_TIMEOUT'
+SECONDS EXPIRES: ITS CALLBACK ANSWERS 404 (THE USER SEES "This interaction failed") AND IS COUNTED.
+
+THE USERS ARE DRIVEN BY THE REPLAY (SEE 'player.py') WITH 'interact', 'next_response', 'user_message' AND
+'wait_deleted'. EVERYTHING THE SERVER SAW IS COUNTED IN 'stats'.
+"""
+
+import asyncio
+import collections
+import hashlib
+import itertools
+import json
+import math
+import os
+import secrets
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+
+import aiohttp
+from aiohttp import web
+
+API = "/api/v10"
+DISCORD_EPOCH = 1420070400000 # The first millisecond of 2015, the epoch of the Discord snowflakes
+HEARTBEAT_INTERVAL = 41250 # Milliseconds, like Discord
+INTERACTION_TIMEOUT = 3.0 # Seconds Discord waits for the first answer of an interaction
+GLOBAL_LIMIT = 50 # Requests per second of the bot token (the interaction endpoints are not included)
+RATE_LIMITS = { # Route -> (requests, seconds) for each major parameter; approximations of the limits of Discord
+    "POST /channels/{channel_id}/messages": (5, 5),
+    "DELETE /channels/{channel_id}/messages/{message_id}": (5, 1),
+    "GET /channels/{channel_id}/messages": (5, 1),
+    "PATCH /channels/{channel_id}": (2, 600), # Name and topic changes
+    "DELETE /channels/{channel_id}": (5, 5),
+    "PUT /channels/{channel_id}/permissions/{overwrite_id}": (10, 10),
+    "PUT /channels/{channel_id}/messages/pins/{message_id}": (5, 5),
+    "POST /guilds/{guild_id}/channels": (10, 10),
+    "GET /guilds/{guild_id}/members/{user_id}": (5, 1),
+    "POST /users/@me/channels": (5, 5),
+    "POST /webhooks/{application_id}/{token}": (5, 2),
+    "PUT /applications/{application_id}/commands": (2, 60),
+}
+
+_increment = itertools.count()
+
+def snowflake():
+    """
+    RETURNS A NEW DISCORD ID: THE CURRENT TIME IS IN IT, LIKE IN THE REAL ONES (DISCORD.PY READS 'created_at' FROM IT).
+    """
+    return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (next(_increment) & 0x3FFFFF)
+
+def json_response(data, status=200, headers=None):
+    """
+    RETURNS A JSON RESPONSE WITH THE CONTENT TYPE OF DISCORD (DISCORD.PY ONLY DECODES 'application/json' WITHOUT A CHARSET).
+    """
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers, content_type="application/json")
+
+def not_found(error):
+    return web.HTTPNotFound(body=json.dumps(error).encode(), content_type="application/json")
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat()
+
+class World:
+    """
+    THE IDS OF THE GUILD OF THE MOCK (ALSO WRITTEN IN THE CONFIG OF THE BOT BY 'launch_bot.py').
+    """
+    GUILD_ID = 1_100_000_000_000_000_001
+    EVERYONE_ROLE_ID = GUILD_ID
+    STAFF_ROLE_ID = 1_100_000_000_000_000_002
+    ADMIN_ROLE_ID = 1_100_000_000_000_000_003
+    BOT_ROLE_ID = 1_100_000_000_000_000_004
+    CATEGORY_ID = 1_100_000_000_000_000_010
+    TRANSCRIPT_CHANNEL_ID = 1_100_000_000_000_000_011
+    SETUP_CHANNEL_ID = 1_100_000_000_000_000_012
+    APPLICATION_ID = 1_100_000_000_000_000_020
+    BOT_ID = APPLICATION_ID
+    STAFF_ID = 1_100_000_000_000_000_030
+    OWNER_ID = 1_100_000_000_000_000_031
+
+    @classmethod
+    def bot_config(cls):
+        """
+        RETURNS THE VALUES OF config.py THAT MAKE THE BOT USE THIS GUILD.
+        """
+        return {
+            "guild_id": cls.GUILD_ID,
+            "staff_role_ids": [cls.STAFF_ROLE_ID],
+            "admin_role_ids": [cls.ADMIN_ROLE_ID],
+            "ticket_categories": {"1": cls.CATEGORY_ID},
+            "extra_ticket_category_ids": [],
+            "transcript_channel_id": cls.TRANSCRIPT_CHANNEL_ID,
+            "setup_channel_id": cls.SETUP_CHANNEL_ID,
+            "transcript_archive_channels": [],
+            "command_sync_guild_id": None,
+        }
+
+class Bucket:
+    """
+    A RATE LIMIT BUCKET: 'limit' REQUESTS IN A WINDOW OF 'per' SECONDS THAT STARTS WITH THE FIRST REQUEST.
+    """
+    __slots__ = ("name", "limit", "per", "used", "reset_at")
+
+    def __init__(self, name, limit, per):
+        self.name = name
+        self.limit = limit
+        self.per = per
+        self.used = 0
+        self.reset_at = 0.0
+
+    def hit(self, now):
+        """
+        COUNTS A REQUEST. RETURNS NONE IF IT IS ALLOWED, OTHERWISE THE SECONDS TO WAIT.
+        """
+        if now >= self.reset_at:
+            self.used, self.reset_at = 0, now + self.per
+        if self.used >= self.limit:
+            return self.reset_at - now
+        self.used += 1
+        return None
+
+    def headers(self, now):
+        reset_after = max(self.reset_at - now, 0)
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.limit - self.used, 0)),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": hashlib.sha1(self.name.encode()).hexdigest()[:16],
+        }
+
+class MockStats:
+    """
+    WHAT THE MOCK SAW DURING A REPLAY.
+
+    ATTRIBUTES:
+        REQUESTS: COUNTER ROUTE -> REST REQUESTS (ALSO THE ONES THAT WERE RATE LIMITED).
+        STATUSES: COUNTER HTTP STATUS -> RESPONSES.
+        RATE_LIMITED: COUNTER ROUTE -> 429 RESPONSES ('global' FOR THE GLOBAL LIMIT).
+        UNHANDLED: COUNTER "METHOD PATH" -> REQUESTS TO A ROUTE THAT THE MOCK DOES NOT KNOW.
+        EXPIRED_INTERACTIONS: THE INTERACTIONS ANSWERED AFTER 'INTERACTION_TIMEOUT' SECONDS (OR NEVER ACCEPTED).
+        GATEWAY_EVENTS: THE EVENTS SENT TO THE BOT. GATEWAY_RECEIVED: COUNTER OPCODE -> MESSAGES SENT BY THE BOT.
+        UPLOADED_BYTES: THE BYTES OF THE FILES UPLOADED BY THE BOT (THE TRANSCRIPTS).
+    """
+    def __init__(self):
+        self.requests = collections.Counter()
+        self.statuses = collections.Counter()
+        self.rate_limited = collections.Counter()
+        self.unhandled = collections.Counter()
+        self.expired_interactions = 0
+        self.gateway_events = 0
+        self.gateway_received = collections.Counter()
+        self.uploaded_bytes = 0
+
+    def to_dict(self):
+        return {
+            "rest_requests": sum(self.requests.values()),
+            "requests_by_route": dict(self.requests.most_common()),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "rate_limited": sum(self.rate_limited.values()),
+            "rate_limited_by_route": dict(self.rate_limited.most_common()),
+            "unhandled_routes": dict(self.unhandled.most_common()),
+            "expired_interactions": self.expired_interactions,
+            "gateway_events": self.gateway_events,
+            "gateway_received": {str(op): count for op, count in sorted(self.gateway_received.items())},
+            "uploaded_bytes": self.uploaded_bytes,
+        }
+
+class PendingInteraction:
+    __slots__ = ("id", "user", "channel_id", "created", "responded", "original", "responses")
+
+    def __init__(self, interaction_id, user, channel_id):
+        self.id = interaction_id
+        self.user = user
+        self.channel_id = channel_id
+        self.created = time.monotonic()
+        self.responded = False
+        self.original = None # The message of the first answer (a reply or a "thinking" defer)
+        self.responses = asyncio.Queue()
+
+class MockDiscord:
+    """
+    THE MOCK DISCORD SERVER.
+
+    ARGS:
+        LATENCY: SECONDS ADDED TO EVERY REST CALL (THE NETWORK BETWEEN THE BOT AND DISCORD).
+        RATE_LIMITS: THE LIMITS OF THE ROUTES (SEE 'RATE_LIMITS'); NONE DISABLES ALL THE RATE LIMITS (ALSO THE GLOBAL ONE).
+
+    ATTRIBUTES:
+        URL: THE ADDRESS OF THE SERVER ONCE IT IS STARTED (E.G. http://127.0.0.1:PORT).
+        READY: EVENT SET WHEN THE BOT FINISHED ITS STARTUP (ITS FIRST PRESENCE UPDATE IS THE LAST STEP OF 'on_ready').
+        STATS: WHAT THE SERVER SAW (SEE 'MockStats').
+
+    USAGE:
+        async with MockDiscord() as mock:
+            ... # Start the bot with 'launch_bot.py --api mock.url', then drive it (see 'player.py')
+    """
+    def __init__(self, latency=0.0, rate_limits=RATE_LIMITS):
+        self.latency = latency
+        self.rate_limits = rate_limits
+        self.url = None
+        self.ready = asyncio.Event()
+        self.stats = MockStats()
+        self.channels = {}
+        self.members = {}
+        self._messages = {} # Channel ID -> (IDs, payloads), oldest first
+        self._buckets = {}
+        self._global = Bucket("global", GLOBAL_LIMIT, 1)
+        self._interactions = {}
+        self._deleted = {}
+        self._ws = None
+        self._sequence = 0
+        self._send_lock = asyncio.Lock()
+        self._runner = None
+        self._block = os.urandom(1024 * 1024)
+        self._build_guild()
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # THE GUILD
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    def user_payload(self, user_id, bot=False):
+        name = "ticket-bot" if user_id == World.BOT_ID else f"user{user_id % 100_000}"
+        return {"id": str(user_id), "username": name, "global_name": name, "discriminator": "0", "avatar": None, "bot": bot, "public_flags": 0}
+
+    def add_member(self, user_id, roles=()):
+        """
+        ADDS A MEMBER TO THE GUILD (THE USERS OF THE REPLAY ARE ADDED BEFORE THEY INTERACT) AND RETURNS ITS PAYLOAD.
+        """
+        member = {"user": self.user_payload(user_id, user_id == World.BOT_ID), "roles": [str(role) for role in roles], "joined_at": now_iso(),
+                  "deaf": False, "mute": False, "flags": 0, "nick": None, "avatar": None, "pending": False}
+        self.members[user_id] = member
+        return member
+
+    def _channel(self, channel_id, name, type=0, parent_id=None, overwrites=()):
+        channel = {"id": str(channel_id), "type": type, "guild_id": str(World.GUILD_ID), "name": name, "position": len(self.channels),
+                   "parent_id": None if parent_id is None else str(parent_id), "permission_overwrites": list(overwrites), "nsfw": False,
+                   "topic": None, "last_message_id": None, "rate_limit_per_user": 0, "flags": 0}
+        self.channels[channel_id] = channel
+        self._messages[channel_id] = ([], [])
+        return channel
+
+    def _build_guild(self):
+        self.roles = [
+            {"id": str(World.EVERYONE_ROLE_ID), "name": "@everyone", "permissions": "1071698660929", "position": 0},
+            {"id": str(World.STAFF_ROLE_ID), "name": "Staff", "permissions": "1071698660929", "position": 1},
+            {"id": str(World.ADMIN_ROLE_ID), "name": "Admin", "permissions": "8", "position": 2},
+            {"id": str(World.BOT_ROLE_ID), "name": "Ticket Bot", "permissions": "8", "position": 3},
+        ]
+        for role in self.roles:
+            role.update({"color": 0, "hoist": False, "managed": False, "mentionable": True, "flags": 0})
+        self._channel(World.CATEGORY_ID, "Tickets", type=4)
+        self._channel(World.TRANSCRIPT_CHANNEL_ID, "transcripts")
+        self._channel(World.SETUP_CHANNEL_ID, "open-a-ticket")
+        self.add_member(World.BOT_ID, [World.BOT_ROLE_ID])
+        self.add_member(World.STAFF_ID, [World.STAFF_ROLE_ID])
+        self.add_member(World.OWNER_ID, [World.ADMIN_ROLE_ID])
+        # The ticket menu, as sent by '/ticket-setup' (see 'TicketDropdown' in classes.py)
+        menu = {"type": 3, "custom_id": "ticket:open", "placeholder": "Select an option to open a ticket", "min_values": 1, "max_values": 1,
+                "options": [{"label": "Assistance", "value": "1", "description": "Select this option if you need assistance from our staff."}]}
+        self.setup_message = self._store_message(World.SETUP_CHANNEL_ID, World.BOT_ID, {"components": [{"type": 1, "components": [menu]}]})
+
+    def guild_payload(self):
+        return {
+            "id": str(World.GUILD_ID), "name": "Replay", "icon": None, "owner_id": str(World.OWNER_ID), "unavailable": False, "large": False,
+            "member_count": len(self.members), "features": [], "emojis": [], "stickers": [], "roles": self.roles, "joined_at": now_iso(),
+            "channels": [channel for channel in self.channels.values() if channel["type"] != 1], "members": [self.members[World.BOT_ID]],
+            "voice_states": [], "presences": [], "threads": [], "stage_instances": [], "guild_scheduled_events": [], "soundboard_sounds": [],
+            "verification_level": 0, "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0, "nsfw_level": 0,
+            "premium_tier": 0, "preferred_locale": "en-US", "system_channel_flags": 0,
+        }
+
+    def _store_message(self, channel_id, author_id, payload, attachments=()):
+        message = {
+            "id": str(snowflake()), "channel_id": str(channel_id), "author": self.user_payload(author_id, author_id == World.BOT_ID),
+            "content": payload.get("content") or "", "timestamp": now_iso(), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": list(attachments), "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [], "pinned": False, "type": 0, "flags": payload.get("flags") or 0,
+        }
+        if self.channels[channel_id]["type"] != 1:
+            message["guild_id"] = str(World.GUILD_ID)
+        ids, messages = self._messages[channel_id]
+        ids.append(int(message["id"]))
+        messages.append(message)
+        self.channels[channel_id]["last_message_id"] = message["id"]
+        return message
+
+    def find_message(self, channel_id, custom_id):
+        """
+        RETURNS THE NEWEST MESSAGE OF THE CHANNEL WITH A COMPONENT WITH THE GIVEN CUSTOM ID (E.G. THE CLOSE BUTTON), OR NONE.
+        """
+        def custom_ids(components):
+            for component in components:
+                yield component.get("custom_id")
+                yield from custom_ids(component.get("components", ()))
+
+        for message in reversed(self._messages.get(channel_id, ((), ()))[1]):
+            if custom_id in custom_ids(message["components"]):
+                return message
+        return None
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # THE USERS (CALLED BY THE REPLAY)
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def interact(self, user_id, type, data, channel_id, message=None):
+        """
+        SENDS AN INTERACTION OF A MEMBER TO THE BOT (3 = COMPONENT, 5 = MODAL SUBMIT) AND RETURNS ITS TOKEN, USED TO WAIT
+        FOR THE ANSWERS OF THE BOT ('next_response').
+        """
+        member = self.members.get(user_id) or self.add_member(user_id)
+        interaction_id, token = snowflake(), secrets.token_urlsafe(24)
+        payload = {
+            "id": str(interaction_id), "application_id": str(World.APPLICATION_ID), "type": type, "token": token, "version": 1,
+            "guild_id": str(World.GUILD_ID), "channel_id": str(channel_id), "channel": self.channels[channel_id],
+            "member": {**member, "permissions": "1071698660929"}, "data": data, "locale": "en-US", "guild_locale": "en-US",
+            "entitlements": [], "authorizing_integration_owners": {"0": str(World.GUILD_ID)}, "context": 0,
+            "app_permissions": "8", "attachment_size_limit": 10 * 1024 * 1024,
+        }
+        if message is not None:
+            payload["message"] = message
+        self._interactions[token] = PendingInteraction(interaction_id, member["user"], channel_id)
+        await self.dispatch("INTERACTION_CREATE", payload)
+        return token
+
+    async def next_response(self, token, timeout):
+        """
+        WAITS FOR THE NEXT ANSWER OF THE BOT TO AN INTERACTION.
+
+        RETURNS:
+            DICT: 'kind' ("callback", "followup" OR "edit"), 'type' (THE CALLBACK TYPE: 4 = MESSAGE, 5 = DEFER, 9 = MODAL),
+            'data' (THE PAYLOAD SENT BY THE BOT) AND 'at' (THE 'time.monotonic()' OF THE ANSWER).
+        """
+        return await asyncio.wait_for(self._interactions[token].responses.get(), timeout)
+
+    async def user_message(self, user_id, channel_id, content, attachment_size=0):
+        """
+        WRITES A MESSAGE OF A MEMBER IN A CHANNEL (WITH A FILE OF 'attachment_size' BYTES, IF NOT 0).
+        """
+        attachments = []
+        if attachment_size:
+            attachment_id = snowflake()
+            url = f"{self.url}/attachments/{attachment_id}/screenshot.png?size={attachment_size}"
+            attachments.append({"id": str(attachment_id), "filename": "screenshot.png", "size": attachment_size, "content_type": "image/png", "url": url, "proxy_url": url})
+        message = self._store_message(channel_id, user_id, {"content": content}, attachments)
+        await self.dispatch("MESSAGE_CREATE", {**message, "member": {key: value for key, value in self.members[user_id].items() if key != "user"}})
+
+    async def wait_deleted(self, channel_id, timeout):
+        """
+        WAITS UNTIL THE BOT DELETES THE CHANNEL AND RETURNS THE 'time.monotonic()' OF THE DELETION.
+        """
+        future = self._deleted.setdefault(channel_id, asyncio.get_running_loop().create_future())
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # THE GATEWAY
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def dispatch(self, event, data):
+        """
+        SENDS A DISPATCH EVENT TO THE BOT (DROPPED IF THE BOT IS NOT CONNECTED).
+        """
+        ws = self._ws
+        if ws is None or ws.closed:
+            return
+        async with self._send_lock:
+            self._sequence += 1
+            self.stats.gateway_events += 1
+            await ws.send_str(json.dumps({"op": 0, "t": event, "s": self._sequence, "d": data}))
+
+    async def _send(self, ws, op, data=None):
+        """
+        SENDS A GATEWAY FRAME THAT IS NOT A DISPATCH (HELLO, HEARTBEAT ACK, INVALID SESSION). LIKE 'dispatch' IT HOLDS THE
+        SEND LOCK, SO TWO FRAMES ARE NEVER WRITTEN TO THE SOCKET AT THE SAME TIME.
+        """
+        async with self._send_lock:
+            await ws.send_str(json.dumps({"op": op, "d": data, "s": None, "t": None}))
+
+    async def _gateway(self, request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self._ws, self._sequence = ws, 0
+        await self._send(ws, 10, {"heartbeat_interval": HEARTBEAT_INTERVAL})
+        async for frame in ws:
+            if frame.type is not aiohttp.WSMsgType.TEXT:
+                continue
+            message = json.loads(frame.data)
+            op = message.get("op")
+            self.stats.gateway_received[op] += 1
+            if op == 1: # Heartbeat
+                await self._send(ws, 11)
+            elif op == 2: # Identify
+                await self.dispatch("READY", {
+                    "v": 10, "user": {**self.user_payload(World.BOT_ID, True), "verified": True, "mfa_enabled": False, "flags": 0},
+                    "guilds": [{"id": str(World.GUILD_ID), "unavailable": True}], "session_id": secrets.token_hex(16),
+                    "resume_gateway_url": self.url.replace("http", "ws", 1) + "/gateway-ws", "application": {"id": str(World.APPLICATION_ID), "flags": 0},
+                    "private_channels": [], "relationships": [],
+                })
+                await self.dispatch("GUILD_CREATE", self.guild_payload())
+            elif op == 6: # Resume: not supported, the bot identifies again
+                await self._send(ws, 9, False)
+            elif op == 3: # Presence update
+                self.ready.set()
+        if self._ws is ws:
+            self._ws = None
+        return ws
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # THE REST API
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    @web.middleware
+    async def _rest(self, request, handler):
+        if not request.path.startswith(API + "/"):
+            return await handler(request)
+        resource = request.match_info.route.resource
+        if resource is None:
+            self.stats.unhandled[f"{request.method} {request.path[len(API):]}"] += 1
+            self.stats.statuses[404] += 1
+            return json_response({"message": "404: Not Found", "code": 0}, status=404)
+
+        route = f"{request.method} {resource.canonical[len(API):]}"
+        self.stats.requests[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        headers = {}
+        if self.rate_limits is not None:
+            now = time.monotonic()
+            if not route.startswith(("POST /interactions/", "POST /webhooks/", "PATCH /webhooks/", "DELETE /webhooks/")):
+                retry_after = self._global.hit(now)
+                if retry_after is not None:
+                    return self._too_many_requests("global", retry_after, {"X-RateLimit-Global": "true", "X-RateLimit-Scope": "global"})
+            if route in self.rate_limits:
+                info = request.match_info
+                major = info.get("channel_id") or info.get("guild_id") or info.get("token") or ""
+                bucket = self._buckets.get((route, major))
+                if bucket is None:
+                    bucket = self._buckets[route, major] = Bucket(route, *self.rate_limits[route])
+                retry_after = bucket.hit(now)
+                headers = bucket.headers(now)
+                if retry_after is not None:
+                    return self._too_many_requests(route, retry_after, {**headers, "X-RateLimit-Scope": "user"})
+
+        try:
+            response = await handler(request)
+        except web.HTTPException as error: # Unknown channel, message or interaction
+            self.stats.statuses[error.status] += 1
+            raise
+        response.headers.update(headers)
+        self.stats.statuses[response.status] += 1
+        return response
+
+    def _too_many_requests(self, route, retry_after, headers):
+        self.stats.rate_limited[route] += 1
+        self.stats.statuses[429] += 1
+        headers = {**headers, "Retry-After": str(math.ceil(retry_after)), "Via": "1.1 google"} # discord.py needs 'Via' to trust a 429
+        body = {"message": "You are being rate limited.", "retry_after": round(retry_after, 3), "global": route == "global"}
+        return json_response(body, status=429, headers=headers)
+
+    async def _payload(self, request):
+        """
+        RETURNS THE JSON OF A REQUEST AND THE ATTACHMENTS OF ITS FILES (A MULTIPART REQUEST HAS THE JSON IN 'payload_json').
+        """
+        if request.content_type == "multipart/form-data":
+            form = await request.post()
+            attachments = []
+            for field in form.values():
+                if isinstance(field, web.FileField):
+                    size = field.file.seek(0, os.SEEK_END)
+                    self.stats.uploaded_bytes += size
+                    attachment_id = snowflake()
+                    url = f"{self.url}/attachments/{attachment_id}/{field.filename}?size={size}"
+                    attachments.append({"id": str(attachment_id), "filename": field.filename, "size": size, "url": url, "proxy_url": url})
+            return json.loads(form.get("payload_json") or "{}"), attachments
+        if request.can_read_body:
+            return await request.json(), []
+        return {}, []
+
+    def _channel_or_404(self, request):
+        channel = self.channels.get(int(request.match_info["channel_id"]))
+        if channel is None:
+            raise not_found({"message": "Unknown Channel", "code": 10003})
+        return channel
+
+    async def _get_me(self, request):
+        return json_response({**self.user_payload(World.BOT_ID, True), "verified": True, "mfa_enabled": False, "flags": 0})
+
+    async def _get_gateway(self, request):
+        return json_response({"url": self.url.replace("http", "ws", 1) + "/gateway-ws", "shards": 1,
+                                  "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1}})
+
+    async def _get_application(self, request):
+        return json_response({"id": str(World.APPLICATION_ID), "name": "ticket-bot", "icon": None, "description": "", "bot_public": False,
+                                  "bot_require_code_grant": False, "owner": self.user_payload(World.OWNER_ID), "verify_key": "", "flags": 0, "team": None})
+
+    async def _put_commands(self, request):
+        commands, _ = await self._payload(request)
+        guild_id = request.match_info.get("guild_id")
+        return json_response([{**command, "id": str(snowflake()), "application_id": str(World.APPLICATION_ID), "version": str(snowflake()),
+                                   "guild_id": guild_id, "default_member_permissions": command.get("default_member_permissions")} for command in commands])
+
+    async def _create_channel(self, request):
+        payload, _ = await self._payload(request)
+        channel = self._channel(snowflake(), payload.get("name", "channel"), payload.get("type", 0), payload.get("parent_id"), payload.get("permission_overwrites") or ())
+        channel["topic"] = payload.get("topic")
+        await self.dispatch("CHANNEL_CREATE", channel)
+        return json_response(channel)
+
+    async def _edit_channel(self, request):
+        channel = self._channel_or_404(request)
+        payload, _ = await self._payload(request)
+        for key in ("name", "topic", "parent_id", "position", "permission_overwrites", "nsfw", "rate_limit_per_user"):
+            if key in payload:
+                channel[key] = payload[key]
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return json_response(channel)
+
+    async def _delete_channel(self, request):
+        channel = self._channel_or_404(request)
+        channel_id = int(channel["id"])
+        del self.channels[channel_id]
+        self._messages.pop(channel_id, None)
+        await self.dispatch("CHANNEL_DELETE", channel)
+        future = self._deleted.setdefault(channel_id, asyncio.get_running_loop().create_future())
+        if not future.done():
+            future.set_result(time.monotonic())
+        return json_response(channel)
+
+    async def _edit_permissions(self, request):
+        channel = self._channel_or_404(request)
+        payload, _ = await self._payload(request)
+        target = request.match_info["overwrite_id"]
+        overwrites = [overwrite for overwrite in channel["permission_overwrites"] if overwrite["id"] != target]
+        if request.method == "PUT":
+            overwrites.append({"id": target, "type": payload.get("type", 0), "allow": str(payload.get("allow", 0)), "deny": str(payload.get("deny", 0))})
+        channel["permission_overwrites"] = overwrites
+        await self.dispatch("CHANNEL_UPDATE", channel)
+        return web.Response(status=204)
+
+    async def _history(self, request):
+        channel = self._channel_or_404(request)
+        ids, messages = self._messages[int(channel["id"])]
+        limit = min(int(request.query.get("limit", 50)), 100)
+        if "after" in request.query: # The oldest 'limit' messages after the ID
+            start = bisect_right(ids, int(request.query["after"]))
+            page = messages[start:start + limit]
+        else: # The newest 'limit' messages before the ID
+            end = bisect_left(ids, int(request.query["before"])) if "before" in request.query else len(ids)
+            page = messages[max(end - limit, 0):end]
+        return json_response(page[::-1]) # Newest first, like Discord
+
+    async def _send_message(self, request):
+        channel = self._channel_or_404(request)
+        payload, attachments = await self._payload(request)
+        message = self._store_message(int(channel["id"]), World.BOT_ID, payload, attachments)
+        if channel["type"] != 1:
+            await self.dispatch("MESSAGE_CREATE", message)
+        return json_response(message)
+
+    def _message_or_404(self, request):
+        ids, messages = self._messages.get(int(request.match_info["channel_id"]), ((), ()))
+        message_id = int(request.match_info["message_id"])
+        index = bisect_left(ids, message_id)
+        if index == len(ids) or ids[index] != message_id:
+            raise not_found({"message": "Unknown Message", "code": 10008})
+        return index, ids, messages
+
+    async def _edit_message(self, request):
+        index, _, messages = self._message_or_404(request)
+        payload, _ = await self._payload(request)
+        messages[index].update({key: payload[key] for key in ("content", "embeds", "components", "flags") if key in payload}, edited_timestamp=now_iso())
+        return json_response(messages[index])
+
+    async def _delete_message(self, request):
+        index, ids, messages = self._message_or_404(request)
+        del ids[index], messages[index]
+        return web.Response(status=204)
+
+    async def _pin(self, request):
+        index, _, messages = self._message_or_404(request)
+        messages[index]["pinned"] = request.method == "PUT"
+        return web.Response(status=204)
+
+    async def _get_member(self, request):
+        member = self.members.get(int(request.match_info["user_id"]))
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return json_response(member)
+
+    async def _get_user(self, request):
+        return json_response(self.user_payload(int(request.match_info["user_id"])))
+
+    async def _create_dm(self, request):
+        payload, _ = await self._payload(request)
+        user_id = int(payload["recipient_id"])
+        for channel in self.channels.values():
+            if channel["type"] == 1 and channel["recipients"][0]["id"] == str(user_id):
+                return json_response(channel)
+        channel_id = snowflake()
+        self.channels[channel_id] = channel = {"id": str(channel_id), "type": 1, "last_message_id": None, "recipients": [self.user_payload(user_id)]}
+        self._messages[channel_id] = ([], [])
+        return json_response(channel)
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # THE INTERACTIONS
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    def _interaction_message(self, interaction, payload, attachments=()):
+        return {
+            "id": str(snowflake()), "channel_id": str(interaction.channel_id), "author": self.user_payload(World.BOT_ID, True),
+            "content": payload.get("content") or "", "timestamp": now_iso(), "edited_timestamp": None, "tts": False, "mention_everyone": False,
+            "mentions": [], "mention_roles": [], "attachments": list(attachments), "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [], "pinned": False, "type": 19, "flags": payload.get("flags") or 0,
+            "webhook_id": str(World.APPLICATION_ID), "interaction_metadata": {"id": str(interaction.id), "type": 2, "user": interaction.user},
+        }
+
+    async def _callback(self, request):
+        interaction = self._interactions.get(request.match_info["token"])
+        if interaction is None or interaction.responded:
+            return json_response({"message": "Interaction has already been acknowledged.", "code": 40060}, status=400)
+        if time.monotonic() - interaction.created > INTERACTION_TIMEOUT:
+            self.stats.expired_interactions += 1
+            await interaction.responses.put({"kind": "expired", "type": None, "data": None, "at": time.monotonic()})
+            return json_response({"message": "Unknown interaction", "code": 10062}, status=404)
+        body, attachments = await self._payload(request)
+        interaction.responded = True
+        callback_type, data = body.get("type"), body.get("data") or {}
+        resource = {"type": callback_type}
+        if callback_type in (4, 5): # A reply, or a defer ("thinking") that becomes the reply
+            interaction.original = resource["message"] = self._interaction_message(interaction, data, attachments)
+        await interaction.responses.put({"kind": "callback", "type": callback_type, "data": data, "at": time.monotonic()})
+        return json_response({"interaction": {"id": str(interaction.id), "type": 3, "activity_instance_id": None,
+                                                  "response_message_id": interaction.original and interaction.original["id"],
+                                                  "response_message_loading": callback_type == 5,
+                                                  "response_message_ephemeral": bool((data.get("flags") or 0) & 64)},
+                                  "resource": resource})
+
+    def _interaction_or_404(self, request):
+        interaction = self._interactions.get(request.match_info["token"])
+        if interaction is None or not interaction.responded:
+            raise not_found({"message": "Unknown Webhook", "code": 10015})
+        return interaction
+
+    async def _followup(self, request):
+        interaction = self._interaction_or_404(request)
+        payload, attachments = await self._payload(request)
+        message = self._interaction_message(interaction, payload, attachments)
+        await interaction.responses.put({"kind": "followup", "type": None, "data": payload, "at": time.monotonic()})
+        return json_response(message)
+
+    async def _original(self, request):
+        interaction = self._interaction_or_404(request)
+        if request.method == "DELETE":
+            return web.Response(status=204)
+        if request.method == "PATCH":
+            payload, attachments = await self._payload(request)
+            interaction.original = self._interaction_message(interaction, payload, attachments)
+            await interaction.responses.put({"kind": "edit", "type": None, "data": payload, "at": time.monotonic()})
+        return json_response(interaction.original or {})
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def _attachment(self, request):
+        size = int(request.query.get("size", 0))
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream", "Content-Length": str(size)})
+        await response.prepare(request)
+        while size > 0:
+            chunk = self._block[:min(size, len(self._block))]
+            await response.write(chunk)
+            size -= len(chunk)
+        return response
+
+    def _routes(self):
+        return [
+            web.get("/gateway-ws", self._gateway),
+            web.get("/attachments/{id}/{filename}", self._attachment),
+            web.get(API + "/users/@me", self._get_me),
+            web.post(API + "/users/@me/channels", self._create_dm),
+            web.get(API + "/users/{user_id}", self._get_user),
+            web.get(API + "/gateway", self._get_gateway),
+            web.get(API + "/gateway/bot", self._get_gateway),
+            web.get(API + "/applications/@me", self._get_application),
+            web.get(API + "/oauth2/applications/@me", self._get_application),
+            web.put(API + "/applications/{application_id}/commands", self._put_commands),
+            web.put(API + "/applications/{application_id}/guilds/{guild_id}/commands", self._put_commands),
+            web.post(API + "/guilds/{guild_id}/channels", self._create_channel),
+            web.get(API + "/guilds/{guild_id}/members/{user_id}", self._get_member),
+            web.patch(API + "/channels/{channel_id}", self._edit_channel),
+            web.delete(API + "/channels/{channel_id}", self._delete_channel),
+            web.put(API + "/channels/{channel_id}/permissions/{overwrite_id}", self._edit_permissions),
+            web.delete(API + "/channels/{channel_id}/permissions/{overwrite_id}", self._edit_permissions),
+            web.get(API + "/channels/{channel_id}/messages", self._history),
+            web.post(API + "/channels/{channel_id}/messages", self._send_message),
+            web.put(API + "/channels/{channel_id}/messages/pins/{message_id}", self._pin),
+            web.delete(API + "/channels/{channel_id}/messages/pins/{message_id}", self._pin),
+            web.put(API + "/channels/{channel_id}/pins/{message_id}", self._pin),
+            web.patch(API + "/channels/{channel_id}/messages/{message_id}", self._edit_message),
+            web.delete(API + "/channels/{channel_id}/messages/{message_id}", self._delete_message),
+            web.post(API + "/interactions/{interaction_id}/{token}/callback", self._callback),
+            web.post(API + "/webhooks/{application_id}/{token}", self._followup),
+            web.get(API + "/webhooks/{application_id}/{token}/messages/{message_id}", self._original),
+            web.patch(API + "/webhooks/{application_id}/{token}/messages/{message_id}", self._original),
+            web.delete(API + "/webhooks/{application_id}/{token}/messages/{message_id}", self._original),
+        ]
+
+    async def __aenter__(self):
+        app = web.Application(middlewares=[self._rest], client_max_size=100 * 1024 * 1024)
+        app.add_routes(self._routes())
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._ws is not None:
+            await self._ws.close()
+        await self._runner.cleanup()
@@ -0,0 +1,200 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE PLAYER OF THE REPLAY: IT PLAYS THE USERS AND THE STAFF OF A STREAM (SEE 'streams.py')
+AGAINST THE MOCK DISCORD AND MEASURES WHAT THEY WOULD SEE IN THEIR DISCORD CLIENT.
+
+- open:    THE USER PICKS "Assistance" IN THE TICKET MENU, GETS THE MODAL, FILLS IT ('think' SECONDS) AND SUBMITS IT, THEN
+           WAITS FOR THE MESSAGE WITH THE LINK OF THE NEW TICKET. THE TIME TO TICKET IS THE TIME THE USER WAITED FOR THE
+           BOT: FROM THE PICK TO THE MODAL PLUS FROM THE SUBMIT TO THE LINK (THE 'think' SECONDS ARE NOT INCLUDED).
+- message: THE USER WRITES IN THEIR TICKET.
+- close:   A STAFF MEMBER CLICKS THE CLOSE BUTTON OF THE TICKET, GETS THE MODAL AND SUBMITS IT. THE CLOSE REPLY IS THE TIME
+           THE STAFF MEMBER WAITED FOR THE BOT (CLICK TO MODAL PLUS SUBMIT TO REPLY), THE CLOSE LATENCY IS THE TIME FROM THE
+           SUBMIT TO THE DELETION OF THE CHANNEL (THE WHOLE CLOSE JOB, INCLUDING 'close_job_delete_delay').
+EVERY EVENT ENDS WITH AN OUTCOME ("ok" OR WHY IT FAILED: "expired" IS AN INTERACTION THE BOT ANSWERED TOO LATE, WHICH THE
+USER SEES AS "This interaction failed"; "timeout" IS AN ANSWER THAT NEVER CAME).
+"""
+
+import asyncio
+import collections
+import math
+import re
+import time
+
+from mock_discord import World
+
+TICKET_LINK = re.compile(r"<#(\d+)>")
+
+class Failure(Exception):
+    """
+    AN EVENT THAT DID NOT END AS A USER EXPECTS (THE MESSAGE IS ITS OUTCOME).
+    """
+
+def percentiles(seconds):
+    """
+    RETURNS THE COUNT, THE P50, P90, P99 AND THE MAXIMUM (IN MILLISECONDS, NEAREST RANK) OF A LIST OF DURATIONS IN SECONDS.
+    """
+    if not seconds:
+        return {"count": 0}
+    ordered = sorted(seconds)
+
+    def rank(q):
+        return round(ordered[max(math.ceil(q * len(ordered)) - 1, 0)] * 1000, 1)
+
+    return {"count": len(ordered), "p50_ms": rank(0.5), "p90_ms": rank(0.9), "p99_ms": rank(0.99), "max_ms": round(ordered[-1] * 1000, 1)}
+
+def modal_answers(components, values):
+    """
+    RETURNS THE COMPONENTS OF THE SUBMIT OF A MODAL (SAME LAYOUT AS THE MODAL SENT BY THE BOT), WITH THE GIVEN VALUES IN
+    ITS TEXT INPUTS.
+    """
+    values = iter(values)
+
+    def fill(component):
+        if component["type"] == 4: # Text input
+            return {"type": 4, "custom_id": component["custom_id"], "value": next(values, "-")}
+        if "components" in component: # Action row
+            return {"type": component["type"], "components": [fill(child) for child in component["components"]]}
+        if "component" in component: # Label
+            return {"type": component["type"], "component": fill(component["component"])}
+        return {"type": component["type"]}
+
+    return [fill(component) for component in components]
+
+class Player:
+    """
+    PLAYS THE EVENTS OF A STREAM AND COLLECTS THE RESULTS.
+
+    ATTRIBUTES:
+        TIME_TO_TICKET, CLOSE_REPLY, CLOSE_LATENCY: THE DURATIONS (SECONDS) OF THE SUCCESSFUL OPENS AND CLOSES.
+        OUTCOMES: COUNTER "KIND: OUTCOME" -> EVENTS.
+    """
+    def __init__(self, mock, timeout):
+        self.mock = mock
+        self.timeout = timeout
+        self.time_to_ticket = []
+        self.close_reply = []
+        self.close_latency = []
+        self.outcomes = collections.Counter()
+        self._tickets = {} # User ID -> future with the channel of their ticket (None if the open failed)
+        self._first_open = None
+        self._last_ticket = None
+        self._closes = (None, None) # When the first close was clicked and when the last channel was deleted
+
+    def _ticket(self, user):
+        if user not in self._tickets:
+            self._tickets[user] = asyncio.get_running_loop().create_future()
+        return self._tickets[user]
+
+    async def play(self, events, speed=1.0):
+        """
+        PLAYS THE EVENTS AT THEIR TIME ('speed' 2 PLAYS THEM TWICE AS FAST) AND WAITS FOR ALL OF THEM TO END.
+
+        RETURNS:
+            FLOAT: THE SECONDS FROM THE FIRST EVENT TO THE END OF THE LAST ONE.
+        """
+        start = time.monotonic()
+        tasks = []
+        for event in events:
+            delay = start + event["at"] / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(self._play(event)))
+        await asyncio.gather(*tasks)
+        return time.monotonic() - start
+
+    async def _play(self, event):
+        kind = event["kind"]
+        try:
+            await getattr(self, f"_{kind}")(event)
+            self.outcomes[f"{kind}: ok"] += 1
+        except asyncio.TimeoutError:
+            self.outcomes[f"{kind}: timeout"] += 1
+        except Failure as e:
+            self.outcomes[f"{kind}: {e}"] += 1
+
+    async def _expect(self, token, *callback_types):
+        response = await self.mock.next_response(token, self.timeout)
+        if response["kind"] == "expired":
+            raise Failure("expired")
+        if response["type"] not in callback_types:
+            raise Failure("error") # E.g. an error message instead of the modal
+        return response
+
+    async def _open(self, event):
+        user = event["user"]
+        ticket = self._tickets[user] = asyncio.get_running_loop().create_future() # A new ticket (the user may open another one later)
+        try:
+            started = time.monotonic()
+            self._first_open = self._first_open or started
+            token = await self.mock.interact(user, 3, {"custom_id": "ticket:open", "component_type": 3, "values": ["1"]}, World.SETUP_CHANNEL_ID, self.mock.setup_message)
+            modal = await self._expect(token, 9)
+            waited = modal["at"] - started
+
+            await asyncio.sleep(event.get("think", 0))
+            submitted = time.monotonic()
+            answers = modal_answers(modal["data"]["components"], (f"user{user % 100_000}", "I cannot log in to my account."))
+            token = await self.mock.interact(user, 5, {"custom_id": modal["data"]["custom_id"], "components": answers}, World.SETUP_CHANNEL_ID)
+            await self._expect(token, 5, 6) # The defer (creating the channel takes longer than the 3 seconds of the interaction)
+            while (response := await self.mock.next_response(token, self.timeout))["kind"] == "callback":
+                pass
+            content = (response["data"] or {}).get("content") or ""
+            link = TICKET_LINK.search(content)
+            if link is None:
+                raise Failure("error")
+            if "already" in content:
+                raise Failure("duplicate")
+            self.time_to_ticket.append(waited + response["at"] - submitted)
+            self._last_ticket = response["at"]
+            ticket.set_result(int(link.group(1)))
+        finally:
+            if not ticket.done():
+                ticket.set_result(None)
+
+    async def _message(self, event):
+        channel_id = await self._ticket(event["user"])
+        if channel_id is None:
+            raise Failure("no ticket")
+        if channel_id not in self.mock.channels:
+            raise Failure("ticket already closed")
+        await self.mock.user_message(event["user"], channel_id, event.get("text", "Hello"), event.get("attachment", 0))
+
+    async def _close(self, event):
+        channel_id = await self._ticket(event["user"])
+        if channel_id is None:
+            raise Failure("no ticket")
+        custom_id = f"ticket:close:{channel_id}"
+        message = self.mock.find_message(channel_id, custom_id)
+        if message is None:
+            raise Failure("no close button")
+
+        started = time.monotonic()
+        self._closes = (self._closes[0] or started, self._closes[1])
+        token = await self.mock.interact(World.STAFF_ID, 3, {"custom_id": custom_id, "component_type": 2}, channel_id, message)
+        modal = await self._expect(token, 9)
+        waited = modal["at"] - started
+
+        submitted = time.monotonic()
+        answers = modal_answers(modal["data"]["components"], (event.get("reason", "Solved"),))
+        token = await self.mock.interact(World.STAFF_ID, 5, {"custom_id": modal["data"]["custom_id"], "components": answers}, channel_id)
+        reply = await self._expect(token, 4)
+        self.close_reply.append(waited + reply["at"] - submitted)
+
+        deleted = await self.mock.wait_deleted(channel_id, self.timeout)
+        self.close_latency.append(deleted - submitted)
+        self._closes = (self._closes[0], max(self._closes[1] or deleted, deleted))
+
+    def results(self):
+        """
+        RETURNS THE RESULTS OF THE REPLAY: THE OUTCOMES, THE THROUGHPUT (TICKETS OPENED AND CLOSED PER SECOND, FROM THE FIRST
+        CLICK TO THE LAST TICKET) AND THE PERCENTILES OF THE DURATIONS.
+        """
+        opened, closed = len(self.time_to_ticket), len(self.close_latency)
+        open_span = (self._last_ticket - self._first_open) if opened else 0
+        close_span = (self._closes[1] - self._closes[0]) if closed else 0
+        return {
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "tickets_per_second": round(opened / open_span, 2) if open_span else None,
+            "closes_per_second": round(closed / close_span, 2) if close_span else None,
+            "time_to_ticket": percentiles(self.time_to_ticket),
+            "close_reply": percentiles(self.close_reply),
+            "close_latency": percentiles(self.close_latency),
+        }
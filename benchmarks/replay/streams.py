@@ -0,0 +1,68 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE INTERACTION STREAMS REPLAYED BY THE HARNESS.
+
+A STREAM IS A LIST OF EVENTS SORTED BY 'at' (SECONDS FROM THE START OF THE REPLAY), SAVED AS ONE JSON OBJECT PER LINE:
+    {"at": 0.42, "kind": "open", "user": 1001, "think": 6.1}
+        THE USER PICKS "Assistance" FROM THE TICKET MENU, FILLS THE MODAL IN 'think' SECONDS AND SUBMITS IT.
+    {"at": 15.0, "kind": "message", "user": 1001, "text": "Hello?", "attachment": 262144}
+        THE USER WRITES IN THEIR TICKET ('attachment' IS OPTIONAL: THE SIZE IN BYTES OF A FILE SENT WITH THE MESSAGE).
+    {"at": 40.3, "kind": "close", "user": 1001, "reason": "Solved"}
+        A STAFF MEMBER CLICKS THE CLOSE BUTTON OF THE TICKET OF THE USER AND SUBMITS THE CLOSE MODAL.
+A "message" OR "close" EVENT WAITS FOR THE TICKET OF ITS USER IF IT IS NOT OPEN YET. A RECORDED STREAM (E.G. REBUILT
+FROM THE LOGS OF A REAL SERVER) ONLY HAS TO BE WRITTEN IN THIS FORMAT TO BE REPLAYED.
+"""
+
+import json
+import random
+
+FIRST_USER_ID = 1_200_000_000_000_000_000
+
+def announcement(users=300, window=60.0, think=(2.0, 15.0), messages=2, attachment_every=0, attachment_size=256 * 1024, close_after=30.0, seed=1):
+    """
+    GENERATES THE STREAM OF AN ANNOUNCEMENT: 'users' USERS OPEN A TICKET IN 'window' SECONDS, MOST OF THEM IN THE FIRST
+    SECONDS (THE START TIMES FOLLOW A BETA(1, 3) DISTRIBUTION), WRITE 'messages' MESSAGES IN IT AND THE TICKET IS CLOSED
+    ABOUT 'close_after' SECONDS (+-20%) AFTER IT WAS OPENED (NEVER IF IT IS NONE).
+
+    ARGS:
+        THINK: THE SECONDS A USER TAKES TO FILL THE MODAL (A RANDOM VALUE BETWEEN THE TWO).
+        ATTACHMENT_EVERY: EVERY N-TH MESSAGE HAS A FILE OF 'attachment_size' BYTES (0 = NO FILES).
+        SEED: THE SEED OF THE RANDOM GENERATOR (THE SAME ARGUMENTS ALWAYS GENERATE THE SAME STREAM).
+
+    RETURNS:
+        LIST: THE EVENTS, SORTED BY 'at'.
+    """
+    rng = random.Random(seed)
+    events = []
+    written = 0
+    for number in range(users):
+        user = FIRST_USER_ID + number
+        opened = round(window * rng.betavariate(1, 3), 3)
+        modal = round(rng.uniform(*think), 3)
+        events.append({"at": opened, "kind": "open", "user": user, "think": modal})
+        life = close_after * rng.uniform(0.8, 1.2) if close_after is not None else 2.0 * (messages + 1) # The messages are spread over it
+        for index in range(messages):
+            written += 1
+            event = {"at": round(opened + modal + life * (index + 1) / (messages + 1), 3), "kind": "message", "user": user,
+                     "text": f"Message {index + 1} of the user {number}: I need help with my account."}
+            if attachment_every and written % attachment_every == 0:
+                event["attachment"] = attachment_size
+            events.append(event)
+        if close_after is not None:
+            events.append({"at": round(opened + modal + life, 3), "kind": "close", "user": user, "reason": "Solved"})
+    return sorted(events, key=lambda event: event["at"])
+
+def load(path):
+    """
+    READS A STREAM FROM A FILE (ONE JSON EVENT PER LINE) AND RETURNS ITS EVENTS SORTED BY 'at'.
+    """
+    with open(path, encoding="utf-8") as file:
+        events = [json.loads(line) for line in file if line.strip()]
+    return sorted(events, key=lambda event: event["at"])
+
+def save(events, path):
+    """
+    WRITES A STREAM TO A FILE (ONE JSON EVENT PER LINE), E.G. TO REPLAY EXACTLY THE SAME TRAFFIC AFTER A CHANGE.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        for event in events:
+            file.write(json.dumps(event) + "\n")
@@ -0,0 +1,7 @@
+"""
+THE BENCHMARK SUITE OF THE TICKET FLOW: A FAKE DISCORD ('fakes.py'), THE SCENARIOS THAT DRIVE THE REAL CODE OF THE BOT WITH
+SYNTHETIC DATA ('scenarios.py') AND THE RUNNER THAT COMPARES THE RESULTS WITH THE BASELINE ('__main__.py', 'baseline.json').
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/suite [--only open_ticket] [--update-baseline]
+"""
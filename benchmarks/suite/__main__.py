@@ -0,0 +1,111 @@
+"""
+IN THIS PYTHON FILE WE RUN THE BENCHMARK SUITE AND COMPARE THE RESULTS WITH THE BASELINE ('baseline.json').
+
+FOR EVERY SCENARIO (SEE 'scenarios.py') THE SCRIPT RECORDS THE WALL TIME PER OPERATION, THE PEAK MEMORY AND THE REST CALLS
+PER OPERATION. IT FAILS (EXIT CODE 1) IF, COMPARED TO THE BASELINE:
+- A SCENARIO MAKES MORE REST CALLS PER OPERATION (THE FAKE DISCORD IS DETERMINISTIC, SO ANY INCREASE IS A REGRESSION).
+- A SCENARIO IS SLOWER OR USES MORE MEMORY THAN THE BASELINE PLUS 'tolerance' (50% BY DEFAULT: THE TIMES DEPEND ON
+  THE MACHINE, SO ONLY A CLEAR REGRESSION FAILS; RECORD THE BASELINE ON THE MACHINE THAT RUNS THE COMPARISON). A TIME
+  THAT GREW BY LESS THAN 'MIN_DELTA_MS' IS NOT A REGRESSION (THE SUB-MILLISECOND OPERATIONS ARE DOMINATED BY NOISE).
+A SCENARIO THAT IS NOT IN THE BASELINE IS ONLY PRINTED, AND NOTHING IS COMPARED IF THE PARAMETERS ('--messages',
+'--attachments', '--latency', '--scale') ARE NOT THE ONES OF THE BASELINE. '--update-baseline' WRITES THE RESULTS AS THE
+NEW BASELINE.
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/suite [--only open_ticket close_job] [--messages 10000] [--attachments 500] [--update-baseline]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "src"))
+sys.path.insert(0, HERE)
+
+import discord
+from scenarios import SCENARIOS, measure
+
+BASELINE = os.path.join(HERE, "baseline.json")
+MESSAGES = 10_000 # Messages of the large ticket
+ATTACHMENTS = 500 # Messages of the large ticket with an attachment
+TOLERANCE = 0.5 # Allowed growth of the wall time and of the peak memory over the baseline (0.5 = +50%)
+MIN_DELTA_MS = 1.0 # A slower operation is only a regression if it takes at least this many more milliseconds
+
+def compare(name, result, baseline, tolerance):
+    """
+    PRINTS THE REGRESSIONS OF A SCENARIO AGAINST THE BASELINE AND RETURNS TRUE IF THERE IS ANY.
+    """
+    failed = False
+    if result["rest_calls_per_op"] > baseline["rest_calls_per_op"]:
+        print(f"[FAIL] {name}: {result['rest_calls_per_op']} REST calls per operation (baseline {baseline['rest_calls_per_op']})")
+        for route, count in result["rest_calls_by_route"].items():
+            if count > baseline["rest_calls_by_route"].get(route, 0):
+                print(f"    {route}: {count} (baseline {baseline['rest_calls_by_route'].get(route, 0)})")
+        failed = True
+    for key, unit, min_delta in (("wall_ms_per_op", "ms per operation", MIN_DELTA_MS), ("peak_kib", "KiB of peak memory", 0)):
+        if result[key] > baseline[key] * (1 + tolerance) and result[key] - baseline[key] >= min_delta:
+            print(f"[FAIL] {name}: {result[key]} {unit} (baseline {baseline[key]}, +{result[key] / baseline[key] - 1:.0%})")
+            failed = True
+    return failed
+
+async def run(options):
+    from transcript import shutdown_process_pool
+
+    parameters = {"messages": options.messages, "attachments": options.attachments, "latency": options.latency, "scale": options.scale}
+    baseline = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline, encoding="utf-8") as file:
+            recorded = json.load(file)
+        baseline = recorded["scenarios"]
+        if recorded["parameters"] != parameters and not options.update_baseline:
+            print(f"The parameters are not the ones of the baseline ({recorded['parameters']}): nothing is compared")
+            baseline = {}
+
+    results = {}
+    failed = False
+    try:
+        for name in options.only or SCENARIOS:
+            results[name] = result = await measure(name, options)
+            previous = baseline.get(name)
+            versus = "" if previous is None else f"  (baseline {previous['wall_ms_per_op']:.2f} ms, {previous['peak_kib']:.0f} KiB)"
+            print(f"{name:<18} {result['ops']:>4} ops  {result['wall_ms_per_op']:>10.2f} ms/op  {result['peak_kib']:>10.0f} KiB peak  "
+                  f"{result['rest_calls_per_op']:>7.2f} REST calls/op{versus}")
+            if previous is not None:
+                failed |= compare(name, result, previous, options.tolerance)
+    finally:
+        shutdown_process_pool()
+
+    report = {
+        "environment": {"python": platform.python_version(), "discord.py": discord.__version__, "platform": platform.platform()},
+        "parameters": parameters,
+        "scenarios": results,
+    }
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if options.update_baseline:
+        if baseline and options.only: # Keep the scenarios that were not run
+            report["scenarios"] = {**baseline, **results}
+        with open(options.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+            file.write("\n")
+        print(f"Baseline written to {options.baseline}")
+        return 0
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--messages", type=int, default=MESSAGES, help="messages of the large ticket")
+    parser.add_argument("--attachments", type=int, default=ATTACHMENTS, help="messages of the large ticket with an attachment")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of fake network latency of every REST call")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies the number of operations of every scenario")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed growth of the time and the memory (0.5 = +50%%)")
+    parser.add_argument("--baseline", default=BASELINE, help="the baseline to compare with (and to write with --update-baseline)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,228 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE FAKE DISCORD USED BY THE BENCHMARK SUITE.
+
+THE OBJECTS GIVEN TO THE BOT ARE REAL DISCORD.PY OBJECTS ('Interaction', 'Guild', 'TextChannel', 'Message', 'Attachment'):
+THE CODE OF THE BOT, DISCORD.PY AND CHAT_EXPORTER READ MANY OF THEIR ATTRIBUTES, SO A HAND-WRITTEN STAND-IN WOULD MEASURE
+SOMETHING ELSE THAN THE BOT. THEY ARE BUILT FROM SYNTHETIC PAYLOADS (LIKE THE GATEWAY WOULD SEND THEM) BY THE 'make_*'
+FUNCTIONS BELOW, AND ONLY THE NETWORK IS FAKE:
+- 'FakeDiscord' ANSWERS THE REST CALLS ('HTTPClient.request' AND 'AsyncWebhookAdapter.request') AFTER 'latency' SECONDS.
+  IT KEEPS THE MESSAGES OF THE CHANNELS (SO THE HISTORY CAN BE FETCHED PAGE BY PAGE) AND APPLIES THE CHANNEL CREATIONS AND
+  DELETIONS TO THE CACHE, LIKE THE GATEWAY EVENTS THAT FOLLOW THEM ON A REAL SERVER.
+- 'FileServer' IS A LOCAL HTTP SERVER THAT SERVES THE ATTACHMENTS (RANDOM BYTES OF THE SIZE WRITTEN IN THE URL).
+THE CALLS ARE COUNTED BY THE INSTRUMENTATION OF THE BOT (SEE 'src/metrics.py'), INSTALLED ON TOP OF THE FAKE.
+"""
+
+import asyncio
+import itertools
+import os
+
+import discord
+from aiohttp import web
+from discord.http import HTTPClient
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+GUILD_ID, STAFF_ROLE_ID, CATEGORY_ID, TRANSCRIPT_CHANNEL_ID, APPLICATION_ID, BOT_ID = 1000, 2000, 3000, 3001, 4000, 5000
+TIMESTAMP = "2024-01-01T00:00:00+00:00"
+
+ids = itertools.count(10**17) # Snowflakes: always increasing, like the real ones
+
+def user_payload(user_id, name=None):
+    name = name or f"user{user_id}"
+    return {"id": str(user_id), "username": name, "discriminator": "0", "avatar": None, "global_name": name}
+
+def member_payload(user_id, roles=()):
+    return {"user": user_payload(user_id), "roles": [str(role) for role in roles], "joined_at": TIMESTAMP, "deaf": False, "mute": False, "permissions": "0", "flags": 0}
+
+def channel_payload(channel_id, name, parent_id=None, overwrites=(), type=0):
+    return {"id": str(channel_id), "type": type, "guild_id": str(GUILD_ID), "name": name, "position": 0,
+            "parent_id": None if parent_id is None else str(parent_id), "permission_overwrites": list(overwrites), "nsfw": False}
+
+def attachment_payload(attachment_id, filename, size, content_type, base_url):
+    return {"id": str(attachment_id), "filename": filename, "size": size, "content_type": content_type,
+            "url": f"{base_url}/{attachment_id}/{filename}?size={size}", "proxy_url": f"{base_url}/{attachment_id}/{filename}?size={size}"}
+
+def message_payload(channel_id, content="", author_id=BOT_ID, embeds=(), components=(), attachments=()):
+    return {
+        "id": str(next(ids)), "channel_id": str(channel_id), "author": user_payload(author_id), "content": content,
+        "timestamp": TIMESTAMP, "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [],
+        "attachments": list(attachments), "embeds": list(embeds), "components": list(components), "pinned": False, "type": 0,
+    }
+
+class FakeDiscord:
+    """
+    THE FAKE DISCORD API.
+
+    ATTRIBUTES:
+        STATE: THE DISCORD.PY CONNECTION STATE OF THE FAKE CLIENT (THE CACHE WHERE THE GUILD AND THE CHANNELS LIVE).
+        LATENCY: THE SECONDS OF (FAKE) NETWORK LATENCY OF EVERY REST CALL.
+        MESSAGES: DICTIONARY CHANNEL ID -> PAYLOADS OF ITS MESSAGES (OLDEST FIRST), USED TO ANSWER THE HISTORY REQUESTS.
+    """
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.messages = {}
+        self.client = discord.Client(intents=discord.Intents.default())
+        self.state = self.client._connection
+        self.state.application_id = APPLICATION_ID
+        self.state.user = discord.ClientUser(state=self.state, data=user_payload(BOT_ID, "ticket-bot"))
+        self.state.http.token = "token" # Read by the interaction followups
+        self.guild = self.state._add_guild_from_data({
+            "id": str(GUILD_ID), "name": "Benchmark", "owner_id": "1", "member_count": 2, "features": [], "emojis": [], "stickers": [],
+            "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False},
+                      {"id": str(STAFF_ROLE_ID), "name": "Staff", "permissions": "8", "position": 1, "color": 0, "hoist": False, "managed": False, "mentionable": True}],
+            "channels": [channel_payload(CATEGORY_ID, "Tickets", type=4), channel_payload(TRANSCRIPT_CHANNEL_ID, "transcripts")],
+            "members": [], "voice_states": [], "presences": [], "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+        })
+
+    def install(self):
+        """
+        SENDS THE REST CALLS OF DISCORD.PY TO THIS FAKE (FOR THE WHOLE PROCESS).
+        """
+        fake = self
+
+        async def http_request(client, route, **kwargs):
+            return await fake.http_request(route, **kwargs)
+
+        async def webhook_request(adapter, route, session, **kwargs):
+            return await fake.webhook_request(route, **kwargs)
+
+        HTTPClient.request = http_request
+        AsyncWebhookAdapter.request = webhook_request
+
+    async def http_request(self, route, *, files=None, form=None, params=None, json=None, **kwargs):
+        """
+        THE CALLS MADE WITH THE BOT TOKEN.
+        """
+        await asyncio.sleep(self.latency)
+        payload = json or {}
+        method, path = route.method, route.path
+        if method == "POST" and path == "/guilds/{guild_id}/channels":
+            data = channel_payload(next(ids), payload.get("name", "channel"), payload.get("parent_id"), payload.get("permission_overwrites", []))
+            self.state.parse_channel_create(data) # The CHANNEL_CREATE event of the gateway
+            return data
+        if method == "PATCH" and path == "/channels/{channel_id}":
+            channel = self.guild.get_channel(route.channel_id)
+            data = channel_payload(route.channel_id, payload.get("name", channel.name), payload.get("parent_id", channel.category_id), payload.get("permission_overwrites", []))
+            self.state.parse_channel_update(data)
+            return data
+        if method == "DELETE" and path == "/channels/{channel_id}":
+            channel = self.guild.get_channel(route.channel_id)
+            if channel is not None:
+                self.state.parse_channel_delete(channel_payload(channel.id, channel.name, channel.category_id))
+            return None
+        if method == "GET" and path == "/channels/{channel_id}/messages":
+            return self.history_page(route.channel_id, **params)
+        if method == "POST" and path == "/channels/{channel_id}/messages":
+            return message_payload(route.channel_id, payload.get("content") or "", embeds=payload.get("embeds") or (), components=payload.get("components") or ())
+        if method == "POST" and path == "/users/@me/channels":
+            return {"id": str(next(ids)), "type": 1, "recipients": [user_payload(int(payload["recipient_id"]))]}
+        if method == "GET" and path == "/guilds/{guild_id}/members/{member_id}":
+            return member_payload(int(route.url.rsplit("/", 1)[1]))
+        return None # PUT pins, PUT permissions, ...
+
+    async def webhook_request(self, route, *, payload=None, **kwargs):
+        """
+        THE INTERACTION RESPONSES AND FOLLOWUPS.
+        """
+        await asyncio.sleep(self.latency)
+        if route.path.endswith("/callback"):
+            return {"interaction": {"id": str(route.webhook_id), "type": 5, "activity_instance_id": None, "response_message_id": None,
+                                    "response_message_loading": False, "response_message_ephemeral": True}}
+        return message_payload(next(ids), (payload or {}).get("content") or "")
+
+    def history_page(self, channel_id, limit=100, before=None, after=None, around=None):
+        """
+        RETURNS A PAGE OF THE HISTORY OF A CHANNEL, NEWEST FIRST, LIKE 'GET /channels/{channel_id}/messages?before=...'.
+        """
+        messages = self.messages.get(channel_id, [])
+        end = len(messages)
+        if before is not None:
+            lo, hi = 0, len(messages)
+            while lo < hi: # The messages are sorted by ID: binary search of the first one >= 'before'
+                mid = (lo + hi) // 2
+                if int(messages[mid]["id"]) < int(before):
+                    lo = mid + 1
+                else:
+                    hi = mid
+            end = lo
+        return messages[max(end - limit, 0):end][::-1]
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # OBJECTS
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    def make_channel(self, name="ticket-user", parent_id=CATEGORY_ID):
+        """
+        RETURNS A NEW TEXT CHANNEL OF THE GUILD (ALREADY IN THE CACHE).
+        """
+        channel_id = next(ids)
+        self.state.parse_channel_create(channel_payload(channel_id, name, parent_id))
+        return self.guild.get_channel(channel_id)
+
+    def make_attachment(self, filename, size, content_type, base_url):
+        """
+        RETURNS THE PAYLOAD OF AN ATTACHMENT SERVED BY THE 'FileServer' AT 'base_url'.
+        """
+        return attachment_payload(next(ids), filename, size, content_type, base_url)
+
+    def fill_channel(self, channel, messages, attachments, base_url, attachment_size=64 * 1024, authors=(10, 11)):
+        """
+        WRITES 'messages' MESSAGES IN THE CHANNEL, 'attachments' OF THEM (SPREAD EVENLY) WITH AN ATTACHMENT, ALTERNATING
+        IMAGES, VIDEOS AND OTHER FILES. ONLY THE PAYLOADS ARE STORED: THE BOT BUILDS THE MESSAGES WHEN IT FETCHES THE HISTORY.
+        """
+        kinds = (("image.png", "image/png"), ("clip.mp4", "video/mp4"), ("log.txt", "text/plain"))
+        every = messages // attachments if attachments else 0
+        history = self.messages.setdefault(channel.id, [])
+        for number in range(messages):
+            files = []
+            if every and number % every == 0 and number // every < attachments:
+                filename, content_type = kinds[(number // every) % len(kinds)]
+                files.append(self.make_attachment(filename, attachment_size, content_type, base_url))
+            history.append(message_payload(channel.id, f"Message number {number} of the ticket, with some text to render.", authors[number % len(authors)], attachments=files))
+
+    def make_interaction(self, user_id, type, data, channel_id=CATEGORY_ID, roles=()):
+        """
+        RETURNS AN INTERACTION OF THE GIVEN TYPE (3 = COMPONENT, 5 = MODAL SUBMIT) MADE BY A MEMBER OF THE GUILD.
+        """
+        return discord.Interaction(data={
+            "id": str(next(ids)), "application_id": str(APPLICATION_ID), "type": type, "token": "token", "version": 1,
+            "guild_id": str(GUILD_ID), "channel_id": str(channel_id), "channel": {"id": str(channel_id), "type": self.guild.get_channel(channel_id).type.value}, "member": member_payload(user_id, roles), "locale": "en-US",
+            "guild_locale": "en-US", "data": data, "entitlements": [], "authorizing_integration_owners": {}, "app_permissions": "0",
+            "attachment_size_limit": 10 * 1024 * 1024,
+        }, state=self.state)
+
+class FileServer:
+    """
+    A LOCAL HTTP SERVER THAT ANSWERS 'GET /<id>/<filename>?size=N' WITH N BYTES (THE ATTACHMENTS OF THE FAKE MESSAGES).
+
+    USAGE:
+        async with FileServer() as files:
+            fake.fill_channel(channel, 10_000, 500, files.url)
+    """
+    def __init__(self):
+        self.url = None
+        self._runner = None
+        self._block = os.urandom(1024 * 1024)
+
+    async def _serve(self, request):
+        size = int(request.query.get("size", 0))
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream", "Content-Length": str(size)})
+        await response.prepare(request)
+        while size > 0:
+            chunk = self._block[:min(size, len(self._block))]
+            await response.write(chunk)
+            size -= len(chunk)
+        return response
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/{id}/{filename}", self._serve)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._runner.cleanup()
@@ -0,0 +1,235 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE SCENARIOS OF THE BENCHMARK SUITE: THE TICKET FLOW OF THE BOT, DRIVEN WITH SYNTHETIC DATA.
+
+EVERY SCENARIO RUNS IN A NEW 'World' (A FAKE DISCORD, AN EMPTY DATABASE AND EMPTY ARCHIVE FOLDERS) AND IS SPLIT IN TWO:
+THE PREPARATION (NOT MEASURED, E.G. FILLING A CHANNEL WITH 10K MESSAGES) AND THE MEASURED PART, WHICH REPEATS THE
+OPERATION 'ops' TIMES. 'measure' RUNS EVERY SCENARIO TWICE: ONCE FOR THE WALL TIME AND ONCE WITH TRACEMALLOC FOR THE PEAK
+MEMORY (TRACEMALLOC SLOWS PYTHON DOWN, SO THE TWO ARE NOT MEASURED TOGETHER). THE PEAK MEMORY IS THE ONE OF THE BOT
+PROCESS: THE HTML REWRITE RUNS IN A WORKER PROCESS AND IS NOT INCLUDED.
+
+THE SCENARIOS:
+- open_ticket:        'Assistance.on_submit' FOR A NEW USER (A NEW TICKET EVERY TIME).
+- close_button:       'CloseTicketButton.callback' CLICKED BY A STAFF MEMBER (IT ANSWERS WITH THE CLOSE MODAL).
+- close_modal:        'CloseTicketButtonModal.on_submit' (CLOSES THE TICKET AND QUEUES ITS CLOSE JOB).
+- modify_transcript:  'modify_transcript_with_attachments' ON THE TRANSCRIPT OF THE LARGE TICKET (ITS RESULT IS CHECKED
+                      FIRST, SEE 'check_attachments').
+- close_job:          THE WHOLE CLOSE JOB OF THE LARGE TICKET (HISTORY, HTML, DOWNLOADS, REWRITE, ARCHIVE, DELIVERY, DELETE).
+THE "LARGE TICKET" HAS 'messages' MESSAGES, 'attachments' OF THEM WITH A FILE.
+"""
+
+import dataclasses
+import gc
+import os
+import re
+import tempfile
+import time
+import tracemalloc
+
+from fakes import CATEGORY_ID, GUILD_ID, STAFF_ROLE_ID, TRANSCRIPT_CHANNEL_ID, FakeDiscord, FileServer
+
+STAFF_ID, OWNER_ID = 10, 11 # The staff member who closes the tickets and the owner of the large ticket
+
+class World:
+    """
+    A FRESH ENVIRONMENT FOR ONE RUN OF A SCENARIO: THE FAKE DISCORD, THE FILE SERVER OF THE ATTACHMENTS, AND THE DATABASE,
+    THE ATTACHMENT STORE AND THE TRANSCRIPT ARCHIVE OF THE BOT IN A TEMPORARY FOLDER.
+    """
+    def __init__(self, latency):
+        self.fake = FakeDiscord(latency)
+        self.files = FileServer()
+        self._folder = None
+
+    async def __aenter__(self):
+        from attachment_store import store
+        from close_jobs import close_jobs
+        from database import db
+        from metrics import install_rest_call_counter
+        from settings import settings
+        from transcript_archive import archive
+
+        self._folder = tempfile.TemporaryDirectory()
+        self.fake.install()
+        install_rest_call_counter() # On top of the fake, like on top of the real network
+        await self.files.__aenter__()
+
+        db.path = os.path.join(self._folder.name, "ticket.db")
+        store.root = os.path.join(self._folder.name, "attachments")
+        archive.root = os.path.join(self._folder.name, "transcripts")
+        os.makedirs(archive.root)
+        await db.connect()
+        close_jobs.bot = self.fake.client
+        settings.current = dataclasses.replace(settings.current, guild_id=GUILD_ID, staff_role_ids=frozenset({STAFF_ROLE_ID}),
+                                               ticket_categories={"1": CATEGORY_ID}, ticket_category_ids=frozenset({CATEGORY_ID}),
+                                               transcript_channel_id=TRANSCRIPT_CHANNEL_ID)
+        return self
+
+    async def __aexit__(self, *exc):
+        from database import db
+
+        await db.close()
+        await self.files.__aexit__(*exc)
+        self._folder.cleanup()
+
+    async def open_tickets(self, count):
+        """
+        CREATES 'count' OPEN TICKETS (CHANNEL AND DATABASE ROW) AND RETURNS THEIR CHANNELS.
+        """
+        from database import db
+
+        channels = []
+        for number in range(count):
+            channel = self.fake.make_channel(f"ticket-user{100 + number}")
+            await db.create_ticket(channel.name, channel.id, "Tickets", CATEGORY_ID, f"user{100 + number}", 100 + number, int(time.time()))
+            channels.append(channel)
+        return channels
+
+    async def large_ticket(self, messages, attachments):
+        """
+        CREATES THE LARGE TICKET (OPENED BY 'OWNER_ID') AND RETURNS ITS CHANNEL.
+        """
+        from database import db
+
+        channel = self.fake.make_channel(f"ticket-user{OWNER_ID}")
+        self.fake.fill_channel(channel, messages, attachments, self.files.url, authors=(STAFF_ID, OWNER_ID))
+        await db.create_ticket(channel.name, channel.id, "Tickets", CATEGORY_ID, f"user{OWNER_ID}", OWNER_ID, int(time.time()))
+        return channel
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# SCENARIOS: EACH ONE PREPARES THE WORLD AND RETURNS THE COROUTINE FUNCTION TO MEASURE
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+async def open_ticket(world, ops, options):
+    from classes import Assistance
+
+    async def run():
+        for number in range(ops):
+            modal = Assistance(CATEGORY_ID)
+            modal.children[0]._value = "nickname"
+            modal.children[1]._value = "problem"
+            await modal.on_submit(world.fake.make_interaction(1000 + number, 5, {"custom_id": "assistance", "components": []}))
+    return run
+
+async def close_button(world, ops, options):
+    from classes import CloseTicketButton
+
+    channels = await world.open_tickets(ops)
+
+    async def run():
+        for channel in channels:
+            custom_id = f"ticket:close:{channel.id}"
+            interaction = world.fake.make_interaction(STAFF_ID, 3, {"custom_id": custom_id, "component_type": 2}, channel.id, roles=(STAFF_ROLE_ID,))
+            await CloseTicketButton(channel.id).callback(interaction)
+    return run
+
+async def close_modal(world, ops, options):
+    from classes import CloseTicketButtonModal
+
+    channels = await world.open_tickets(ops)
+
+    async def run():
+        for channel in channels:
+            modal = CloseTicketButtonModal()
+            modal.children[0]._value = "Ticket resolved"
+            await modal.on_submit(world.fake.make_interaction(STAFF_ID, 5, {"custom_id": "close", "components": []}, channel.id, roles=(STAFF_ROLE_ID,)))
+    return run
+
+def check_attachments(transcript, modified, markup):
+    """
+    CHECKS THE REWRITE OF A REAL CHAT_EXPORTER DOCUMENT, WHICH DOES NOT LOOK LIKE THE SYNTHETIC ONE OF
+    'benchmarks/html_rewrite.py' (UNQUOTED ATTRIBUTES LIKE '<div class=chatlog__attachment>', AND NEVER A
+    'chatlog__attachments' DIV): THE MARKUP OF EVERY MESSAGE IS ADDED ONCE, INSIDE THAT MESSAGE (BEFORE THE NEXT ONE
+    STARTS), AND THE REST OF THE DOCUMENT IS UNCHANGED. RAISES ASSERTIONERROR OTHERWISE.
+    """
+    text = modified.decode("utf-8")
+    starts = [(found.start(), found.group(1)) for found in re.finditer(r'<div id="chatlog__message-container-(\d+)"', text)]
+    checked = 0
+    for index, (start, message_id) in enumerate(starts):
+        html = markup.get(message_id)
+        if html is None:
+            continue
+        end = starts[index + 1][0] if index + 1 < len(starts) else len(text)
+        assert text.count(html, start, end) == 1, f"the attachments of the message {message_id} are not in the message"
+        checked += 1
+    assert checked == len(markup) > 0, f"{checked} of {len(markup)} messages with attachments found in the transcript"
+
+    for html in markup.values():
+        text = text.replace(f'<div class="chatlog__attachments">{html}</div>', "", 1)
+    assert text == transcript, "the rewrite changed the transcript outside the attachments"
+
+async def modify_transcript(world, ops, options):
+    from close_jobs import modify_transcript_with_attachments
+    from transcript import attachment_markup, download_attachments, fetch_history, render_transcript
+
+    channel = await world.large_ticket(options.messages, options.attachments)
+    history = await fetch_history(channel)
+    transcript = await render_transcript(channel, history)
+    files = await download_attachments(history)
+    modified = await modify_transcript_with_attachments(transcript, history, files) # Starts the worker processes (once per bot)
+    check_attachments(transcript, modified, attachment_markup(history, files))
+
+    async def run():
+        for _ in range(ops):
+            await modify_transcript_with_attachments(transcript, history, files)
+    return run
+
+async def close_job(world, ops, options):
+    from close_jobs import close_jobs
+    from database import db
+
+    jobs = []
+    for _ in range(ops):
+        channel = await world.large_ticket(options.messages, options.attachments)
+        jobs.append(await db.queue_close(channel.id, GUILD_ID, f"user{STAFF_ID}", STAFF_ID, "Ticket resolved", int(time.time())))
+
+    async def run():
+        for job_id in jobs:
+            await close_jobs.run(job_id) # Lock, transcript and delivery (then the job waits 'close_job_delete_delay')
+            await close_jobs.run(job_id) # Delete
+    return run
+
+SCENARIOS = {
+    "open_ticket": (open_ticket, 50),
+    "close_button": (close_button, 50),
+    "close_modal": (close_modal, 50),
+    "modify_transcript": (modify_transcript, 3),
+    "close_job": (close_job, 1),
+}
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+async def _run_once(scenario, ops, options, traced):
+    from metrics import rest_calls
+
+    async with World(options.latency) as world:
+        run = await scenario(world, ops, options)
+        gc.collect()
+        if traced:
+            tracemalloc.start()
+        with rest_calls.scope() as calls:
+            start = time.perf_counter()
+            await run()
+            elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if traced else None
+        if traced:
+            tracemalloc.stop()
+    return elapsed, peak, calls
+
+async def measure(name, options):
+    """
+    RUNS THE SCENARIO (ONCE TIMED, ONCE TRACED) AND RETURNS ITS RESULT.
+
+    RETURNS:
+        DICT: THE NUMBER OF OPERATIONS, THE WALL TIME PER OPERATION, THE PEAK MEMORY (OF ALL THE OPERATIONS) AND THE REST
+        CALLS PER OPERATION (TOTAL AND BY ROUTE).
+    """
+    scenario, ops = SCENARIOS[name]
+    ops = max(1, round(ops * options.scale))
+    elapsed, _, calls = await _run_once(scenario, ops, options, traced=False)
+    _, peak, _ = await _run_once(scenario, ops, options, traced=True)
+    return {
+        "ops": ops,
+        "wall_ms_per_op": round(elapsed * 1000 / ops, 3),
+        "peak_kib": round(peak / 1024, 1),
+        "rest_calls_per_op": round(calls.total / ops, 2),
+        "rest_calls_by_route": {route: round(count / ops, 2) for route, count in sorted(calls.by_route.items())},
+    }
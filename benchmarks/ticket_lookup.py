@@ -0,0 +1,97 @@
+"""
+IN THIS PYTHON FILE WE MEASURE HOW THE TICKET LOOKUPS SCALE WITH THE SIZE OF THE 'ticket' TABLE.
+
+THE SCRIPT BUILDS A TEMPORARY DATABASE WITH THE REAL MIGRATIONS (SEE 'src/migrations.py'), FILLS IT WITH CLOSED TICKETS
+(10K, 100K AND 1M ROWS) PLUS A FEW OPEN ONES, AND TIMES THE SAME QUERIES USED BY THE BOT (SEE 'src/database.py').
+IT FAILS (EXIT CODE 1) IF:
+- A LOOKUP DOES NOT USE AN INDEX (THE QUERY PLAN CONTAINS A FULL 'SCAN ticket').
+- THE AVERAGE LOOKUP TIME AT 1M ROWS IS MORE THAN 'MAX_GROWTH' TIMES THE ONE AT 10K ROWS (I.E. THE COST IS NOT FLAT).
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/ticket_lookup.py
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from migrations import apply_migrations # The real schema of the bot
+
+SIZES = (10_000, 100_000, 1_000_000) # Number of rows in the table for each round
+LOOKUPS = 5_000 # Number of lookups timed for each query and size
+MAX_GROWTH = 3.0 # Maximum allowed ratio between the lookup time at 1M rows and at 10k rows
+OPEN_TICKETS = 50 # Number of open tickets mixed with the closed ones
+
+# THE SAME QUERIES USED BY 'src/database.py'
+QUERIES = {
+    "open ticket by channel": "SELECT * FROM ticket WHERE ticketid = ? AND statusticket = 'open'",
+    "ticket by channel": "SELECT * FROM ticket WHERE ticketid = ? ORDER BY id DESC LIMIT 1",
+}
+
+def fill(conn, start, stop):
+    """
+    INSERTS THE CLOSED TICKETS WITH ID IN [start, stop) (CHANNEL AND USER IDS ARE DERIVED FROM THE ROW NUMBER).
+    """
+    rows = ((f"ticket-{i}", 10**17 + i, "Assistance", 1, f"user{i % 50_000}", 10**16 + i % 50_000, "staff", 1, 1_704_067_200 + i * 60, 1_704_070_800 + i * 60, "closed") for i in range(start, stop))
+    with conn:
+        conn.executemany("""INSERT INTO ticket (ticketname, ticketid, categoryname, categoryid, openername, openerid, closurename, closureid, openedat, closedat, statusticket) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+
+def time_query(conn, sql, keys):
+    """
+    RETURNS THE AVERAGE TIME (IN MICROSECONDS) OF ONE EXECUTION OF 'sql' OVER ALL THE 'keys'.
+    """
+    start = time.perf_counter()
+    for key in keys:
+        conn.execute(sql, (key,)).fetchall()
+    return (time.perf_counter() - start) / len(keys) * 1_000_000
+
+def main():
+    failed = False
+
+    with tempfile.TemporaryDirectory() as folder:
+        conn = sqlite3.connect(os.path.join(folder, "ticket.db"))
+        apply_migrations(conn)
+
+        # A FEW OPEN TICKETS THAT THE LOOKUPS WILL HIT
+        with conn:
+            conn.executemany("""INSERT INTO ticket (ticketname, ticketid, categoryname, categoryid, openername, openerid, closurename, closureid, openedat, closedat, statusticket) VALUES (?, ?, ?, ?, ?, ?, '', '', ?, NULL, 'open')""",
+                             [(f"ticket-open{i}", 9 * 10**17 + i, "Assistance", 1, f"open{i}", 9 * 10**16 + i, 1_704_067_200) for i in range(OPEN_TICKETS)])
+
+        for sql in QUERIES.values():
+            plan = " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", (0,)))
+            if "USING" not in plan:
+                print(f"[FAIL] no index used: {sql}\n       plan: {plan}")
+                failed = True
+
+        results = {}
+        inserted = 0
+        for size in SIZES:
+            fill(conn, inserted, size)
+            inserted = size
+            conn.execute("ANALYZE")
+
+            keys = {
+                "open ticket by channel": [9 * 10**17 + i % OPEN_TICKETS for i in range(LOOKUPS)],
+                "ticket by channel": [10**17 + (i * 7919) % size for i in range(LOOKUPS)],
+            }
+            for name, sql in QUERIES.items():
+                results[(name, size)] = time_query(conn, sql, keys[name])
+
+        conn.close()
+
+    print(f"{'query':<26}" + "".join(f"{size:>12,} rows" for size in SIZES) + "      growth")
+    for name in QUERIES:
+        timings = [results[(name, size)] for size in SIZES]
+        growth = timings[-1] / timings[0]
+        print(f"{name:<26}" + "".join(f"{t:>15.2f}us" for t in timings) + f"{growth:>11.2f}x")
+        if growth > MAX_GROWTH:
+            print(f"[FAIL] '{name}' is {growth:.2f}x slower at {SIZES[-1]:,} rows (max {MAX_GROWTH}x)")
+            failed = True
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
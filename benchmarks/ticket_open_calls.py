@@ -0,0 +1,187 @@
+"""
+IN THIS PYTHON FILE WE COUNT THE DISCORD REST CALLS MADE TO OPEN A TICKET, SO A CHANGE THAT ADDS CALLS IS NOTICED.
+
+THE SCRIPT RUNS THE REAL 'Assistance.on_submit' (SEE 'src/classes.py') WITH REAL DISCORD.PY OBJECTS (GUILD, CHANNELS,
+INTERACTION, ...). ONLY THE NETWORK IS REPLACED: 'HTTPClient.request' AND 'AsyncWebhookAdapter.request' ANSWER WITH
+FAKE PAYLOADS AFTER 'LATENCY' SECONDS, AND THE CALLS ARE COUNTED BY THE SAME INSTRUMENTATION USED BY THE BOT
+(SEE 'src/metrics.py'). IT FAILS (EXIT CODE 1) IF:
+- OPENING A TICKET TAKES MORE THAN 'MAX_CALLS' REST CALLS, OR A ROUTE IS CALLED MORE THAN EXPECTED.
+- THE USER WHO ALREADY HAS A TICKET COSTS MORE THAN 'MAX_CALLS_EXISTING' REST CALLS.
+- WITH A CHANNEL READY IN THE POOL (SEE 'src/channel_pool.py'), OPENING A TICKET CREATES A CHANNEL OR TAKES MORE THAN
+  'MAX_CALLS' REST CALLS (THE CHANNEL CREATION IS REPLACED BY ONE EDIT OF THE POOLED CHANNEL).
+- A VIEW IS KEPT IN MEMORY FOR THE OPEN TICKETS (THE CLOSE BUTTON MUST BE A DYNAMIC ITEM, SEE 'src/classes.py').
+
+THE IDS OF 'src/config.py' ARE REPLACED WITH THE ONES OF THE FAKE GUILD (THE STAFF ROLE AND THE TICKET CATEGORY).
+
+RUN IT FROM THE ROOT OF THE REPOSITORY:
+    python benchmarks/ticket_open_calls.py
+"""
+
+import asyncio
+import dataclasses
+import itertools
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import discord
+from discord.http import HTTPClient
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+LATENCY = 0.05 # Seconds of (fake) network latency for every REST call
+MAX_CALLS = 5 # Defer, create channel, welcome message, followup, pin
+MAX_CALLS_EXISTING = 2 # Defer, followup
+EXPECTED_ROUTES = {
+    "POST /interactions/{webhook_id}/{webhook_token}/callback": 1,
+    "POST /guilds/{guild_id}/channels": 1,
+    "POST /channels/{channel_id}/messages": 1,
+    "POST /webhooks/{webhook_id}/{webhook_token}": 1,
+}
+EXPECTED_POOLED_ROUTES = dict(EXPECTED_ROUTES, **{"POST /guilds/{guild_id}/channels": 0, "PATCH /channels/{channel_id}": 1})
+
+GUILD_ID, STAFF_ROLE_ID, CATEGORY_ID, APPLICATION_ID, BOT_ID = 1000, 2000, 3000, 4000, 5000
+ids = itertools.count(10**17)
+
+def user_payload(user_id, name):
+    return {"id": str(user_id), "username": name, "discriminator": "0", "avatar": None, "global_name": name}
+
+def message_payload(channel_id, content="", embeds=(), components=()):
+    return {
+        "id": str(next(ids)), "channel_id": str(channel_id), "author": user_payload(BOT_ID, "ticket-bot"), "content": content,
+        "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False, "mention_everyone": False,
+        "mentions": [], "mention_roles": [], "attachments": [], "embeds": list(embeds), "components": list(components),
+        "pinned": False, "type": 0,
+    }
+
+async def fake_http_request(self, route, *, files=None, form=None, **kwargs):
+    """
+    THE FAKE DISCORD API FOR THE CALLS MADE WITH THE BOT TOKEN.
+    """
+    await asyncio.sleep(LATENCY)
+    payload = kwargs.get("json") or {}
+    if route.method == "POST" and route.path == "/guilds/{guild_id}/channels":
+        return {"id": str(next(ids)), "type": 0, "guild_id": str(GUILD_ID), "name": payload.get("name", "channel"), "position": 0,
+                "parent_id": payload.get("parent_id"), "permission_overwrites": payload.get("permission_overwrites", []), "nsfw": False}
+    if route.method == "PATCH" and route.path == "/channels/{channel_id}":
+        return {"id": str(route.channel_id), "type": 0, "guild_id": str(GUILD_ID), "name": payload.get("name", "channel"), "position": 0,
+                "parent_id": str(CATEGORY_ID), "permission_overwrites": payload.get("permission_overwrites", []), "nsfw": False}
+    if route.method == "POST" and route.path == "/channels/{channel_id}/messages":
+        return message_payload(route.channel_id, payload.get("content") or "", payload.get("embeds") or (), payload.get("components") or ())
+    return None # PUT pins, PATCH permissions, ...
+
+async def fake_webhook_request(self, route, session, *, payload=None, multipart=None, files=None, params=None, **kwargs):
+    """
+    THE FAKE DISCORD API FOR THE INTERACTION RESPONSES AND FOLLOWUPS.
+    """
+    await asyncio.sleep(LATENCY)
+    if route.path.endswith("/callback"):
+        return {"interaction": {"id": str(route.webhook_id), "type": 5, "activity_instance_id": None, "response_message_id": None,
+                                "response_message_loading": False, "response_message_ephemeral": True}}
+    return message_payload(next(ids), (payload or {}).get("content") or "")
+
+def build_state():
+    """
+    RETURNS A CONNECTION STATE WITH A GUILD (A STAFF ROLE AND A TICKET CATEGORY) AND A MEMBER, LIKE THE GATEWAY WOULD.
+    """
+    bot = discord.Client(intents=discord.Intents.all())
+    state = bot._connection
+    state.application_id = APPLICATION_ID
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID, "ticket-bot"))
+    state._add_guild_from_data({
+        "id": str(GUILD_ID), "name": "Benchmark", "owner_id": "1", "member_count": 2, "features": [], "emojis": [], "stickers": [],
+        "roles": [{"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False},
+                  {"id": str(STAFF_ROLE_ID), "name": "Staff", "permissions": "8", "position": 1, "color": 0, "hoist": False, "managed": False, "mentionable": True}],
+        "channels": [{"id": str(CATEGORY_ID), "type": 4, "name": "Tickets", "position": 0, "permission_overwrites": []}],
+        "members": [], "voice_states": [], "presences": [], "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+    })
+    return bot, state
+
+def build_interaction(state, user_id):
+    member = {"user": user_payload(user_id, f"user{user_id}"), "roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "permissions": "0", "flags": 0}
+    return discord.Interaction(data={
+        "id": str(next(ids)), "application_id": str(APPLICATION_ID), "type": 5, "token": "token", "version": 1,
+        "guild_id": str(GUILD_ID), "channel_id": str(CATEGORY_ID), "member": member, "locale": "en-US", "guild_locale": "en-US",
+        "data": {"custom_id": "assistance", "components": []}, "entitlements": [], "authorizing_integration_owners": {}, "app_permissions": "0", "attachment_size_limit": 10 * 1024 * 1024,
+    }, state=state)
+
+async def open_ticket(state, user_id):
+    from classes import Assistance
+    from metrics import rest_calls
+
+    modal = Assistance(CATEGORY_ID)
+    modal.children[0]._value = "nickname"
+    modal.children[1]._value = "problem"
+    with rest_calls.scope() as calls:
+        start = time.perf_counter()
+        await modal.on_submit(build_interaction(state, user_id))
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+def report(title, calls, elapsed, expected_routes):
+    """
+    PRINTS THE CALLS MADE TO OPEN A TICKET AND RETURNS TRUE IF THEY ARE MORE THAN EXPECTED.
+    """
+    failed = False
+    print(f"{title} {calls.total} REST calls in {elapsed:.3f}s ({elapsed / LATENCY:.1f}x the latency of one call)")
+    for route, count in sorted(calls.by_route.items()):
+        print(f"    {count} x {route}")
+    if calls.total > MAX_CALLS:
+        print(f"[FAIL] opening a ticket takes {calls.total} REST calls (max {MAX_CALLS})")
+        failed = True
+    for route, expected in expected_routes.items():
+        if calls.by_route[route] > expected:
+            print(f"[FAIL] {route} is called {calls.by_route[route]} times (expected {expected})")
+            failed = True
+    return failed
+
+async def run():
+    from channel_pool import channel_pool
+    from database import db
+    from metrics import install_rest_call_counter
+    from settings import settings
+
+    HTTPClient.request = fake_http_request
+    AsyncWebhookAdapter.request = fake_webhook_request
+    install_rest_call_counter()
+
+    settings.current = dataclasses.replace(settings.current, guild_id=GUILD_ID, staff_role_ids=frozenset({STAFF_ROLE_ID}),
+                                           ticket_categories={"1": CATEGORY_ID}, ticket_category_ids=frozenset({CATEGORY_ID}))
+
+    failed = False
+    with tempfile.TemporaryDirectory() as folder:
+        db.path = os.path.join(folder, "ticket.db")
+        await db.connect()
+        bot, state = build_state()
+
+        calls, elapsed = await open_ticket(state, 42)
+        failed |= report("new ticket:     ", calls, elapsed, EXPECTED_ROUTES)
+
+        # THE SAME USER AGAIN: THE TICKET ALREADY EXISTS (THE CHANNEL IS NOT IN THE FAKE CACHE, SO THE "NOT FOUND" ANSWER IS USED)
+        calls, elapsed = await open_ticket(state, 42)
+        print(f"existing ticket: {calls.total} REST calls in {elapsed:.3f}s")
+        if calls.total > MAX_CALLS_EXISTING:
+            print(f"[FAIL] answering a user who already has a ticket takes {calls.total} REST calls (max {MAX_CALLS_EXISTING})")
+            failed = True
+
+        # ANOTHER USER, WITH ONE CHANNEL READY IN THE POOL (CREATED BEFORE THE MEASURE, LIKE THE REFILL TASK WOULD)
+        guild = state._get_guild(GUILD_ID)
+        channel_pool.size, channel_pool.guild, channel_pool.channels = 1, guild, {CATEGORY_ID: []}
+        guild._add_channel(await channel_pool._create(guild.get_channel(CATEGORY_ID)))
+        calls, elapsed = await open_ticket(state, 43)
+        failed |= report("pooled ticket:  ", calls, elapsed, EXPECTED_POOLED_ROUTES)
+
+        stored = len(state._view_store._synced_message_views)
+        print(f"views kept in memory: {stored}")
+        if stored:
+            print(f"[FAIL] {stored} views are kept in memory for the open tickets (expected 0)")
+            failed = True
+
+        await db.close()
+
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(run()))
@@ -9,65 +9,53 @@ FOR MORE INFORMATION ABOUT SQLITE, READ https://sqlite.org/index.html
 """
 
 import os # We use the os library to check whether the database file already exists
+import sys # We use sys to make the 'src' folder importable (see below)
 import sqlite3 # We use sqlite3 to create the database and its tables/columns/rows
 from datetime import datetime # We use this to get the current timestamp
 from colorama import Fore, init, Style # We use colorama to apply colors to text output
 init() # Initialize colorama
 
+# THE SCHEMA LIVES IN 'src/migrations.py' (THE SAME ONE USED BY THE BOT AT STARTUP), SO WE ADD 'src' TO THE IMPORT PATH
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "src"))
+from migrations import apply_migrations, get_schema_version # The versioned schema of the database
+
 """
-HERE WE DEFINE A FUNCTION THAT INITIALIZES THE DATABASE AND DEFINES ITS STRUCTURE
-(TABLES AND COLUMNS). INSIDE THE FUNCTION THERE ARE TWO PARAMETERS: `name` AND `path`.
+HERE WE DEFINE A FUNCTION THAT INITIALIZES THE DATABASE AND BRINGS ITS STRUCTURE
+(TABLES, COLUMNS AND INDEXES) UP TO DATE. INSIDE THE FUNCTION THERE ARE TWO PARAMETERS: `name` AND `path`.
 - `name` IS THE NAME OF THE DATABASE FILE.
 - `path` IS THE LOCATION WHERE THE FILE WILL BE CREATED/SAVED.
 
-AFTER DEFINING THE FUNCTION, WE PERFORM A CHECK TO SEE WHETHER THE DATABASE FILE
-ALREADY EXISTS. IF IT DOES NOT, WE CREATE IT.
-AFTER THE CHECK, WE HAVE TWO IMPORTANT VARIABLES:
-- `conn` IS THE CONNECTION OBJECT TO THE DATABASE
-- `c` IS THE CURSOR (THE INTERFACE BETWEEN PYTHON AND THE DATABASE)
+THE STRUCTURE IS NOT WRITTEN HERE: IT IS DEFINED BY THE ORDERED MIGRATIONS IN 'src/migrations.py'.
+THE DATABASE STORES THE NUMBER OF THE LAST MIGRATION IT RECEIVED (THE "SCHEMA VERSION"), SO:
+- IF THE FILE DOES NOT EXIST, IT IS CREATED AND RECEIVES ALL THE MIGRATIONS.
+- IF THE FILE ALREADY EXISTS, IT ONLY RECEIVES THE MIGRATIONS IT IS MISSING (THE DATA IS KEPT).
 
-NEXT, WE CREATE THE DATABASE STRUCTURE USING `c.execute(...)`.
-- `c.execute` EXECUTES THE SQL QUERY YOU PROVIDE (SELECT, INSERT, DELETE, UPDATE, ...)
-AFTER EXECUTION, WE CALL `conn.commit()` AND `conn.close()`:
-- `conn.commit()` APPLIES/SAVES THE CHANGES
-- `conn.close()` CLOSES THE CONNECTION TO THE DATABASE
+- `conn` IS THE CONNECTION OBJECT TO THE DATABASE
+- `conn.close()` CLOSES THE CONNECTION TO THE DATABASE (INSIDE `finally`, SO IT IS ALWAYS CLOSED)
 
-PS: WE USE A FUNCTION HERE SO OTHER INSTRUCTIONS IN THIS FILE DO NOT INTERFERE
-WITH THE REST OF THE CODE. IF YOU ONLY NEED THE TICKET DATABASE, YOU CAN CALL THIS
-FUNCTION DIRECTLY. NOTE: IT WOULD BE BETTER TO USE `try/except/finally` OR A CONTEXT
-MANAGER TO GUARANTEE THE CONNECTION IS ALWAYS CLOSED.
+PS: THE BOT RUNS THE SAME MIGRATIONS BY ITSELF WHEN IT STARTS (SEE 'src/database.py'), SO CALLING THIS
+FUNCTION IS ONLY NEEDED IF YOU WANT TO CREATE OR UPGRADE THE DATABASE WITHOUT STARTING THE BOT.
 """ 
 def create_database_ticket(name="ticket.db", path="data/database/ticket.db"): 
-    if os.path.exists(path=path): # Existence check
+    exists = os.path.exists(path=path) # Existence check
+    if exists:
         # Message printed in the terminal if the database already exists
         print(f"{Fore.LIGHTYELLOW_EX}[WARNING]{Style.RESET_ALL} {Fore.LIGHTBLACK_EX}The database already exists at{Style.RESET_ALL} {Fore.CYAN}{os.path.abspath(path=path)}{Style.RESET_ALL}") 
-        return # Do nothing if it already exists 
     
     conn = sqlite3.connect(path) # Connection to the database
-    c = conn.cursor() # Cursor/interface
+    try:
+        applied = apply_migrations(conn) # Apply the missing migrations
+        version = get_schema_version(conn) # The schema version after the migrations
+    finally:
+        conn.close() # Close the connection to the database
     
-    # 'IF NOT EXISTS' CHECKS WHETHER THE TABLE ALREADY EXISTS; IF IT DOES, NOTHING IS DONE.
-    # BELOW: TABLE NAME, COLUMNS, AND THEIR DATA TYPES.
-    c.execute("""CREATE TABLE IF NOT EXISTS ticket( 
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticketname TEXT NOT NULL,
-                ticketid INT NOT NULL,
-                categoryname TEXT NOT NULL,
-                categoryid INT NOT NULL,
-                openername TEXT NOT NULL,
-                openerid INT NOT NULL,
-                closurename TEXT NOT NULL,
-                closureid INT NOT NULL,
-                dateopened TEXT NOT NULL,
-                dateclosure TEXT NOT NULL,
-                statusticket TEXT NOT NULL
-            
-        )""") 
-    conn.commit() # Apply changes/creation
-    conn.close() # Close the connection to the database
+    if exists:
+        # Message printed in the terminal after upgrading an existing database
+        print(f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} {Fore.LIGHTBLACK_EX}Applied migrations:{Style.RESET_ALL} {Fore.CYAN}{len(applied)}{Style.RESET_ALL} {Fore.LIGHTBLACK_EX}(schema version{Style.RESET_ALL} {Fore.CYAN}{version}{Style.RESET_ALL}{Fore.LIGHTBLACK_EX}){Style.RESET_ALL}")
+        return
     
     # Message printed in the terminal if the database is created successfully
-    print(f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} {Fore.LIGHTBLACK_EX}The database was created successfully!{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Name:{Style.RESET_ALL} {Fore.CYAN}{name}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Norm Path:{Style.RESET_ALL} {Fore.LIGHTCYAN_EX}{path}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Full Path:{Style.RESET_ALL} {Fore.GREEN}{os.path.abspath(path=path)}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Size:{Style.RESET_ALL} {Fore.LIGHTGREEN_EX}{os.path.getsize(path) / 1000:.2f}kb{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Creation Time:{Style.RESET_ALL} {Fore.YELLOW}{datetime.now().strftime("%d/%m/%Y %H:%M:%S")}{Style.RESET_ALL}")
+    print(f"{Fore.GREEN}[SUCCESS]{Style.RESET_ALL} {Fore.LIGHTBLACK_EX}The database was created successfully!{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Name:{Style.RESET_ALL} {Fore.CYAN}{name}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Norm Path:{Style.RESET_ALL} {Fore.LIGHTCYAN_EX}{path}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Full Path:{Style.RESET_ALL} {Fore.GREEN}{os.path.abspath(path=path)}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Schema Version:{Style.RESET_ALL} {Fore.CYAN}{version}{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Size:{Style.RESET_ALL} {Fore.LIGHTGREEN_EX}{os.path.getsize(path) / 1000:.2f}kb{Style.RESET_ALL}\n{Fore.LIGHTBLACK_EX}--> Creation Time:{Style.RESET_ALL} {Fore.YELLOW}{datetime.now().strftime("%d/%m/%Y %H:%M:%S")}{Style.RESET_ALL}")
     
 if __name__ == "__main__": # Entry point: only runs when executed directly, not on import
     create_database_ticket() # Here we call the function to run it
\ No newline at end of file
@@ -0,0 +1,179 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE ON-DISK STORE OF THE TRANSCRIPT ATTACHMENTS.
+
+EVERY FILE IS SAVED UNDER THE NAME OF ITS CONTENT HASH (SHA-256), E.G. 'data/attachments/3f/3fa9...c2.png':
+- THE SAME FILE SENT IN DIFFERENT TICKETS (OR TWICE IN THE SAME TICKET) IS STORED ONLY ONCE.
+- FILES ARE DOWNLOADED IN SMALL CHUNKS STRAIGHT TO DISK, SO THE MEMORY USED BY A DOWNLOAD DOES NOT DEPEND ON THE SIZE OF
+  THE FILE (NOTHING IS KEPT IN MEMORY OR ENCODED IN BASE64). THE DISK WORK (WRITES, RENAMES) RUNS IN A THREAD
+  ('asyncio.to_thread'), SO A SLOW DISK NEVER BLOCKS THE EVENT LOOP.
+
+THE TRANSCRIPT HTML ONLY REFERENCES THE FILES ('attachments/<name>'), AND 'build_bundle' PACKS THE HTML AND THE
+REFERENCED FILES INTO A ZIP ARCHIVE THAT CAN BE OPENED OFFLINE. A BUNDLE IS NEVER BIGGER THAN THE UPLOAD LIMIT OF ITS
+DESTINATION: THE FILES THAT DO NOT FIT ARE LEFT OUT (AND LISTED IN THE BUNDLE), THEY STAY IN THE STORE.
+"""
+
+import aiohttp # We use aiohttp to stream the files from the Discord CDN
+import asyncio # We use asyncio to write the files from a thread, not from the event loop
+import hashlib # We use hashlib to compute the content hash of each file
+import logging # We use logging to report the files left out of a bundle
+import os # We use os to build paths and move files
+import re # We use re to clean the file extensions
+import shutil # We use shutil to copy an HTML file object into the bundle
+import tempfile # We use tempfile to download into a temporary file before moving it to its final name
+import zipfile # We use zipfile to build the transcript bundle
+
+from config import attachment_store_path
+
+log = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024 # Bytes read from the network and written to disk at a time
+BUNDLE_ATTACHMENTS_FOLDER = "attachments" # The folder of the attachments inside the bundle (and in the HTML links)
+BUNDLE_NOT_INCLUDED = "attachments-not-included.txt" # The list of the files left out of a bundle over the upload limit
+BUNDLE_ENTRY_OVERHEAD = 256 # Bytes reserved for the zip headers of every file of a bundle (local header and central directory)
+
+class FileTooLarge(Exception):
+    """
+    RAISED WHEN A FILE IS BIGGER THAN THE ALLOWED SIZE WHILE IT IS BEING DOWNLOADED.
+    """
+
+def _extension(filename):
+    """
+    RETURNS A SAFE, LOWERCASE EXTENSION FOR THE GIVEN FILENAME (E.G. '.png'), OR AN EMPTY STRING.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return extension if re.fullmatch(r"\.[a-z0-9]{1,10}", extension) else ""
+
+def _write_chunk(temp, digest, chunk):
+    """
+    WRITES A DOWNLOADED CHUNK TO THE TEMPORARY FILE AND ADDS IT TO THE CONTENT HASH.
+    """
+    digest.update(chunk)
+    temp.write(chunk)
+
+def _discard(temp):
+    """
+    CLOSES AND DELETES THE TEMPORARY FILE OF A DOWNLOAD THAT FAILED.
+    """
+    temp.close()
+    os.remove(temp.name)
+
+class AttachmentStore:
+    """
+    A CONTENT-ADDRESSED FOLDER OF FILES.
+
+    ATTRIBUTES:
+        ROOT: THE FOLDER WHERE THE FILES ARE SAVED.
+    """
+    def __init__(self, root=attachment_store_path):
+        self.root = root
+
+    def path(self, name):
+        """
+        RETURNS THE PATH OF A STORED FILE FROM ITS NAME (THE FILES ARE SPREAD IN SUBFOLDERS NAMED WITH THE FIRST TWO
+        CHARACTERS OF THE HASH, SO NO FOLDER ENDS UP WITH MILLIONS OF FILES).
+        """
+        return os.path.join(self.root, name[:2], name)
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    async def save(self, session, url, filename, max_bytes, timeout):
+        """
+        DOWNLOADS A FILE IN CHUNKS, STRAIGHT TO DISK, AND STORES IT UNDER ITS CONTENT HASH.
+
+        ARGS:
+            SESSION: THE AIOHTTP SESSION USED FOR THE DOWNLOAD.
+            URL: THE URL OF THE FILE (E.G. 'attachment.url').
+            FILENAME: THE ORIGINAL NAME OF THE FILE (ONLY ITS EXTENSION IS KEPT).
+            MAX_BYTES: THE DOWNLOAD IS STOPPED (FileTooLarge) IF THE FILE IS BIGGER THAN THIS.
+            TIMEOUT: THE MAXIMUM NUMBER OF SECONDS FOR THE WHOLE DOWNLOAD.
+
+        RETURNS:
+            STR: THE NAME OF THE STORED FILE ('<sha256><extension>').
+        """
+        digest = hashlib.sha256()
+        size = 0
+
+        temp = await asyncio.to_thread(self._open_temporary)
+        try:
+            async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise FileTooLarge(f"{filename} is bigger than {max_bytes} bytes")
+                    await asyncio.to_thread(_write_chunk, temp, digest, chunk)
+        except BaseException:
+            await asyncio.to_thread(_discard, temp)
+            raise
+
+        name = digest.hexdigest() + _extension(filename)
+        await asyncio.to_thread(self._keep, temp, name)
+        return name
+
+    def _open_temporary(self):
+        """
+        OPENS A NEW TEMPORARY FILE IN THE 'tmp' FOLDER OF THE STORE (SAME DISK, SO IT CAN BE RENAMED TO ITS FINAL NAME).
+        """
+        temp_folder = os.path.join(self.root, "tmp")
+        os.makedirs(temp_folder, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=temp_folder, delete=False)
+
+    def _keep(self, temp, name):
+        """
+        CLOSES A COMPLETE DOWNLOAD AND MOVES IT TO ITS FINAL NAME (OR DELETES IT IF THE SAME CONTENT IS ALREADY STORED).
+        """
+        temp.close()
+        final_path = self.path(name)
+        if os.path.exists(final_path):
+            os.remove(temp.name) # Already stored (same content): keep only one copy
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(temp.name, final_path)
+
+    def build_bundle(self, html, names, output_path, max_bytes=None):
+        """
+        WRITES THE TRANSCRIPT BUNDLE: A ZIP ARCHIVE WITH 'transcript.html' AND THE REFERENCED FILES IN 'attachments/'.
+        THE FILES ARE COPIED FROM DISK IN CHUNKS BY ZIPFILE, SO THEY ARE NEVER LOADED IN MEMORY ALL AT ONCE.
+        THE HTML IS COMPRESSED; THE ATTACHMENTS (IMAGES, VIDEOS, ...) ARE USUALLY ALREADY COMPRESSED, SO THEY ARE STORED AS THEY ARE.
+        FILES THAT ARE NO LONGER IN THE STORE ARE LEFT OUT (THE TRANSCRIPT STILL OPENS, WITHOUT THOSE FILES).
+        WITH 'max_bytes' THE FILES ARE ADDED FROM THE SMALLEST TO THE BIGGEST WHILE THE BUNDLE STAYS UNDER THAT SIZE (0: THE
+        HTML ALONE); THE OTHERS ARE LISTED IN 'attachments-not-included.txt' AND THEIR LINKS IN THE HTML STILL POINT TO
+        'attachments/<name>', SO COPYING THEM FROM THE STORE INTO THAT FOLDER COMPLETES THE TRANSCRIPT.
+        THIS IS BLOCKING FILE I/O: CALL IT WITH 'asyncio.to_thread'.
+
+        ARGS:
+            HTML: THE TRANSCRIPT HTML (STR OR UTF-8 BYTES), OR A BINARY FILE OBJECT THAT IS COPIED IN CHUNKS (E.G. AN ARCHIVED TRANSCRIPT).
+            NAMES: THE NAMES OF THE STORED FILES REFERENCED BY THE HTML.
+            OUTPUT_PATH: THE PATH OF THE ZIP FILE TO CREATE.
+            MAX_BYTES: THE UPLOAD LIMIT OF THE DESTINATION (NONE: NO LIMIT).
+
+        RETURNS:
+            STR: OUTPUT_PATH.
+        """
+        sizes = {name: os.path.getsize(self.path(name)) for name in set(names) if self.exists(name)}
+        reserved = BUNDLE_ENTRY_OVERHEAD + sum(len(name) + 1 for name in sizes) # Room for the list of the files left out
+        left_out = []
+
+        with zipfile.ZipFile(output_path, "w", compression=zipfile.ZIP_DEFLATED) as bundle:
+            if isinstance(html, (str, bytes)):
+                bundle.writestr("transcript.html", html)
+            else:
+                with bundle.open("transcript.html", "w", force_zip64=True) as entry:
+                    shutil.copyfileobj(html, entry, CHUNK_SIZE)
+            written = bundle.infolist()[0].compress_size + BUNDLE_ENTRY_OVERHEAD
+            for name in sorted(sizes, key=lambda name: (sizes[name], name)):
+                if max_bytes is not None and written + sizes[name] + BUNDLE_ENTRY_OVERHEAD + reserved > max_bytes:
+                    left_out.append(name)
+                    continue
+                bundle.write(self.path(name), arcname=f"{BUNDLE_ATTACHMENTS_FOLDER}/{name}", compress_type=zipfile.ZIP_STORED)
+                written += sizes[name] + BUNDLE_ENTRY_OVERHEAD
+            if left_out:
+                bundle.writestr(BUNDLE_NOT_INCLUDED, "These files were over the upload limit, they are kept by the bot (attachment store):\n"
+                                + "".join(f"{BUNDLE_ATTACHMENTS_FOLDER}/{name}\n" for name in sorted(left_out)))
+
+        if left_out:
+            log.warning("%d of %d attachments left out of %s (upload limit of %d bytes)", len(left_out), len(sizes), os.path.basename(output_path), max_bytes)
+        return output_path
+
+store = AttachmentStore() # The shared instance used by the transcript pipeline
@@ -0,0 +1,91 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE PERMISSION CHECKS OF THE COMMANDS, BUTTONS AND MODALS.
+
+EVERY CHECK READS THE CURRENT SETTINGS (SEE settings.py) AND LOOKS UP EACH ALLOWED ROLE WITH 'Member.get_role' (A BINARY
+SEARCH IN THE SORTED ROLE IDS OF THE MEMBER), WITHOUT BUILDING THE LIST OF ROLE OBJECTS OF THE MEMBER.
+
+THE SLASH COMMANDS USE THE DECORATORS ('staff_only', 'admin_only', 'ticket_category_only'): A FAILED CHECK RAISES AN
+'AuthorizationError' BEFORE THE COMMAND RUNS, AND 'on_check_failure' (REGISTERED AS THE ERROR HANDLER OF THE COMMAND TREE
+IN main.py) ANSWERS WITH ITS MESSAGE. THE BUTTONS AND THE MODALS CALL 'is_staff' DIRECTLY.
+
+USAGE:
+    @bot.tree.command(name="ticket-add", ...)
+    @staff_only()
+    @ticket_category_only()
+    async def add(interaction, user): ...
+"""
+
+import discord # We use discord to tell the members of a server from the users (in DMs)
+import logging # We use logging to report the errors of the commands
+
+from discord import app_commands # We use app_commands to build the checks of the slash commands
+
+from metrics import command_finished
+from settings import settings
+
+log = logging.getLogger(__name__)
+
+class AuthorizationError(app_commands.CheckFailure):
+    """
+    A FAILED PERMISSION CHECK. THE MESSAGE IS SENT TO THE USER (EPHEMERAL).
+    """
+
+def has_any_role(member, role_ids):
+    """
+    TELLS IF THE MEMBER HAS AT LEAST ONE OF THE ROLES (A ROLE DELETED FROM THE SERVER DOES NOT COUNT).
+    """
+    if not isinstance(member, discord.Member):
+        return False # A User (e.g. in DMs) has no roles
+    return any(member.get_role(role_id) is not None for role_id in role_ids)
+
+def is_staff(member):
+    return has_any_role(member, settings.current.staff_role_ids)
+
+def is_admin(member):
+    return has_any_role(member, settings.current.admin_role_ids)
+
+def in_ticket_category(channel):
+    return getattr(channel, "category_id", None) in settings.current.ticket_category_ids
+
+def staff_only():
+    """
+    ONLY THE STAFF ROLES CAN USE THE COMMAND.
+    """
+    def predicate(interaction):
+        if not is_staff(interaction.user):
+            raise AuthorizationError("You cannot use this command.")
+        return True
+    return app_commands.check(predicate)
+
+def admin_only():
+    """
+    ONLY THE ADMIN ROLES CAN USE THE COMMAND.
+    """
+    def predicate(interaction):
+        if not is_admin(interaction.user):
+            raise AuthorizationError("You cannot use this command.")
+        return True
+    return app_commands.check(predicate)
+
+def ticket_category_only():
+    """
+    THE COMMAND CAN ONLY BE USED IN A CHANNEL OF A TICKET CATEGORY.
+    """
+    def predicate(interaction):
+        if not in_ticket_category(interaction.channel):
+            raise AuthorizationError("This command can only be used in a **ticket category**.")
+        return True
+    return app_commands.check(predicate)
+
+async def on_check_failure(interaction, error):
+    """
+    THE ERROR HANDLER OF THE COMMAND TREE: ANSWERS THE FAILED PERMISSION CHECKS AND LOGS ANY OTHER ERROR (LIKE THE DEFAULT
+    HANDLER OF DISCORD.PY). THE COMMAND IS RECORDED AS "denied" OR "error" IN THE METRICS.
+    """
+    command_finished(interaction, "denied" if isinstance(error, AuthorizationError) else "error")
+    if not isinstance(error, AuthorizationError):
+        log.error("Ignoring exception in command %r", interaction.command.name if interaction.command else None, exc_info=error,
+                  extra={"guild_id": interaction.guild_id, "user_id": interaction.user.id})
+        return
+    if not interaction.response.is_done():
+        await interaction.response.send_message(str(error), ephemeral=True, delete_after=5)
@@ -0,0 +1,156 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE WARM POOL OF TICKET CHANNELS.
+
+CREATING A CHANNEL IS THE SLOWEST STEP OF A TICKET OPEN, AND DISCORD ALLOWS ONLY A FEW CHANNEL CREATIONS PER GUILD IN A
+SHORT TIME: AFTER AN ANNOUNCEMENT, WHEN MANY USERS OPEN A TICKET AT THE SAME TIME, THEY WAIT SECONDS OR HIT 429 ERRORS.
+
+WITH THE POOL ('channel_pool_size' > 0 IN config.py) THE BOT KEEPS 'channel_pool_size' HIDDEN CHANNELS READY IN EVERY
+TICKET CATEGORY (ONLY THE BOT CAN SEE THEM). OPENING A TICKET THEN ONLY EDITS ONE OF THEM: THE NAME AND THE PERMISSIONS
+ARE CHANGED WITH A SINGLE REST CALL ('take'). A BACKGROUND TASK CREATES NEW CHANNELS TO REFILL THE POOL, ONE EVERY
+'channel_pool_refill_interval' SECONDS, SO THE REFILL NEVER COMPETES WITH THE OPENS FOR THE RATE LIMIT.
+
+THE POOLED CHANNELS ARE SAVED IN THE 'channel_pool' TABLE, SO THEY ARE REUSED AFTER A RESTART INSTEAD OF BEING
+CREATED AGAIN. WHEN THE POOL IS EMPTY (OR DISABLED) THE TICKET CHANNEL IS CREATED AS USUAL.
+"""
+
+import asyncio # We use asyncio to run the refill task
+import discord # We use discord to create and edit the channels
+import logging # We use logging to report the refills
+
+from config import channel_pool_refill_interval, channel_pool_size
+from database import db
+from timeutils import now_timestamp
+
+log = logging.getLogger(__name__)
+
+POOL_CHANNEL_NAME = "ticket-pool" # The name of a channel while it waits in the pool
+
+class ChannelPool:
+    """
+    THE HIDDEN CHANNELS READY TO BECOME TICKETS, BY CATEGORY.
+
+    ATTRIBUTES:
+        SIZE: THE NUMBER OF CHANNELS KEPT READY IN EVERY CATEGORY (0 DISABLES THE POOL).
+        CHANNELS: DICTIONARY CATEGORY ID -> LIST OF THE IDS OF THE POOLED CHANNELS.
+
+    USAGE:
+        AWAIT 'channel_pool.start(guild, category_ids)' ONCE THE BOT IS READY, THEN 'channel_pool.take(...)' TO OPEN A TICKET.
+    """
+    def __init__(self, size=channel_pool_size, refill_interval=channel_pool_refill_interval):
+        self.size = size
+        self.refill_interval = refill_interval
+        self.channels = {}
+        self.guild = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.size > 0
+
+    def __contains__(self, channel_id):
+        return any(channel_id in channels for channels in self.channels.values())
+
+    async def start(self, guild, category_ids):
+        """
+        LOADS THE POOLED CHANNELS SAVED IN THE DATABASE (FORGETTING THE ONES THAT NO LONGER EXIST) AND STARTS THE REFILL
+        TASK. DOES NOTHING IF THE POOL IS DISABLED OR ALREADY STARTED.
+
+        ARGS:
+            GUILD: THE DISCORD GUILD OF THE TICKETS.
+            CATEGORY_IDS: THE IDS OF THE TICKET CATEGORIES (THE VALUES OF 'settings.current.ticket_categories').
+        """
+        if not self.enabled or self._task is not None:
+            return
+
+        self.guild = guild
+        self.channels = {category_id: [] for category_id in category_ids}
+        for row in await db.get_pooled_channels(guild.id):
+            channel = guild.get_channel(row["channelid"])
+            if channel is None or row["categoryid"] not in self.channels:
+                await db.remove_pooled_channel(row["channelid"])
+                continue
+            self.channels[row["categoryid"]].append(channel.id)
+
+        log.info("Channel pool loaded: %s", {category_id: len(channels) for category_id, channels in self.channels.items()})
+        self._task = asyncio.create_task(self._refill(), name="channel-pool-refill")
+
+    async def take(self, category_id, name, overwrites):
+        """
+        TURNS A POOLED CHANNEL OF THE CATEGORY INTO A TICKET: ONE EDIT SETS ITS NAME AND ITS PERMISSIONS.
+
+        ARGS:
+            CATEGORY_ID: THE CATEGORY OF THE TICKET.
+            NAME: THE NAME OF THE TICKET CHANNEL.
+            OVERWRITES: THE PERMISSION OVERWRITES OF THE TICKET (THE SAME USED TO CREATE A CHANNEL).
+
+        RETURNS:
+            DISCORD.TEXTCHANNEL OR NONE: THE TICKET CHANNEL, OR NONE IF THE POOL IS EMPTY (OR DISABLED).
+        """
+        channels = self.channels.get(category_id)
+        while channels:
+            channel_id = channels.pop(0) # Removed before any 'await', so two opens never get the same channel
+            self._wakeup.set()
+            await db.remove_pooled_channel(channel_id)
+
+            channel = self.guild.get_channel(channel_id)
+            if channel is None:
+                continue
+            try:
+                return await channel.edit(name=name, overwrites=overwrites)
+            except discord.NotFound:
+                continue # Deleted by hand in the meantime: try the next one
+        return None
+
+    def discard(self, channel_id):
+        """
+        FORGETS A POOLED CHANNEL THAT WAS DELETED (CALLED BY 'on_guild_channel_delete'). RETURNS TRUE IF IT WAS POOLED.
+        """
+        for channels in self.channels.values():
+            if channel_id in channels:
+                channels.remove(channel_id)
+                self._wakeup.set()
+                return True
+        return False
+
+    async def _create(self, category):
+        """
+        CREATES ONE HIDDEN CHANNEL IN THE CATEGORY AND ADDS IT TO THE POOL. RETURNS THE CHANNEL.
+        """
+        channel = await self.guild.create_text_channel(
+            name=POOL_CHANNEL_NAME,
+            category=category,
+            overwrites={
+                self.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+                self.guild.me: discord.PermissionOverwrite(read_messages=True),
+            },
+            reason="Ticket channel pool refill",
+        )
+        await db.add_pooled_channel(channel.id, self.guild.id, category.id, now_timestamp())
+        self.channels[category.id].append(channel.id)
+        return channel
+
+    async def _refill(self):
+        while True:
+            self._wakeup.clear()
+            missing = [category_id for category_id, channels in self.channels.items() if len(channels) < self.size]
+            if not missing:
+                await self._wakeup.wait() # Full: sleep until a channel is taken
+                continue
+
+            # The emptiest category first, one channel at a time
+            category_id = min(missing, key=lambda category_id: len(self.channels[category_id]))
+            category = self.guild.get_channel(category_id)
+            try:
+                if category is None:
+                    log.warning("Ticket category %d not found: it is left out of the channel pool", category_id)
+                    del self.channels[category_id]
+                    continue
+                await self._create(category)
+            except discord.HTTPException as e:
+                log.warning("Unable to create a pooled channel in %s: %r", category, e)
+            except Exception:
+                log.exception("Unexpected error while refilling the channel pool")
+            await asyncio.sleep(self.refill_interval)
+
+channel_pool = ChannelPool() # The shared instance used by the bot
@@ -5,59 +5,75 @@ THE CLASSES HERE ARE DESIGNED TO BE USED AS PART OF THE DISCORD UI AND EVENT SYS
 """
 import discord
 import asyncio
-import base64
-import asyncio
-import sqlite3
-import io
-import chat_exporter
-import pytz
+import logging
+import time
 
-from bs4 import BeautifulSoup
 from discord import ui
-from datetime import datetime
 from config import bot_user_avatar_url, bot_user_name
+from timeutils import format_timestamp, now_timestamp
+from authorization import is_staff
+from channel_pool import channel_pool
+from close_jobs import close_jobs
+from database import db
+from log_pipeline import log_context
+from message_search import PAGE_SIZE, format_snippet
+from metrics import instrumented, rest_calls
+from settings import settings
+
+log = logging.getLogger(__name__)
 
 # ──────────────────────────────────────────────────────────────────────────────────────────────────────
 
-class CloseTicketButton(ui.Button):
+class CloseTicketButton(ui.DynamicItem[ui.Button], template=r"ticket:close:(?P<ticket_id>[0-9]+)"):
     """
     A DISCORD UI BUTTON THAT ALLOWS AUTHORIZED USERS TO CLOSE A TICKET CHANNEL.
     
     THIS BUTTON IS ADDED TO THE TICKET EMBED MESSAGE. WHEN CLICKED, IT CHECKS IF THE USER HAS THE REQUIRED ROLE TO CLOSE TICKETS.
     IF AUTHORIZED, IT OPENS A MODAL DIALOG TO COLLECT THE REASON FOR CLOSING THE TICKET. OTHERWISE, IT SENDS AN ERROR MESSAGE.
     THE BUTTON IS STYLED AS A RED 'DANGER' BUTTON WITH A LOCK EMOJI TO CLEARLY INDICATE ITS PURPOSE.
+
+    IT IS A DYNAMIC ITEM: THE TICKET ID IS WRITTEN IN ITS CUSTOM ID ('ticket:close:<ticket id>') AND THE CLASS IS REGISTERED ONCE
+    AT STARTUP ('bot.add_dynamic_items'), SO DISCORD.PY REBUILDS THE BUTTON FROM THE CUSTOM ID OF EVERY CLICK. THE BUTTONS KEEP
+    WORKING AFTER A RESTART AND NO VIEW IS KEPT IN MEMORY FOR THE OPEN TICKETS.
     
     ATTRIBUTES:
-        TICKET_OWNER: THE USER WHO OPENED THE TICKET (CAN BE A USER ID OR OBJECT, DEPENDING ON CONTEXT).
-        OPENING_TIME: THE TIMESTAMP WHEN THE TICKET WAS CREATED, USED FOR LOGGING AND TRANSCRIPT PURPOSES.
+        TICKET_ID: THE ID OF THE TICKET (THE ID OF ITS CHANNEL).
     
     USAGE:
         ADD THIS BUTTON TO A DISCORD.UI.VIEW AND SEND IT WITH A MESSAGE IN THE TICKET CHANNEL.
     """
-    def __init__(self, ticket_owner, opening_time):
+    def __init__(self, ticket_id):
         """
-        INITIALIZE THE CLOSETICKETBUTTON WITH THE TICKET OWNER AND OPENING TIME.
-        SETS UP THE BUTTON'S LABEL, EMOJI, AND STYLE FOR DISCORD UI.
+        INITIALIZE THE CLOSETICKETBUTTON FOR THE GIVEN TICKET.
+        SETS UP THE BUTTON'S LABEL, EMOJI, STYLE AND CUSTOM ID FOR DISCORD UI.
         
         ARGS:
-            TICKET_OWNER: THE USER WHO OWNS THE TICKET (ID OR OBJECT).
-            OPENING_TIME: THE DATETIME STRING WHEN THE TICKET WAS OPENED.
+            TICKET_ID: THE ID OF THE TICKET (THE ID OF ITS CHANNEL).
         """
         super().__init__(
-            label="Close Ticket",
-            emoji="🔒",
-            style=discord.ButtonStyle.danger,
+            ui.Button(
+                label="Close Ticket",
+                emoji="🔒",
+                style=discord.ButtonStyle.danger,
+                custom_id=f"ticket:close:{ticket_id}",
+            )
         )
-        self.ticket_owner = ticket_owner
-        self.opening_time = opening_time
+        self.ticket_id = ticket_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Button, match):
+        """
+        REBUILDS THE BUTTON FROM THE CUSTOM ID OF A CLICK (CALLED BY DISCORD.PY).
+        """
+        return cls(int(match["ticket_id"]))
+
+    @instrumented("close_button") # Duration, DB queries and REST calls (see metrics.py)
     async def callback(self, interaction: discord.Interaction):
         """
         HANDLES THE BUTTON CLICK EVENT.
         
         CHECKS IF THE USER WHO CLICKED HAS THE REQUIRED ROLE TO CLOSE TICKETS. IF NOT, SENDS AN EPHEMERAL ERROR MESSAGE.
         IF AUTHORIZED, OPENS A MODAL DIALOG (CLOSETICKETBUTTONMODAL) TO COLLECT THE REASON FOR CLOSING THE TICKET.
-        CLOSES THE DATABASE CONNECTION AFTER THE CHECK.
         
         ARGS:
             INTERACTION: THE DISCORD INTERACTION OBJECT REPRESENTING THE BUTTON CLICK EVENT.
@@ -65,84 +81,48 @@ class CloseTicketButton(ui.Button):
         SIDE EFFECTS:
             MAY SEND ERROR MESSAGES, OPEN A MODAL, OR DO NOTHING IF UNAUTHORIZED.
         """
-        conn = sqlite3.connect("data/database/ticket.db")
-        c = conn.cursor()
-
-        c.execute(
-            """SELECT ticketname, ticketid, statusticket FROM 'ticket' WHERE ticketname = ? AND ticketid = ? AND statusticket = 'open'""",
-            (interaction.channel.name, interaction.channel.id))
-        ticket_owner = c.fetchone()
-        
-        """
-        IN THE VARIABLE 'role', INSERT THE ID OF THE ROLE THAT CAN CLOSE TICKETS.
-        IF YOU WANT TO ALLOW MULTIPLE ROLES, WRITE IT LIKE THIS:
-        role1 = interaction.guild.get_role(ID_1)
-        role2 = interaction.guild.get_role(ID_2)
-        if not any(role in interaction.user.roles for role in [role1, role2]):
-        """
-        role = interaction.guild.get_role() 
-        opening_time = interaction.channel.created_at.strftime("%d/%m/%Y %H:%M:%S")
-
-        if role not in interaction.user.roles:
-            conn.close()
+        if not is_staff(interaction.user): # The staff roles are set in config.py (see settings.py)
             await interaction.response.send_message(f"{interaction.user.mention}, you don't have sufficient permissions to close this ticket.", ephemeral=True, delete_after=10)
             return
 
         else:
-            modal = CloseTicketButtonModal(ticket_owner, opening_time)
+            modal = CloseTicketButtonModal()
             await interaction.response.send_modal(modal)
-            conn.close()
 
 # ──────────────────────────────────────────────────────────────────────────────────────────────────────
 
-class DropdownView(ui.View):
+class TicketDropdown(ui.DynamicItem[ui.Select], template=r"ticket:open"):
     """
-    A DISCORD UI VIEW CONTAINING A DROPDOWN MENU FOR TICKET TYPE SELECTION.
-    
-    THIS VIEW IS USED TO LET USERS CHOOSE THE TYPE OF TICKET THEY WANT TO OPEN (E.G., ASSISTANCE, SUPPORT, ETC.).
-    EACH DROPDOWN OPTION IS MAPPED TO A SPECIFIC CATEGORY ID, WHICH DETERMINES WHERE THE TICKET CHANNEL WILL BE CREATED.
-    THE VIEW IS PERSISTENT (TIMEOUT=NONE) SO IT REMAINS ACTIVE UNTIL MANUALLY REMOVED.
-    
-    ATTRIBUTES:
-        CATEGORY_IDS: A DICTIONARY MAPPING DROPDOWN VALUES TO DISCORD CATEGORY IDS.
-    
-    USAGE:
-        SEND THIS VIEW WITH A MESSAGE IN THE SETUP CHANNEL TO ALLOW USERS TO OPEN TICKETS.
+    THE DROPDOWN MENU FOR TICKET TYPE SELECTION (SEE DROPDOWNVIEW).
+
+    LIKE CLOSETICKETBUTTON IT IS A DYNAMIC ITEM WITH A FIXED CUSTOM ID ('ticket:open'), REGISTERED ONCE AT STARTUP: THE SETUP
+    MESSAGE KEEPS WORKING AFTER A RESTART WITHOUT SENDING IT AGAIN.
     """
     def __init__(self):
-        """
-        INITIALIZES THE DROPDOWNVIEW WITH PREDEFINED TICKET CATEGORIES AND OPTIONS.
-        SETS UP THE DROPDOWN MENU WITH PLACEHOLDER TEXT AND AVAILABLE OPTIONS.
-        THE CALLBACK FOR THE DROPDOWN IS SET TO HANDLE USER SELECTIONS.
-        """
-        super().__init__(timeout=None)
-
-        """
-        INSERT THE CATEGORY ID FOR EACH VALUE.
-        IF YOU HAVE MORE OPTIONS, WRITE THEM LIKE THIS:
-        "1": CATEGORY_ID, # Category name
-        "2": CATEGORY_ID  # Category name
-        """
-        self.category_ids = {
-            "1": 123,  # Assistance
-        }
-        
         """
         THE 'placeholder' PARAMETER IS THE TEXT THAT APPEARS IN THE MENU.
         THE 'options' PARAMETER DEFINES THE BUTTONS THAT WILL APPEAR
         IN THE MENU.
         """
-        select = discord.ui.Select(
-            placeholder="🎫〢Select an option to open a ticket",
-            options=[
-                discord.SelectOption(emoji="⭐", label="Assistance", description="Select this option if you need assistance from our staff.", value="1"),
-            ]
+        super().__init__(
+            ui.Select(
+                custom_id="ticket:open",
+                placeholder="🎫〢Select an option to open a ticket",
+                options=[
+                    discord.SelectOption(emoji="⭐", label="Assistance", description="Select this option if you need assistance from our staff.", value="1"),
+                ]
+            )
         )
 
-        select.callback = self.select_callback
-        self.add_item(select)
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: ui.Select, match):
+        """
+        REBUILDS THE DROPDOWN FROM THE CUSTOM ID OF A SELECTION (CALLED BY DISCORD.PY).
+        """
+        return cls()
 
-    async def select_callback(self, interaction: discord.Interaction):
+    @instrumented("ticket_dropdown")
+    async def callback(self, interaction: discord.Interaction):
         """
         HANDLES THE EVENT WHEN A USER SELECTS AN OPTION FROM THE DROPDOWN MENU.
         
@@ -156,7 +136,11 @@ class DropdownView(ui.View):
             MAY OPEN A MODAL, SEND ERROR MESSAGES, OR DO NOTHING IF THE SELECTION IS INVALID.
         """
         selected_value = interaction.data["values"][0]
-        category_id = self.category_ids.get(selected_value)
+        category_id = settings.current.ticket_categories.get(selected_value) # Set in config.py ('ticket_categories')
+
+        if category_id is None:
+            await interaction.response.send_message(f"{interaction.user.mention}, this type of ticket is not available. Please contact the staff.", ephemeral=True, delete_after=10)
+            return
 
         try:
             match selected_value:
@@ -171,6 +155,26 @@ class DropdownView(ui.View):
         except Exception as e:
             await interaction.response.send_message(f"{interaction.user.mention}, an error occurred while opening your ticket. Please contact the developer.\n\nError: {e}", ephemeral=True)
             return
+
+class DropdownView(ui.View):
+    """
+    A DISCORD UI VIEW CONTAINING A DROPDOWN MENU FOR TICKET TYPE SELECTION.
+    
+    THIS VIEW IS USED TO LET USERS CHOOSE THE TYPE OF TICKET THEY WANT TO OPEN (E.G., ASSISTANCE, SUPPORT, ETC.).
+    EACH DROPDOWN OPTION IS MAPPED TO A SPECIFIC CATEGORY ID, WHICH DETERMINES WHERE THE TICKET CHANNEL WILL BE CREATED.
+    THE VIEW IS PERSISTENT (TIMEOUT=NONE) AND ITS ONLY ITEM IS DYNAMIC (TICKETDROPDOWN), SO IT KEEPS WORKING AFTER A RESTART.
+    
+    THE CATEGORY ID OF EACH OPTION IS SET IN config.py ('ticket_categories'); THE OPTIONS OF THE MENU ARE IN TICKETDROPDOWN.
+    
+    USAGE:
+        SEND THIS VIEW WITH A MESSAGE IN THE SETUP CHANNEL TO ALLOW USERS TO OPEN TICKETS.
+    """
+    def __init__(self):
+        """
+        INITIALIZES THE DROPDOWNVIEW WITH THE TICKET TYPE DROPDOWN.
+        """
+        super().__init__(timeout=None)
+        self.add_item(TicketDropdown())
                    
 # ──────────────────────────────────────────────────────────────────────────────────────────────────────
 
@@ -184,8 +188,6 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
     
     ATTRIBUTES:
         CATEGORY_ID: THE DISCORD CATEGORY ID WHERE THE TICKET CHANNEL WILL BE CREATED.
-        OPENING_TIME: THE TIMESTAMP WHEN THE MODAL WAS OPENED (FOR LOGGING/TRANSCRIPT).
-        TICKET_OWNER: THE USER WHO IS OPENING THE TICKET (SET ON SUBMIT).
     
     USAGE:
         INSTANTIATED AND SHOWN TO THE USER WHEN THEY SELECT A TICKET TYPE FROM THE DROPDOWN.
@@ -200,12 +202,11 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         """
         super().__init__(timeout=None)
         self.category_id = category_id
-        self.opening_time = datetime.now(pytz.timezone("Europe/Rome")).strftime("%d/%m/%Y %H:%M:%S (DD/MM/YYYY Italian Timezone)")
-        self.ticket_owner = None
     
         self.add_item(ui.TextInput(label="Nickname", placeholder="Your Discord nickname", style=discord.TextStyle.short))
         self.add_item(ui.TextInput(label="What's your problem?", placeholder="Describe your problem", style=discord.TextStyle.paragraph))
         
+    @instrumented("assistance_modal")
     async def on_submit(self, interaction: discord.Interaction):
         """
         HANDLES THE EVENT WHEN THE USER SUBMITS THE ASSISTANCE MODAL.
@@ -213,6 +214,7 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         CHECKS IF THE USER ALREADY HAS AN OPEN TICKET (BOTH IN THE DATABASE AND ON THE SERVER).
         IF NOT, CREATES A NEW TICKET CHANNEL, SETS PERMISSIONS, SAVES TICKET INFO TO THE DATABASE, AND SENDS A WELCOME EMBED AND CLOSE BUTTON.
         PINS THE WELCOME MESSAGE FOR VISIBILITY. HANDLES EDGE CASES WHERE THE TICKET EXISTS IN THE DB BUT NOT ON THE SERVER.
+        THE NUMBER OF REST CALLS USED TO OPEN THE TICKET IS WRITTEN IN THE LOGS.
         
         ARGS:
             INTERACTION: THE DISCORD INTERACTION OBJECT REPRESENTING THE MODAL SUBMISSION.
@@ -220,15 +222,29 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         SIDE EFFECTS:
             MAY CREATE CHANNELS, SEND MESSAGES, UPDATE THE DATABASE, AND PIN MESSAGES.
         """
-        await interaction.response.defer(ephemeral=True)
+        start = time.perf_counter()
+        with rest_calls.scope() as calls, log_context(guild_id=interaction.guild_id, user_id=interaction.user.id): # Counts the REST calls of this ticket open (see metrics.py)
+            await self.open_ticket(interaction)
+        log.info("Ticket open for %s took %d REST calls: %s", interaction.user, calls.total, dict(calls.by_route),
+                 extra={"guild_id": interaction.guild_id, "user_id": interaction.user.id, "latency_ms": round((time.perf_counter() - start) * 1000, 1)})
 
-        conn = sqlite3.connect("data/database/ticket.db")
-        c = conn.cursor()
+    async def open_ticket(self, interaction: discord.Interaction):
+        """
+        OPENS THE TICKET WITH THE FEWEST POSSIBLE REST CALLS:
+        1. DEFER THE INTERACTION (CREATING THE CHANNEL CAN TAKE MORE THAN THE 3 SECONDS DISCORD GIVES US TO ANSWER).
+        2. CREATE THE CHANNEL (THE PERMISSIONS ARE PART OF THE SAME CALL).
+        3. SEND ONE MESSAGE WITH THE MENTIONS, THE WELCOME EMBED AND THE CLOSE BUTTON.
+        4. ANSWER THE USER AND PIN THE MESSAGE AT THE SAME TIME (THEY DO NOT DEPEND ON EACH OTHER).
+        A USER WHO ALREADY HAS A TICKET ONLY COSTS THE DEFER AND THE ANSWER.
+        
+        ARGS:
+            INTERACTION: THE DISCORD INTERACTION OBJECT REPRESENTING THE MODAL SUBMISSION.
+        """
+        await interaction.response.defer(ephemeral=True)
 
-        self.ticket_owner = interaction.user
         nickname = self.children[0].value # The first answer from the modal
         description = self.children[1].value # The second answer from the modal
-        role = interaction.guild.get_role() # The role that can see the ticket
+        staff_roles = settings.current.staff_roles(interaction.guild) # The roles that can see the ticket (set in config.py)
         category = discord.utils.get(interaction.guild.categories, id=self.category_id) # Do not change this
 
         """
@@ -236,12 +252,11 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         AN OPEN TICKET AND WHETHER THE TICKET EXISTS IN THE DATABASE
         BUT NOT ON THE SERVER.
         """
-        c.execute("SELECT ticketname FROM ticket WHERE openername = ? AND openerid = ? AND statusticket = 'open'", (interaction.user.name, interaction.user.id,))
-        existing_ticket = c.fetchone()
+        existing_ticket = db.open_tickets.get_by_opener(interaction.user.id)
 
         if existing_ticket:
-            ticket_name = existing_ticket[0]
-            ticket_channel = discord.utils.get(interaction.guild.text_channels, name=ticket_name)
+            ticket_name = existing_ticket["ticketname"]
+            ticket_channel = interaction.guild.get_channel(existing_ticket["ticketid"])
 
             if ticket_channel:
                 await interaction.followup.send(f'You already have an open ticket: {ticket_channel.mention}', ephemeral=True)
@@ -253,21 +268,19 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         """
         THIS IS THE TICKET CREATION WITH PERMISSIONS,
         NAME, CATEGORY, ETC.
+        A READY CHANNEL OF THE POOL IS USED IF THERE IS ONE (ONLY RENAMED), OTHERWISE A NEW CHANNEL IS CREATED.
         """
-        ticket_channel = await interaction.guild.create_text_channel(
-            name=f'ticket-{interaction.user.name}',
-            category=category,
-            overwrites={
-                interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                role: discord.PermissionOverwrite(read_messages=True),
-                interaction.user: discord.PermissionOverwrite(read_messages=True)
-            }
-        )
+        name = f'ticket-{interaction.user.name}'
+        overwrites = {
+            interaction.guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            **{role: discord.PermissionOverwrite(read_messages=True) for role in staff_roles},
+            interaction.user: discord.PermissionOverwrite(read_messages=True)
+        }
+        ticket_channel = await channel_pool.take(category.id, name, overwrites)
+        if ticket_channel is None:
+            ticket_channel = await interaction.guild.create_text_channel(name=name, category=category, overwrites=overwrites)
 
-        dateopened = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        c.execute("""INSERT INTO 'ticket' (ticketname, ticketid, categoryname, categoryid, openername, openerid, closurename, closureid, dateopened, dateclosure, statusticket) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", (ticket_channel.name, ticket_channel.id, category.name, category.id, interaction.user.name, interaction.user.id, '', '', f"{dateopened}", '', 'open'))
-        conn.commit()
-        conn.close()
+        await db.create_ticket(ticket_channel.name, ticket_channel.id, category.name, category.id, interaction.user.name, interaction.user.id, now_timestamp())
 
         # The embed that will be sent in the ticket when it is opened
         emb = discord.Embed(
@@ -278,21 +291,16 @@ class Assistance(ui.Modal, title="🚨 | Ticket Assistance (Part: Modal)"):
         emb.set_footer(text=bot_user_name, icon_url=bot_user_avatar_url)
         emb.set_thumbnail(url=bot_user_avatar_url)
 
-        await ticket_channel.send(f"{interaction.user.mention}{role.mention}")
-
-        message = await ticket_channel.send(embed=emb)
-
-        if interaction.response.is_done():
-            await interaction.followup.send(f'Your ticket has been created: {ticket_channel.mention}', ephemeral=True)
-        else:
-            await interaction.response.send_message(f'Your ticket has been created: {ticket_channel.mention}', ephemeral=True)
-
         view = ui.View(timeout=None)
-        close_button = CloseTicketButton(self.ticket_owner, self.opening_time)
+        view.add_item(CloseTicketButton(ticket_channel.id))
 
-        view.add_item(close_button)
-        await ticket_channel.send(view=view)
-        await message.pin()
+        # One message for the mentions, the embed and the close button (instead of three)
+        message = await ticket_channel.send(f"{interaction.user.mention}{settings.current.staff_mentions()}", embed=emb, view=view)
+
+        await asyncio.gather(
+            interaction.followup.send(f'Your ticket has been created: {ticket_channel.mention}', ephemeral=True),
+            message.pin(),
+        )
 
 # ──────────────────────────────────────────────────────────────────────────────────────────────────────
 
@@ -301,161 +309,105 @@ class CloseTicketButtonModal(ui.Modal, title="🧩 | Close Ticket"):
     A DISCORD MODAL DIALOG FOR COLLECTING THE REASON FOR CLOSING A TICKET.
     
     THIS MODAL IS SHOWN WHEN AN AUTHORIZED USER CLICKS THE CLOSETICKETBUTTON IN A TICKET CHANNEL.
-    IT ASKS FOR THE REASON FOR CLOSURE, THEN UPDATES THE TICKET STATUS IN THE DATABASE, GENERATES A TRANSCRIPT (INCLUDING ATTACHMENTS),
-    SENDS THE TRANSCRIPT TO A LOG CHANNEL AND THE TICKET OWNER, AND FINALLY DELETES THE TICKET CHANNEL AFTER A SHORT DELAY.
-    HANDLES VARIOUS ERROR CASES, SUCH AS MISSING PERMISSIONS OR DM FAILURES.
-    
-    ATTRIBUTES:
-        TICKET_OWNER: THE USER WHO OPENED THE TICKET.
-        OPENING_TIME: THE TIMESTAMP WHEN THE TICKET WAS OPENED.
+    IT ASKS FOR THE REASON FOR CLOSURE, THEN CLOSES THE TICKET IN THE DATABASE AND QUEUES ITS CLOSE JOB (SEE close_jobs.py), WHICH
+    GENERATES THE TRANSCRIPT (INCLUDING ATTACHMENTS), SENDS IT TO A LOG CHANNEL AND THE TICKET OWNER, AND FINALLY DELETES THE TICKET
+    CHANNEL AFTER A SHORT DELAY, EVEN IF THE BOT IS RESTARTED IN THE MEANTIME.
     
     USAGE:
         INSTANTIATED AND SHOWN TO THE USER WHEN THEY ATTEMPT TO CLOSE A TICKET VIA THE CLOSETICKETBUTTON.
     """
-    def __init__(self, ticket_owner, opening_time):
+    def __init__(self):
         """
         INITIALIZES THE CLOSETICKETBUTTONMODAL WITH A REQUIRED TEXT FIELD FOR THE CLOSURE REASON.
-        
-        ARGS:
-            TICKET_OWNER: THE USER WHO OPENED THE TICKET.
-            OPENING_TIME: THE DATETIME STRING WHEN THE TICKET WAS OPENED.
         """
         super().__init__(timeout=None)
-        self.ticket_owner = ticket_owner
-        self.opening_time = opening_time
         self.add_item(ui.TextInput(label="Reason for closing ticket", placeholder="Enter the reason for closing the ticket, e.g.: Ticket Resolved...", style=discord.TextStyle.paragraph, required=True))
     
+    @instrumented("close_modal")
     async def on_submit(self, interaction: discord.Interaction):
         """
         HANDLES THE EVENT WHEN THE USER SUBMITS THE CLOSE TICKET MODAL.
         
-        CHECKS IF THE USER HAS THE REQUIRED ROLE TO CLOSE TICKETS. IF AUTHORIZED, UPDATES THE TICKET STATUS IN THE DATABASE,
-        GENERATES A TRANSCRIPT (INCLUDING ALL MESSAGES AND ATTACHMENTS), SENDS THE TRANSCRIPT TO A LOG CHANNEL AND THE TICKET OWNER VIA DM,
-        AND DELETES THE TICKET CHANNEL AFTER A SHORT DELAY. HANDLES ERRORS SUCH AS MISSING PERMISSIONS OR DM FAILURES GRACEFULLY.
+        CHECKS IF THE USER HAS THE REQUIRED ROLE TO CLOSE TICKETS. IF AUTHORIZED, CLOSES THE TICKET IN THE DATABASE AND QUEUES ITS
+        CLOSE JOB IN THE SAME TRANSACTION, THEN ANSWERS IMMEDIATELY: THE TRANSCRIPT, THE UPLOADS AND THE DELETION OF THE CHANNEL ARE
+        DONE BY THE CLOSE JOB WORKERS. A TICKET THAT IS ALREADY BEING CLOSED IS NOT QUEUED TWICE.
         
         ARGS:
             INTERACTION: THE DISCORD INTERACTION OBJECT REPRESENTING THE MODAL SUBMISSION.
         
         SIDE EFFECTS:
-            UPDATES THE DATABASE, SENDS FILES AND MESSAGES, AND DELETES THE CHANNEL.
+            UPDATES THE DATABASE, QUEUES THE CLOSE JOB AND WAKES UP ITS WORKERS.
         """
-        conn = sqlite3.connect("data/database/ticket.db")
-        c = conn.cursor()
         reason = str(self.children[0].value)
-        transcriptchannel = interaction.guild.get_channel()
-        role = interaction.guild.get_role()
-        
-        if role not in interaction.user.roles:
+        if not is_staff(interaction.user):
             await interaction.response.send_message("You do not have the required permissions to close this ticket.", ephemeral=True)
             return
         
-        await interaction.response.send_message(f"The ticket will be closed in a few seconds... (Transcript: {transcriptchannel.mention})", ephemeral=True)
-        ticket = interaction.channel
-        await ticket.send(f"The ticket was closed by {interaction.user.mention}... (This ticket will be closed in a few seconds)")
-        overwrite = interaction.channel.overwrites_for(interaction.guild.default_role)
-        overwrite.send_messages = False
-        await interaction.channel.set_permissions(interaction.guild.default_role, overwrite=overwrite)
-        
-        dateclosed = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        c.execute("SELECT statusticket FROM ticket WHERE ticketid = ?", (interaction.channel.id,))
-        status = c.fetchone()
+        # The ticket is closed and its close job is queued in one transaction; the rest runs in the background (see close_jobs.py)
+        job_id = await db.queue_close(interaction.channel.id, interaction.guild.id, interaction.user.name, interaction.user.id, reason, now_timestamp())
         
-        if status and status[0] == 'open':
-            c.execute("UPDATE ticket SET closurename = ?, closureid = ?, dateclosure = ?, statusticket = 'closed' WHERE ticketid = ?", (interaction.user.name, interaction.user.id, dateclosed, interaction.channel.id))
-            conn.commit()
-            transcript = await chat_exporter.export(ticket, limit=None)
-        
-        try:
-            transcript = await chat_exporter.export(ticket, limit=None)
-            if transcript:
-                modified_transcript = await self.modify_transcript_with_attachments(ticket, transcript)
-                transcript_bytes = modified_transcript.encode("utf-8")
-                byte_io = io.BytesIO(transcript_bytes)
-                transcript_file = discord.File(byte_io, filename=f"transcript-{ticket.name}.html")
-                
-                c.execute("SELECT * FROM ticket WHERE ticketid = ? ORDER BY dateclosure DESC LIMIT 1", (interaction.channel.id,))
-                embed_data = c.fetchone()
-                
-                emb = discord.Embed(title="📄 | New Transcript Generated", color=discord.Color.blue())
-                emb.add_field(name="🆔 Ticket ID", value=f"`{embed_data[2]}`", inline=True)
-                emb.add_field(name="📁 Category", value=f"`{embed_data[3]}`", inline=True)
-                emb.add_field(name="🔒 Closed by", value=f"<@{embed_data[7]}>", inline=True)
-                emb.add_field(name="👤 Opened by", value=f"<@{embed_data[5]}>", inline=True)
-                emb.add_field(name="📅 Opened on", value=f"`{embed_data[9]}`", inline=True)
-                emb.add_field(name="📅 Closed on", value=f"`{embed_data[10]}`", inline=True)
-                emb.add_field(name="📝 Reason for closing", value=f"```{reason}```", inline=True)
-                
-                await transcriptchannel.send(embed=emb, file=transcript_file)
-                byte_io.seek(0)
-                user = interaction.guild.get_member(embed_data[6])
-                if user:
-                    await user.send(embed=emb, file=discord.File(byte_io, filename=f"transcript-{ticket.name}.html"))
-        
-        except discord.errors.Forbidden:
-            print(f"Unable to send a DM to {self.ticket_owner}.")
-        except discord.Forbidden:
-            print(f"Unable to send a DM to {self.ticket_owner}")    
-        except Exception as e:
-            print(f"Error sending the transcript or DM: {e}")
+        if job_id is None:
+            await interaction.response.send_message("This ticket is already being closed.", ephemeral=True, delete_after=5)
+            return
         
-        await asyncio.sleep(5)
-        await ticket.delete()
-        conn.close()
-    
+        close_jobs.wake()
+        await interaction.response.send_message(f"The ticket will be closed in a few seconds... (Transcript: <#{settings.current.transcript_channel_id}>)", ephemeral=True)
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+class SearchResultsView(ui.View):
     """
-    THIS IS THE FUNCTION THAT WILL CREATE THE TRANSCRIPT, 
-    DO NOT TOUCH ANYTHING
+    THE PAGES OF THE RESULTS OF '/ticket-search': AN EMBED WITH 'PAGE_SIZE' MESSAGES (TICKET, AUTHOR, DATE AND A SNIPPET WITH
+    THE MATCHED WORDS IN BOLD) AND TWO BUTTONS TO GO TO THE PREVIOUS AND TO THE NEXT PAGE.
+
+    EVERY PAGE IS A NEW QUERY ON THE FULL-TEXT INDEX (SEE message_search.py) THAT READS ONE RESULT MORE THAN A PAGE, TO
+    KNOW IF THERE IS A NEXT PAGE WITHOUT COUNTING ALL THE RESULTS. THE RESULTS ARE EPHEMERAL, SO THE VIEW IS NOT
+    PERSISTENT: THE BUTTONS STOP WORKING AFTER 'timeout' SECONDS (OR A RESTART); SEARCH AGAIN TO GET NEW ONES.
+
+    ATTRIBUTES:
+        QUERY: THE TEXT WRITTEN BY THE STAFF MEMBER (SHOWN IN THE EMBED).
+        EXPRESSION: THE FTS5 EXPRESSION OF THE QUERY (SEE 'match_expression').
+        PAGE: THE CURRENT PAGE (0 IS THE FIRST ONE).
     """
-    async def modify_transcript_with_attachments(self, channel, transcript):
+    def __init__(self, query, expression, timeout=600):
+        super().__init__(timeout=timeout)
+        self.query = query
+        self.expression = expression
+        self.page = 0
+
+    async def render(self):
         """
-        MODIFIES THE HTML TRANSCRIPT TO INCLUDE ALL ATTACHMENTS (IMAGES, VIDEOS, FILES) AS BASE64-ENCODED DATA.
-        
-        ITERATES THROUGH ALL MESSAGES IN THE CHANNEL, FINDS ATTACHMENTS, AND EMBEDS THEM DIRECTLY INTO THE TRANSCRIPT HTML.
-        THIS ENSURES THAT THE TRANSCRIPT IS SELF-CONTAINED AND CAN BE VIEWED OFFLINE WITH ALL MEDIA INCLUDED.
-        HANDLES ERRORS FOR UNSUPPORTED OR PROBLEMATIC ATTACHMENTS GRACEFULLY.
-        
-        ARGS:
-            CHANNEL: THE DISCORD CHANNEL OBJECT FOR THE TICKET.
-            TRANSCRIPT: THE HTML TRANSCRIPT STRING GENERATED BY CHAT_EXPORTER.
-        
+        READS THE CURRENT PAGE AND RETURNS ITS EMBED, ENABLING ONLY THE BUTTONS THAT LEAD TO A PAGE WITH RESULTS.
+
         RETURNS:
-            STR: THE MODIFIED HTML TRANSCRIPT WITH EMBEDDED ATTACHMENTS.
+            DISCORD.EMBED: THE EMBED OF THE PAGE.
         """
-        soup = BeautifulSoup(transcript, 'html.parser')
-        
-        async for message in channel.history(limit=None, oldest_first=True):
-            message_div = soup.find('div', {'data-message-id': str(message.id)})
-            if not message_div or not message.attachments:
-                continue
-            
-            attachments_div = message_div.find('div', class_='chatlog__attachments')
-            if not attachments_div:
-                attachments_div = soup.new_tag('div', class_='chatlog__attachments')
-                message_div.append(attachments_div)
-            
-            attachment_tags = []
-            for attachment in message.attachments:
-                try:
-                    file_data = await attachment.read()
-                    base64_file = base64.b64encode(file_data).decode('utf-8')
-                    file_type = attachment.content_type.split('/')[0]
-                    
-                    if file_type == 'image':
-                        tag = soup.new_tag('img', src=f"data:{attachment.content_type};base64,{base64_file}", alt=attachment.filename, style="max-width:100%; display:block; margin-top:10px; border-radius:5px;")
-                    elif file_type == 'video':
-                        tag = soup.new_tag('video', controls=True, style="max-width:100%; display:block; margin-top:10px; border-radius:5px;")
-                        source_tag = soup.new_tag('source', src=f"data:{attachment.content_type};base64,{base64_file}", type=attachment.content_type)
-                        tag.append(source_tag)
-                    else:
-                        tag = soup.new_tag('a', href=f"data:{attachment.content_type};base64,{base64_file}", download=attachment.filename, style="display:block; margin-top:10px; font-weight:bold; color:#00b0f4;")
-                        tag.string = f"📂 {attachment.filename} (Download)"
-                    
-                    attachment_tags.append(tag)
-                except Exception as e:
-                    print(f"Error processing attachment {attachment.filename}: {e}")
-            
-            attachments_div.extend(attachment_tags)
-        
-        return str(soup)
+        rows = await db.search_messages(self.expression, PAGE_SIZE + 1, self.page * PAGE_SIZE)
+        self.previous.disabled = self.page == 0
+        self.next.disabled = len(rows) <= PAGE_SIZE
+        rows = rows[:PAGE_SIZE]
+
+        emb = discord.Embed(title="🔎 | Ticket Search", description=f"Results for **{discord.utils.escape_markdown(self.query)}** (page **{self.page + 1}**, the most relevant first)", color=discord.Color.from_rgb(10, 10, 10))
+        if not rows:
+            emb.description += "\n\n> No message matches the search."
+        for row in rows:
+            value = f"**{discord.utils.escape_markdown(row['authorname'])}** · `{format_timestamp(row['createdat'])}`\n> {format_snippet(row['snippet'])}"
+            emb.add_field(name=f"🎫 {row['ticketname'] or 'Ticket'} · {row['ticketid']}", value=value[:1024], inline=False) # 1024 is the limit of an embed field
+        emb.set_footer(text=bot_user_name, icon_url=bot_user_avatar_url)
+        return emb
+
+    @ui.button(label="Previous", emoji="◀️", style=discord.ButtonStyle.secondary)
+    @instrumented("search_page") # Duration, DB queries and REST calls (see metrics.py)
+    async def previous(self, interaction: discord.Interaction, button: ui.Button):
+        self.page = max(self.page - 1, 0)
+        emb = await self.render()
+        await interaction.response.edit_message(embed=emb, view=self)
+
+    @ui.button(label="Next", emoji="▶️", style=discord.ButtonStyle.secondary)
+    @instrumented("search_page")
+    async def next(self, interaction: discord.Interaction, button: ui.Button):
+        self.page += 1
+        emb = await self.render()
+        await interaction.response.edit_message(embed=emb, view=self)
 
 # ──────────────────────────────────────────────────────────────────────────────────────────────────────
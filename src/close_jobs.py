@@ -0,0 +1,306 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE DURABLE QUEUE OF THE TICKETS BEING CLOSED.
+
+CLOSING A TICKET TAKES SECONDS (HISTORY, TRANSCRIPT, ATTACHMENTS, UPLOADS, THEN THE DELETION OF THE CHANNEL), SO IT IS
+NOT DONE INSIDE THE INTERACTION: THE MODAL ONLY CLOSES THE TICKET IN THE DATABASE AND, IN THE SAME TRANSACTION, ADDS A
+ROW TO THE 'close_job' TABLE ('db.queue_close'), THEN ANSWERS IMMEDIATELY. THE JOBS ARE RUN BY A FIXED NUMBER OF ASYNC
+WORKERS ('close_job_workers' IN config.py), SO MANY TICKETS CLOSED AT THE SAME TIME ARE PROCESSED WITH A CONTROLLED
+CONCURRENCY INSTEAD OF ALL AT ONCE.
+
+A JOB IS A SEQUENCE OF STEPS, AND THE NEXT STEP IS SAVED IN THE DATABASE AFTER EACH ONE ('STEPS'):
+- lock:       ANNOUNCES THE CLOSING AND STOPS @everyone FROM WRITING IN THE CHANNEL.
+- transcript: RENDERS THE TRANSCRIPT WITH ITS ATTACHMENTS AND SAVES IT IN THE LOCAL ARCHIVE (SKIPPED IF ALREADY ARCHIVED);
+              THE MESSAGES ARE ALSO SAVED IN THE FULL-TEXT INDEX OF '/ticket-search' (SEE message_search.py).
+- deliver:    SENDS THE ARCHIVED TRANSCRIPT TO THE LOG CHANNEL, THE TICKET OWNER AND THE ARCHIVE CHANNELS (SEE delivery.py).
+- delete:     DELETES THE CHANNEL, 'close_job_delete_delay' SECONDS AFTER THE DELIVERY (A CHANNEL ALREADY GONE IS FINE).
+
+EVERY STEP CAN BE RUN AGAIN SAFELY, SO IF THE BOT STOPS IN THE MIDDLE OF A JOB, 'start' PUTS IT BACK IN THE QUEUE AND IT
+CONTINUES FROM THE LAST SAVED STEP. A STEP THAT FAILS IS RETRIED WITH AN EXPONENTIAL BACKOFF ('close_job_retry_delay',
+DOUBLED AT EVERY FAILURE) AND THE JOB IS MARKED AS 'failed' AFTER 'close_job_max_attempts' ATTEMPTS. THE ONLY STEP THAT
+CAN BE DONE TWICE IS AN UPLOAD OF THE DELIVERY (IF THE BOT STOPS RIGHT AFTER IT AND BEFORE ITS RESULT IS SAVED).
+"""
+
+import asyncio # We use asyncio to run the workers
+import discord # We use discord to send the transcript and delete the channel
+import logging # We use logging to report the progress and the failures of the jobs
+import os # We use os to build the path of the bundle
+import tempfile # We use tempfile to build the bundle in a temporary folder
+import time # We use time to measure how long a job takes
+
+from config import close_job_delete_delay, close_job_max_attempts, close_job_max_retry_delay, close_job_retry_delay, close_job_workers, transcript_archive_channels
+from database import db
+from delivery import ARCHIVE_CHANNEL_POLICY, BLOCKED, FAILED, LOG_CHANNEL_POLICY, OWNER_DM_POLICY, SENT, TOO_LARGE, Destination, fan_out, upload_limit
+from gateway import get_or_fetch_member
+from log_pipeline import log_context
+from message_search import message_rows
+from settings import settings
+from timeutils import format_timestamp, now_timestamp
+from transcript import attachment_markup, download_attachments, fetch_history, render_transcript, rewrite_transcript
+from transcript_archive import archive
+
+log = logging.getLogger(__name__)
+
+STEPS = ("lock", "transcript", "deliver", "delete") # The steps of a job, in order (after the last one the job is 'done')
+POLL_INTERVAL = 60 # Maximum seconds between two checks of the table (a new job wakes the dispatcher up immediately)
+
+def retry_delay(attempts):
+    """
+    RETURNS THE SECONDS TO WAIT BEFORE THE NEXT ATTEMPT OF A JOB THAT FAILED 'attempts' TIMES.
+    """
+    return min(close_job_retry_delay * 2 ** (attempts - 1), close_job_max_retry_delay)
+
+async def modify_transcript_with_attachments(transcript, history, files):
+    """
+    MODIFIES THE HTML TRANSCRIPT TO INCLUDE ALL ATTACHMENTS (IMAGES, VIDEOS, FILES) AS LINKS TO THE FILES OF THE BUNDLE.
+
+    FOR EACH ALREADY FETCHED MESSAGE WITH ATTACHMENTS, ADDS AN IMAGE, VIDEO OR DOWNLOAD LINK POINTING TO 'attachments/<name>',
+    THE FOLDER OF THE TRANSCRIPT BUNDLE (SEE 'AttachmentStore.build_bundle'). ONCE THE BUNDLE IS EXTRACTED, THE TRANSCRIPT
+    CAN BE VIEWED OFFLINE WITH ALL MEDIA INCLUDED. FILES THAT ARE TOO LARGE OR FAILED TO DOWNLOAD ARE ADDED AS A PLAIN LINK
+    TO THE ORIGINAL FILE INSTEAD.
+    THE HTML REWRITE RUNS IN A WORKER PROCESS (SEE 'rewrite_transcript'), SO THE BOT KEEPS RESPONDING WHILE IT IS RUNNING.
+
+    ARGS:
+        TRANSCRIPT: THE HTML TRANSCRIPT STRING GENERATED BY CHAT_EXPORTER.
+        HISTORY: THE MESSAGES OF THE CHANNEL, RETURNED BY 'fetch_history' (NO NEW HISTORY REQUEST IS MADE).
+        FILES: THE STORED ATTACHMENTS, RETURNED BY 'download_attachments'.
+
+    RETURNS:
+        BYTES: THE MODIFIED HTML TRANSCRIPT (UTF-8) WITH THE ATTACHMENTS.
+    """
+    return await rewrite_transcript(transcript, attachment_markup(history, files))
+
+class CloseJobQueue:
+    """
+    THE WORKERS THAT RUN THE CLOSE JOBS SAVED IN THE DATABASE.
+
+    A DISPATCHER TASK CLAIMS THE JOBS THAT ARE DUE ('db.claim_due_close_jobs') AND PUTS THEM IN AN ASYNCIO QUEUE, AND
+    'close_job_workers' WORKER TASKS TAKE THEM FROM THE QUEUE ONE AT A TIME. THE DISPATCHER SLEEPS UNTIL THE NEXT JOB IS
+    DUE, OR UNTIL 'wake' IS CALLED (A NEW JOB WAS QUEUED OR A JOB WAS RELEASED).
+
+    ATTRIBUTES:
+        BOT: THE DISCORD BOT (USED TO FIND THE GUILD AND THE CHANNELS OF THE JOBS).
+        WORKERS: THE NUMBER OF JOBS RUN AT THE SAME TIME.
+
+    USAGE:
+        AWAIT 'close_jobs.start(bot)' ONCE THE BOT IS READY, THEN CALL 'close_jobs.wake()' AFTER 'db.queue_close'.
+    """
+    def __init__(self, workers=close_job_workers):
+        self.bot = None
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = []
+
+    @property
+    def running(self):
+        return bool(self._tasks)
+
+    async def start(self, bot):
+        """
+        RESUMES THE JOBS INTERRUPTED BY THE LAST STOP AND STARTS THE DISPATCHER AND THE WORKERS. CALLING IT AGAIN DOES NOTHING.
+        """
+        if self.running:
+            return
+
+        self.bot = bot
+        resumed = await db.resume_close_jobs()
+        if resumed:
+            log.info("Resumed %d interrupted close jobs", resumed)
+
+        self._tasks.append(asyncio.create_task(self._dispatch(), name="close-job-dispatcher"))
+        for number in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._work(), name=f"close-job-worker-{number}"))
+
+    def wake(self):
+        """
+        TELLS THE DISPATCHER TO LOOK FOR DUE JOBS NOW (E.G. RIGHT AFTER A JOB WAS QUEUED).
+        """
+        self._wakeup.set()
+
+    async def _dispatch(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                # Only claim what the workers can start soon: the other jobs stay 'pending' in the table
+                for job_id in await db.claim_due_close_jobs(now_timestamp(), max(self.workers - self._queue.qsize(), 0)):
+                    self._queue.put_nowait(job_id)
+                next_run = await db.get_next_close_job_time()
+            except Exception:
+                log.exception("Unable to read the close jobs")
+                next_run = None
+
+            timeout = POLL_INTERVAL if next_run is None else min(max(next_run - now_timestamp(), 0), POLL_INTERVAL)
+            if timeout == 0 and self._queue.qsize() >= self.workers:
+                timeout = POLL_INTERVAL # Jobs are due but every worker is busy: a finished job will wake us up
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run(job_id)
+            except Exception:
+                log.exception("Close job %d stopped unexpectedly", job_id)
+            finally:
+                self._queue.task_done()
+                self.wake() # A worker is free (and the job may have been released for later)
+
+    async def run(self, job_id):
+        """
+        RUNS THE REMAINING STEPS OF A JOB, SAVING THE NEXT STEP AFTER EACH ONE. ON ERROR THE JOB IS RELEASED FOR A RETRY
+        (OR MARKED AS 'failed' AFTER 'close_job_max_attempts' ATTEMPTS).
+        """
+        job = await db.get_close_job(job_id)
+        if job is None or job["step"] not in STEPS:
+            return
+
+        with log_context(ticket_id=job["ticketid"], guild_id=job["guildid"], user_id=job["closerid"], job_id=job_id): # Every record of the job carries its ticket
+            await self._run(job_id, job)
+
+    async def _run(self, job_id, job):
+        start = time.perf_counter()
+        guild = self.bot.get_guild(job["guildid"])
+        channel = guild.get_channel(job["ticketid"]) if guild is not None else None
+
+        try:
+            for step in STEPS[STEPS.index(job["step"]):]:
+                await getattr(self, f"_{step}")(job, guild, channel)
+                if step == "deliver":
+                    # The channel is deleted a few seconds later: release the job instead of keeping a worker asleep
+                    await db.checkpoint_close_job(job_id, "delete", now_timestamp() + close_job_delete_delay)
+                    return
+                if step != STEPS[-1]:
+                    await db.checkpoint_close_job(job_id, STEPS[STEPS.index(step) + 1])
+        except Exception as e:
+            attempts = job["attempts"] + 1
+            if attempts >= close_job_max_attempts:
+                log.error("Close job %d (ticket %d) failed at step '%s' after %d attempts: %r", job_id, job["ticketid"], step, attempts, e)
+                await db.retry_close_job(job_id, attempts, repr(e))
+            else:
+                delay = retry_delay(attempts)
+                log.warning("Close job %d (ticket %d) failed at step '%s', retrying in %ds: %r", job_id, job["ticketid"], step, delay, e)
+                await db.retry_close_job(job_id, attempts, repr(e), now_timestamp() + delay)
+            return
+
+        await db.finish_close_job(job_id)
+        log.info("Close job %d (ticket %d) done", job_id, job["ticketid"], extra={"latency_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # STEPS (EACH ONE CAN BE RUN AGAIN SAFELY)
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def _lock(self, job, guild, channel):
+        """
+        ANNOUNCES THE CLOSING AND STOPS @everyone FROM WRITING IN THE TICKET.
+        """
+        if channel is None:
+            return
+
+        overwrite = channel.overwrites_for(guild.default_role)
+        if overwrite.send_messages is False:
+            return # Already locked by a previous attempt
+
+        await channel.send(f"The ticket was closed by <@{job['closerid']}>... (This ticket will be closed in a few seconds)")
+        overwrite.send_messages = False
+        await channel.set_permissions(guild.default_role, overwrite=overwrite)
+
+    async def _transcript(self, job, guild, channel):
+        """
+        INDEXES THE MESSAGES FOR THE SEARCH, RENDERS THE TRANSCRIPT (WITH THE ATTACHMENTS) AND SAVES IT IN THE LOCAL ARCHIVE.
+        NOTHING IS DONE IF THE TRANSCRIPT IS ALREADY ARCHIVED, IF THE CHANNEL NO LONGER EXISTS OR IF IT HAS NO MESSAGES.
+        """
+        archived = await db.get_transcript(job["ticketid"])
+        if channel is None or (archived is not None and await asyncio.to_thread(archive.exists, archived["filename"])):
+            return
+
+        history = await fetch_history(channel) # The only history fetch: shared by the HTML, the attachments and the search index
+        await db.index_messages(channel.id, message_rows(channel.id, history)) # Searchable with /ticket-search once the channel is deleted (see message_search.py)
+        transcript = await render_transcript(channel, history)
+        if not transcript:
+            return
+
+        files = await download_attachments(history, guild.filesize_limit) # Streamed to the attachment store, not kept in memory
+        modified_transcript = await modify_transcript_with_attachments(transcript, history, files)
+        filename, compressed_size = await asyncio.to_thread(archive.save, channel.id, modified_transcript)
+        await db.save_transcript(channel.id, channel.name, filename, [name for name in files.values() if name], len(modified_transcript), compressed_size, now_timestamp())
+
+    async def _deliver(self, job, guild, channel):
+        """
+        SENDS THE ARCHIVED TRANSCRIPT (AS A ZIP BUNDLE) TO THE LOG CHANNEL, THE TICKET OWNER AND THE ARCHIVE CHANNELS, ALL AT
+        THE SAME TIME (SEE delivery.py). THE RESULT OF EVERY DESTINATION IS SAVED: A RETRY ONLY SENDS TO THE DESTINATIONS
+        THAT HAVE NOT RECEIVED IT YET. A DESTINATION THAT REFUSES THE TRANSCRIPT (E.G. CLOSED DMS) IS NOT RETRIED; IF A
+        DESTINATION FAILED, THE STEP FAILS SO THE JOB IS RETRIED LATER.
+
+        EVERY DESTINATION GETS A BUNDLE THAT FITS ITS UPLOAD LIMIT (ONE BUNDLE PER LIMIT: THE SERVER, THE DMS, THE OTHER
+        SERVERS OF THE ARCHIVE CHANNELS). A DESTINATION THAT STILL ANSWERS THAT THE FILE IS TOO LARGE GETS THE HTML ALONE.
+        """
+        archived = await db.get_transcript(job["ticketid"])
+        if archived is None or guild is None:
+            return # No transcript (e.g. an empty channel): nothing to deliver
+
+        embed_data = await db.get_ticket(job["ticketid"])
+        transcriptchannel = guild.get_channel(settings.current.transcript_channel_id)
+
+        destinations = [
+            Destination("log", transcriptchannel, LOG_CHANNEL_POLICY),
+            Destination("owner", await get_or_fetch_member(guild, embed_data[6]), OWNER_DM_POLICY), # Usually not cached (see gateway.py)
+            *(Destination(f"archive:{channel_id}", self.bot.get_channel(channel_id), ARCHIVE_CHANNEL_POLICY) for channel_id in transcript_archive_channels),
+        ]
+        delivered = await db.get_deliveries(job["ticketid"])
+        destinations = [destination for destination in destinations if delivered.get(destination.key) not in (SENT, BLOCKED)]
+        if not destinations:
+            return
+
+        emb = discord.Embed(title="📄 | New Transcript Generated", color=discord.Color.blue())
+        emb.add_field(name="🆔 Ticket ID", value=f"`{embed_data[2]}`", inline=True)
+        emb.add_field(name="📁 Category", value=f"`{embed_data[3]}`", inline=True)
+        emb.add_field(name="🔒 Closed by", value=f"<@{embed_data[7]}>", inline=True)
+        emb.add_field(name="👤 Opened by", value=f"<@{embed_data[5]}>", inline=True)
+        emb.add_field(name="📅 Opened on", value=f"`{format_timestamp(embed_data['openedat'])}`", inline=True)
+        emb.add_field(name="📅 Closed on", value=f"`{format_timestamp(embed_data['closedat'])}`", inline=True)
+        emb.add_field(name="📝 Reason for closing", value=f"```{job['reason']}```", inline=True)
+
+        limits = {} # Upload limit -> the destinations that have it
+        for destination in destinations:
+            limits.setdefault(upload_limit(destination.target), []).append(destination)
+
+        with tempfile.TemporaryDirectory() as folder: # The bundles are only needed for the uploads
+            sent = await asyncio.gather(*(self._send_bundle(archived, folder, group, limit, embed=emb) for limit, group in limits.items()))
+            results = [result for group in sent for result in group]
+            too_large = {result.key for result in results if result.status == TOO_LARGE}
+            if too_large: # Smaller limit than expected (e.g. a server that lost its boosts): send the HTML alone
+                results = [result for result in results if result.key not in too_large]
+                results += await self._send_bundle(archived, folder, [destination for destination in destinations if destination.key in too_large], 0, embed=emb)
+
+        await db.save_deliveries(job["ticketid"], results)
+        failed = [result.key for result in results if result.status in (FAILED, TOO_LARGE)]
+        if failed:
+            raise RuntimeError(f"transcript not delivered to {', '.join(failed)}")
+
+    async def _send_bundle(self, archived, folder, destinations, max_bytes, **message):
+        """
+        BUILDS THE BUNDLE OF AN ARCHIVED TRANSCRIPT, AT MOST 'max_bytes' BIG (0: THE HTML ALONE), AND SENDS IT TO THE
+        DESTINATIONS (SEE 'fan_out').
+
+        RETURNS:
+            LIST: ONE DELIVERYRESULT PER DESTINATION, IN THE SAME ORDER.
+        """
+        bundle_path = await asyncio.to_thread(archive.build_bundle, archived, os.path.join(folder, f"{max_bytes}.zip"), max_bytes)
+        return await fan_out(destinations, bundle_path, f"transcript-{archived['ticketname']}.zip", **message)
+
+    async def _delete(self, job, guild, channel):
+        """
+        DELETES THE TICKET CHANNEL (IF IT STILL EXISTS).
+        """
+        if channel is None:
+            return
+
+        try:
+            await channel.delete()
+        except discord.NotFound:
+            pass # Already deleted (by a previous attempt or by hand)
+
+close_jobs = CloseJobQueue() # The shared instance used by the bot
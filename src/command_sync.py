@@ -0,0 +1,71 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE SYNCHRONIZATION OF THE SLASH COMMANDS WITH DISCORD.
+
+'bot.tree.sync()' UPLOADS ALL THE COMMANDS AND IS HEAVILY RATE LIMITED BY DISCORD, BUT THE COMMANDS ONLY CHANGE WHEN THE
+CODE CHANGES. SO 'sync_commands' HASHES THE SERIALIZED COMMAND TREE (THE SAME PAYLOAD SENT TO DISCORD) AND COMPARES IT
+WITH THE HASH OF THE LAST SYNC, SAVED IN THE 'bot_state' TABLE: THE SYNC IS DONE ONLY IF THE HASH IS DIFFERENT. THE
+'/sync' COMMAND FORCES IT (E.G. AFTER THE COMMANDS WERE CHANGED OR DELETED FROM ANOTHER PLACE).
+
+WITH 'command_sync_guild_id' IN config.py THE COMMANDS ARE MOVED TO THAT GUILD (ONCE, THE FIRST TIME) AND SYNCED ONLY
+THERE: GUILD COMMANDS ARE UPDATED INSTANTLY, WHICH IS USEFUL WHILE DEVELOPING. THE GLOBAL COMMANDS OF A PREVIOUS GLOBAL
+SYNC WOULD STILL BE SHOWN NEXT TO THEM (EVERY COMMAND TWICE), SO AN EMPTY GLOBAL TREE IS SYNCED ONCE (AND AGAIN BY
+'/sync'). EVERY SCOPE (GLOBAL OR GUILD) HAS ITS OWN HASH.
+"""
+
+import discord # We use discord to build the guild of the sync
+import hashlib # We use hashlib to hash the command tree
+import json # We use json to serialize the command tree
+import logging # We use logging to report the syncs
+
+from config import command_sync_guild_id
+from database import db
+
+log = logging.getLogger(__name__)
+
+def sync_guild():
+    """
+    RETURNS THE GUILD WHERE THE COMMANDS ARE SYNCED ('command_sync_guild_id'), OR NONE FOR A GLOBAL SYNC.
+    """
+    return None if command_sync_guild_id is None else discord.Object(id=command_sync_guild_id)
+
+def command_tree_hash(tree, guild=None):
+    """
+    RETURNS THE SHA-256 OF THE COMMANDS OF THE GIVEN SCOPE, SERIALIZED LIKE THE PAYLOAD OF A SYNC (INDEPENDENT OF THE ORDER
+    IN WHICH THE COMMANDS WERE ADDED).
+    """
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)), key=lambda command: (command.get("type", 1), command["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+async def sync_commands(tree, force=False):
+    """
+    SYNCS THE COMMANDS WITH DISCORD IF THEY CHANGED SINCE THE LAST SYNC (OR IF 'force' IS TRUE).
+
+    ARGS:
+        TREE: THE COMMAND TREE OF THE BOT.
+        FORCE: SYNC EVEN IF THE HASH DID NOT CHANGE.
+
+    RETURNS:
+        LIST OR NONE: THE SYNCED COMMANDS, OR NONE IF THE SYNC WAS SKIPPED.
+    """
+    guild = sync_guild()
+    if guild is not None and tree.get_commands():
+        tree.copy_global_to(guild=guild) # The first call: the commands become guild commands
+        tree.clear_commands(guild=None)
+
+    if guild is not None:
+        digest = command_tree_hash(tree) # The hash of an empty tree
+        if force or await db.get_state("command_tree_hash:global") != digest:
+            await tree.sync() # Removes the global commands of a previous global sync
+            await db.set_state("command_tree_hash:global", digest)
+            log.info("Cleared the global commands (the commands are synced in guild %d)", guild.id)
+
+    key = f"command_tree_hash:{'global' if guild is None else guild.id}"
+    digest = command_tree_hash(tree, guild)
+    if not force and await db.get_state(key) == digest:
+        log.info("Command tree unchanged (%s): sync skipped", digest[:12])
+        return None
+
+    synced = await tree.sync(guild=guild)
+    await db.set_state(key, digest)
+    log.info("Synced %d commands (%s, %s)", len(synced), "global" if guild is None else f"guild {guild.id}", digest[:12])
+    return synced
@@ -11,4 +11,58 @@ TOKEN=os.getenv('TOKEN') # Here we fetch the token with os.getenv
 
 bot_user_name = f"Ticket Bot | {datetime.now().strftime("%d/%m/%Y %H:%M:%S")}" # Insert the name of the bot or what do you want
 # Insert the link of the image of the bot (.png)
-bot_user_avatar_url = r"https://cdn.discordapp.com/avatars/1106645819811184754/fe158876f71fefd32543a846c8ca69ce.webp?size=1024" 
\ No newline at end of file
+bot_user_avatar_url = r"https://cdn.discordapp.com/avatars/1106645819811184754/fe158876f71fefd32543a846c8ca69ce.webp?size=1024" 
+
+database_path = "data/database/ticket.db" # The path of the SQLite database used by the bot (see database.py)
+
+# Transcript attachments: how many files are downloaded at the same time, the maximum size of a single file and of all
+# the files of one transcript (in bytes; None follows the upload limit of the server, 10 MiB without boosts, so the
+# bundle can still be sent), and the seconds to wait for each download. Files over the limits, or that fail to download
+# in time, are added to the transcript as a plain link instead of being embedded.
+transcript_download_concurrency = 8
+transcript_max_file_bytes = None
+transcript_max_total_bytes = None
+transcript_download_timeout = 30
+attachment_store_path = "data/attachments" # The folder where the transcript attachments are stored (see attachment_store.py)
+transcript_process_workers = 2 # Processes used to rewrite the transcript HTML outside the event loop (see transcript.py)
+transcript_archive_path = "data/transcripts" # The folder where the compressed transcripts are archived (see transcript_archive.py)
+
+# Ticket closing jobs (see close_jobs.py): how many tickets are closed at the same time, how many times a job is tried
+# before it is marked as failed, the seconds to wait before the first retry (doubled after every failure, up to
+# close_job_max_retry_delay), and the seconds between the delivery of the transcript and the deletion of the channel.
+close_job_workers = 4
+close_job_max_attempts = 5
+close_job_retry_delay = 10
+close_job_max_retry_delay = 600
+close_job_delete_delay = 5
+transcript_archive_channels = [] # IDs of extra channels that receive a copy of every transcript (e.g. an archive server)
+channel_pool_size = 0 # Hidden channels kept ready in every ticket category to open tickets faster (0 disables the pool)
+channel_pool_refill_interval = 10 # Seconds between two channel creations when the pool is refilled
+command_sync_guild_id = None # Guild ID where the slash commands are synced instantly (for development); None syncs them globally
+presence_text = "{count} open tickets" # The presence of the bot; '{count}' is replaced with the number of open tickets
+presence_min_interval = 30 # Minimum seconds between two presence updates (Discord rate-limits them)
+bot_intents = ["guilds", "members", "guild_messages", "message_content"] # Gateway intents of the bot (see gateway.py); ["all"] enables every intent (much more RAM on big servers)
+member_cache = "none" # Members kept in memory: "none" (fetched when needed), "joined" or "all"
+chunk_guilds_at_startup = False # Download the whole member list of the server at startup (slow on big servers)
+
+# The IDs of your server (see settings.py; '/settings-reload' applies the changes without a restart). To get an ID,
+# enable the Developer Mode in Discord and right-click the server/role/channel/category > "Copy ID".
+guild_id = 0 # The server of the bot
+staff_role_ids = [] # The roles that see and manage the tickets
+admin_role_ids = [] # The roles that can configure the bot (/ticket-setup, /sync, /settings-reload, /ticket-stats-rebuild)
+ticket_categories = {"1": 0} # Value of the option of the ticket menu -> ID of the category where that ticket is opened ("1" is Assistance)
+extra_ticket_category_ids = [] # Other categories that contain tickets (e.g. where they are moved with /ticket-move)
+transcript_channel_id = 0 # The channel that receives the transcripts
+setup_channel_id = 0 # The channel where /ticket-setup sends the ticket menu
+
+# Logging (see log_pipeline.py): the logs are written by a background thread as JSON lines in 'log_file' and to the console.
+log_level = "INFO" # "DEBUG" for more verbose output
+log_file = "logs/bot.log" # The log file (the old files get a numeric or date suffix when it rotates)
+log_max_bytes = 10 * 1024 * 1024 # Rotate the log file when it reaches this size (used when 'log_rotate_when' is None)
+log_rotate_when = None # Rotate the log file at a time instead of a size, e.g. "midnight" (see logging.handlers.TimedRotatingFileHandler)
+log_backup_count = 5 # Old log files kept after a rotation
+log_queue_size = 10000 # Records waiting to be written; when the queue is full the new records are dropped (and counted)
+
+# Metrics (see metrics.py): always recorded and shown by /ticket-metrics; set 'metrics_port' to also serve them to Prometheus.
+metrics_host = "127.0.0.1" # The address of the metrics endpoint (keep it local unless it is behind a firewall)
+metrics_port = None # The port of http://metrics_host:metrics_port/metrics, e.g. 9108; None disables the endpoint
\ No newline at end of file
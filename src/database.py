@@ -0,0 +1,483 @@
+"""
+IN THIS PYTHON FILE NAMED "DATABASE.PY" WE DEFINE THE SHARED, ASYNCHRONOUS DATA-ACCESS LAYER OF THE BOT.
+EVERY EVENT, COMMAND, VIEW AND MODAL TALKS TO THE TICKET DATABASE THROUGH THE 'db' INSTANCE CREATED AT THE BOTTOM OF THIS FILE.
+
+SQLITE3 IS A BLOCKING LIBRARY: IF WE CALL IT DIRECTLY FROM AN EVENT HANDLER, THE WHOLE EVENT LOOP (HEARTBEATS, OTHER
+INTERACTIONS, ...) WAITS FOR THE DISK. TO AVOID THIS WE KEEP ONE LONG-LIVED CONNECTION THAT LIVES ON A DEDICATED THREAD
+(A 'ThreadPoolExecutor' WITH A SINGLE WORKER) AND WE 'await' EVERY QUERY FROM THE EVENT LOOP.
+- A SINGLE WORKER MEANS ALL QUERIES ARE SERIALIZED, SO WE NEVER NEED LOCKS AROUND THE CONNECTION.
+- THE CONNECTION USES WAL JOURNAL MODE AND A FEW TUNED PRAGMAS (SEE '_connect').
+- SQLITE3 CACHES THE PREPARED STATEMENTS OF A CONNECTION ('cached_statements'), SO REUSING THE SAME CONNECTION
+  MEANS EVERY QUERY BELOW IS PARSED ONLY ONCE.
+"""
+
+import asyncio # We use asyncio to await the queries executed on the database thread
+import json # We use json to store lists in a single column
+import sqlite3 # We use sqlite3 to talk to the database
+import time # We use time to measure the queries
+
+from concurrent.futures import ThreadPoolExecutor # The dedicated thread where the connection lives
+from config import database_path # The path of the database file
+from metrics import record_db_query # The query metrics (see metrics.py)
+import message_search # The full-text index of the messages of the closed tickets (see message_search.py)
+from migrations import apply_migrations # The versioned schema of the database (see migrations.py)
+import ticket_stats # The rollups of the ticket statistics, updated by the ticket writes (see ticket_stats.py)
+from ticket_index import TicketIndex # The in-memory index of the open tickets (see ticket_index.py)
+from timeutils import now_timestamp # Used to date the changes of the close jobs
+
+"""
+THE PRAGMAS APPLIED TO THE CONNECTION WHEN IT IS OPENED.
+- 'journal_mode=WAL' LETS READERS AND THE WRITER WORK AT THE SAME TIME AND MAKES COMMITS MUCH CHEAPER.
+- 'synchronous=NORMAL' IS SAFE WITH WAL AND AVOIDS AN FSYNC ON EVERY COMMIT.
+- 'temp_store=MEMORY' KEEPS TEMPORARY TABLES/INDEXES IN RAM.
+- 'cache_size=-16000' GIVES THE PAGE CACHE ~16MB (NEGATIVE VALUES ARE KIB).
+- 'busy_timeout=5000' WAITS UP TO 5 SECONDS IF ANOTHER PROCESS (E.G. A MANUAL SQLITE SHELL) HOLDS A LOCK.
+"""
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA busy_timeout=5000",
+)
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+class Database:
+    """
+    THE ASYNCHRONOUS WRAPPER AROUND THE TICKET DATABASE.
+
+    ALL THE SQL OF THE BOT LIVES IN THIS CLASS. EACH PUBLIC METHOD IS A COROUTINE THAT RUNS ITS QUERY ON THE DATABASE
+    THREAD AND RETURNS THE RESULT TO THE EVENT LOOP. ROWS ARE RETURNED AS 'sqlite3.Row' OBJECTS, SO THEY CAN BE READ
+    BOTH BY INDEX (row[2]) AND BY COLUMN NAME (row["ticketid"]).
+
+    ATTRIBUTES:
+        PATH: THE PATH OF THE DATABASE FILE.
+        OPEN_TICKETS: THE IN-MEMORY INDEX OF THE OPEN TICKETS, KEPT IN SYNC BY THE WRITE METHODS OF THIS CLASS.
+
+    USAGE:
+        AWAIT 'db.connect()' ONCE AT STARTUP, THEN AWAIT ANY METHOD FROM EVENTS, COMMANDS AND VIEWS.
+    """
+    def __init__(self, path=database_path):
+        """
+        INITIALIZES THE DATABASE WRAPPER. THE CONNECTION IS NOT OPENED HERE, BUT IN 'connect()'.
+
+        ARGS:
+            PATH: THE PATH OF THE DATABASE FILE.
+        """
+        self.path = path
+        self._conn = None
+        self.open_tickets = TicketIndex()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ticket-db")
+
+    async def _run(self, func, *args):
+        """
+        RUNS 'func(*args)' ON THE DATABASE THREAD AND RETURNS ITS RESULT WITHOUT BLOCKING THE EVENT LOOP.
+        THE DURATION (INCLUDING THE WAIT FOR THE THREAD) IS RECORDED BY OPERATION ('execute', 'fetchone', ...).
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            record_db_query(func.__name__.lstrip("_"), time.perf_counter() - start)
+
+    def _connect(self):
+        """
+        OPENS THE CONNECTION, APPLIES THE PRAGMAS AND BRINGS THE SCHEMA UP TO DATE. RUNS ON THE DATABASE THREAD.
+        IF THE ROLLUPS OF THE STATISTICS ARE EMPTY (MIGRATION 9 CREATES THEM EMPTY) THEY ARE FILLED FROM THE EXISTING TICKETS.
+        """
+        conn = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+
+        apply_migrations(conn)
+        if conn.execute("SELECT 1 FROM ticket_stats_day LIMIT 1").fetchone() is None: # Any ticket ever counted leaves a row
+            with conn:
+                ticket_stats.rebuild(conn)
+        self._conn = conn
+
+    def _close(self):
+        """
+        CLOSES THE CONNECTION. RUNS ON THE DATABASE THREAD.
+        """
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _execute(self, sql, params):
+        """
+        EXECUTES A WRITE QUERY AND COMMITS IT. RETURNS THE NUMBER OF CHANGED ROWS.
+        IF THE QUERY FAILS THE TRANSACTION IS ROLLED BACK, SO THE CONNECTION IS NEVER LEFT IN A BROKEN STATE.
+        """
+        with self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def _insert(self, sql, params):
+        """
+        EXECUTES AN INSERT QUERY AND COMMITS IT. RETURNS THE ID OF THE NEW ROW.
+        """
+        with self._conn:
+            return self._conn.execute(sql, params).lastrowid
+
+    def _fetchone(self, sql, params):
+        return self._conn.execute(sql, params).fetchone()
+
+    def _fetchall(self, sql, params):
+        return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, func):
+        """
+        RUNS 'func(conn)' INSIDE A SINGLE TRANSACTION (COMMIT ON SUCCESS, ROLLBACK ON ERROR).
+        """
+        with self._conn:
+            return func(self._conn)
+
+    async def connect(self):
+        """
+        OPENS THE SHARED CONNECTION. CALLING IT MORE THAN ONCE DOES NOTHING.
+
+        SIDE EFFECTS:
+            CREATES THE DATABASE FILE IF IT DOES NOT EXIST, APPLIES THE PENDING MIGRATIONS AND LOADS THE OPEN TICKETS INDEX.
+        """
+        if self._conn is None:
+            await self._run(self._connect)
+            await self.load_open_tickets()
+
+    async def close(self):
+        """
+        CLOSES THE SHARED CONNECTION FROM THE EVENT LOOP.
+        """
+        await self._run(self._close)
+
+    def shutdown(self):
+        """
+        CLOSES THE CONNECTION AND STOPS THE DATABASE THREAD. THIS IS A NORMAL (NOT ASYNC) METHOD, SO IT CAN BE CALLED
+        AFTER THE EVENT LOOP HAS ALREADY STOPPED (E.G. AFTER 'bot.run()' RETURNS).
+        """
+        self._executor.submit(self._close).result()
+        self._executor.shutdown(wait=True)
+
+    async def execute(self, sql, params=()):
+        """
+        EXECUTES A WRITE QUERY (INSERT, UPDATE, DELETE, ...) AND COMMITS IT.
+
+        RETURNS:
+            INT: THE NUMBER OF CHANGED ROWS.
+        """
+        return await self._run(self._execute, sql, params)
+
+    async def insert(self, sql, params=()):
+        """
+        EXECUTES AN INSERT QUERY AND COMMITS IT.
+
+        RETURNS:
+            INT: THE ID OF THE NEW ROW.
+        """
+        return await self._run(self._insert, sql, params)
+
+    async def fetchone(self, sql, params=()):
+        """
+        EXECUTES A SELECT QUERY AND RETURNS THE FIRST ROW (OR NONE).
+        """
+        return await self._run(self._fetchone, sql, params)
+
+    async def fetchall(self, sql, params=()):
+        """
+        EXECUTES A SELECT QUERY AND RETURNS ALL THE ROWS.
+        """
+        return await self._run(self._fetchall, sql, params)
+
+    async def transaction(self, func):
+        """
+        RUNS 'func(conn)' ON THE DATABASE THREAD INSIDE ONE TRANSACTION AND RETURNS ITS RESULT.
+        USE IT WHEN SEVERAL QUERIES MUST BE APPLIED TOGETHER OR NOT AT ALL.
+        """
+        return await self._run(self._transaction, func)
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # TICKET QUERIES
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def load_open_tickets(self):
+        """
+        (RE)LOADS THE IN-MEMORY INDEX OF THE OPEN TICKETS FROM THE DATABASE.
+
+        RETURNS:
+            INT: THE NUMBER OF OPEN TICKETS.
+        """
+        self.open_tickets.load(await self.fetchall("""SELECT * FROM ticket WHERE statusticket = 'open'"""))
+        return len(self.open_tickets)
+
+    async def get_ticket(self, ticket_id):
+        """
+        RETURNS THE MOST RECENT ROW OF THE TICKET WITH THE GIVEN CHANNEL ID (OPEN OR CLOSED), OR NONE.
+        """
+        return await self.fetchone("""SELECT * FROM ticket WHERE ticketid = ? ORDER BY id DESC LIMIT 1""", (ticket_id,))
+
+    async def create_ticket(self, ticketname, ticketid, categoryname, categoryid, openername, openerid, openedat):
+        """
+        SAVES A NEW OPEN TICKET AND COUNTS IT IN THE STATISTICS (SEE ticket_stats.py). 'openedat' IS A UNIX TIMESTAMP (SEE timeutils.py).
+
+        RETURNS:
+            DICT: THE NEW TICKET, AS STORED IN THE OPEN TICKETS INDEX.
+        """
+        ticket = {
+            "ticketname": ticketname, "ticketid": ticketid, "categoryname": categoryname, "categoryid": categoryid,
+            "openername": openername, "openerid": openerid, "closurename": '', "closureid": '',
+            "openedat": openedat, "closedat": None, "statusticket": 'open',
+        }
+        def create(conn):
+            ticket_stats.record_open(conn, categoryid, categoryname, openedat)
+            return conn.execute("""INSERT INTO 'ticket' (ticketname, ticketid, categoryname, categoryid, openername, openerid, closurename, closureid, openedat, closedat, statusticket) VALUES (:ticketname, :ticketid, :categoryname, :categoryid, :openername, :openerid, :closurename, :closureid, :openedat, :closedat, :statusticket)""", ticket).lastrowid
+
+        ticket["id"] = await self.transaction(create)
+        self.open_tickets.add(ticket)
+        return ticket
+
+    async def rename_ticket(self, ticket_id, newname):
+        """
+        UPDATES THE NAME OF AN OPEN TICKET.
+        """
+        await self.execute("""UPDATE 'ticket' SET ticketname = ? WHERE ticketid = ? AND statusticket = 'open'""", (newname, ticket_id))
+        self.open_tickets.update(ticket_id, ticketname=newname)
+
+    async def move_ticket(self, ticket_id, categoryname, categoryid):
+        """
+        UPDATES THE CATEGORY OF AN OPEN TICKET AND MOVES IT TO THAT CATEGORY IN THE STATISTICS.
+        """
+        def move(conn):
+            row = conn.execute("""SELECT id, categoryname, categoryid, openedat FROM ticket WHERE ticketid = ? AND statusticket = 'open'""", (ticket_id,)).fetchone()
+            if row is None or row["categoryid"] == categoryid:
+                return
+            conn.execute("""UPDATE 'ticket' SET categoryname = ?, categoryid = ? WHERE id = ?""", (categoryname, categoryid, row["id"]))
+            ticket_stats.record_move(conn, row["categoryid"], row["categoryname"], categoryid, categoryname, row["openedat"])
+
+        await self.transaction(move)
+        self.open_tickets.update(ticket_id, categoryname=categoryname, categoryid=categoryid)
+
+    def _close_ticket(self, conn, ticket_id, closurename, closureid, closedat):
+        """
+        MARKS AN OPEN TICKET AS CLOSED AND COUNTS THE CLOSE IN THE STATISTICS. RUNS ON THE DATABASE THREAD, INSIDE A TRANSACTION.
+
+        RETURNS:
+            BOOL: TRUE IF THE TICKET WAS OPEN AND IS NOW CLOSED.
+        """
+        row = conn.execute("""SELECT id, categoryname, categoryid, openedat FROM ticket WHERE ticketid = ? AND statusticket = 'open'""", (ticket_id,)).fetchone()
+        if row is None:
+            return False
+        conn.execute("""UPDATE ticket SET closurename = ?, closureid = ?, closedat = ?, statusticket = 'closed' WHERE id = ?""", (closurename, closureid, closedat, row["id"]))
+        ticket_stats.record_close(conn, row["categoryid"], row["categoryname"], closureid, closurename, row["openedat"], closedat)
+        return True
+
+    async def delete_open_ticket(self, ticket_id):
+        """
+        DELETES THE OPEN TICKET WITH THE GIVEN CHANNEL ID (USED WHEN A TICKET CHANNEL IS DELETED MANUALLY) AND REMOVES IT
+        FROM THE STATISTICS.
+
+        RETURNS:
+            BOOL: TRUE IF A TICKET WAS DELETED.
+        """
+        def delete(conn):
+            row = conn.execute("""SELECT id, categoryname, categoryid, openedat FROM ticket WHERE ticketid = ? AND statusticket = 'open'""", (ticket_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute("""DELETE FROM 'ticket' WHERE id = ?""", (row["id"],))
+            ticket_stats.record_delete(conn, row["categoryid"], row["categoryname"], row["openedat"])
+            return True
+
+        deleted = await self.transaction(delete)
+        self.open_tickets.remove(ticket_id)
+        return deleted
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # TRANSCRIPT ARCHIVE
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def save_transcript(self, ticket_id, ticketname, filename, attachments, size, compressedsize, createdat):
+        """
+        INDEXES THE ARCHIVED TRANSCRIPT OF A TICKET (SEE transcript_archive.py). A TRANSCRIPT ALREADY SAVED FOR THE SAME
+        TICKET IS REPLACED. 'attachments' IS THE LIST OF THE NAMES OF THE STORED FILES REFERENCED BY THE HTML.
+        """
+        await self.execute("""INSERT OR REPLACE INTO transcript (ticketid, ticketname, filename, attachments, size, compressedsize, createdat) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                           (ticket_id, ticketname, filename, json.dumps(sorted(set(attachments))), size, compressedsize, createdat))
+
+    async def get_transcript(self, ticket_id):
+        """
+        RETURNS THE ARCHIVED TRANSCRIPT OF A TICKET (WITH 'attachments' DECODED AS A LIST), OR NONE IF IT WAS NOT ARCHIVED.
+        """
+        row = await self.fetchone("""SELECT * FROM transcript WHERE ticketid = ?""", (ticket_id,))
+        if row is None:
+            return None
+        transcript = dict(row)
+        transcript["attachments"] = json.loads(transcript["attachments"])
+        return transcript
+
+    async def get_deliveries(self, ticket_id):
+        """
+        RETURNS THE DELIVERY RESULTS OF THE TRANSCRIPT OF A TICKET, AS A DICTIONARY DESTINATION KEY -> STATUS.
+        """
+        return {row["destination"]: row["status"] for row in await self.fetchall("""SELECT destination, status FROM delivery WHERE ticketid = ?""", (ticket_id,))}
+
+    async def save_deliveries(self, ticket_id, results):
+        """
+        SAVES THE RESULTS OF A DELIVERY (A LIST OF 'DeliveryResult', SEE delivery.py), REPLACING THE PREVIOUS ONES.
+        """
+        now = now_timestamp()
+        def save(conn):
+            conn.executemany("""INSERT OR REPLACE INTO delivery (ticketid, destination, status, attempts, lasterror, updatedat) VALUES (?, ?, ?, ?, ?, ?)""",
+                             [(ticket_id, result.key, result.status, result.attempts, result.error, now) for result in results])
+
+        await self.transaction(save)
+
+    async def index_messages(self, ticket_id, rows):
+        """
+        SAVES THE MESSAGES OF A CLOSED TICKET IN THE FULL-TEXT INDEX, REPLACING THE ONES ALREADY INDEXED FOR THAT TICKET
+        (SEE message_search.py). 'rows' ARE THE TUPLES RETURNED BY 'message_rows'.
+
+        RETURNS:
+            INT: THE NUMBER OF INDEXED MESSAGES.
+        """
+        return await self.transaction(lambda conn: message_search.index(conn, ticket_id, rows))
+
+    async def search_messages(self, expression, limit, offset=0):
+        """
+        RETURNS THE INDEXED MESSAGES THAT MATCH AN FTS5 EXPRESSION, THE MOST RELEVANT FIRST (SEE 'search' IN message_search.py).
+        """
+        return await self._run(self._search_messages, expression, limit, offset)
+
+    def _search_messages(self, expression, limit, offset):
+        return message_search.search(self._conn, expression, limit, offset)
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # CLOSE JOBS
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def queue_close(self, ticket_id, guild_id, closurename, closureid, reason, closedat):
+        """
+        MARKS AN OPEN TICKET AS CLOSED AND QUEUES ITS CLOSE JOB (SEE close_jobs.py) IN THE SAME TRANSACTION: EITHER BOTH
+        HAPPEN OR NEITHER, SO A CLOSED TICKET ALWAYS HAS A JOB THAT WILL FINISH CLOSING IT, EVEN AFTER A RESTART.
+
+        RETURNS:
+            INT OR NONE: THE ID OF THE NEW JOB, OR NONE IF THE TICKET WAS NOT OPEN (E.G. IT IS ALREADY BEING CLOSED).
+        """
+        def queue(conn):
+            if not self._close_ticket(conn, ticket_id, closurename, closureid, closedat):
+                return None
+            return conn.execute("""INSERT INTO close_job (ticketid, guildid, closername, closerid, reason, step, status, attempts, nextrunat, createdat, updatedat) VALUES (?, ?, ?, ?, ?, 'lock', 'pending', 0, ?, ?, ?)""",
+                                (ticket_id, guild_id, closurename, closureid, reason, closedat, closedat, closedat)).lastrowid
+
+        job_id = await self.transaction(queue)
+        self.open_tickets.remove(ticket_id)
+        return job_id
+
+    async def get_close_job(self, job_id):
+        return await self.fetchone("""SELECT * FROM close_job WHERE id = ?""", (job_id,))
+
+    async def claim_due_close_jobs(self, now, limit):
+        """
+        MARKS AS 'running' (AND RETURNS THE IDS OF) AT MOST 'limit' PENDING JOBS THAT ARE DUE AT 'now', OLDEST FIRST.
+        """
+        def claim(conn):
+            ids = [row[0] for row in conn.execute("""SELECT id FROM close_job WHERE status = 'pending' AND nextrunat <= ? ORDER BY nextrunat LIMIT ?""", (now, limit))]
+            conn.executemany("""UPDATE close_job SET status = 'running', updatedat = ? WHERE id = ?""", [(now, job_id) for job_id in ids])
+            return ids
+
+        return await self.transaction(claim)
+
+    async def get_next_close_job_time(self):
+        """
+        RETURNS THE TIMESTAMP OF THE NEXT PENDING JOB, OR NONE IF THERE ARE NO PENDING JOBS.
+        """
+        row = await self.fetchone("""SELECT MIN(nextrunat) FROM close_job WHERE status = 'pending'""")
+        return row[0]
+
+    async def checkpoint_close_job(self, job_id, step, nextrunat=None):
+        """
+        SAVES THE NEXT STEP OF A JOB, SO A RESTART CONTINUES FROM THERE. IF 'nextrunat' IS GIVEN, THE JOB IS ALSO RELEASED
+        ('pending') AND WILL BE PICKED UP AGAIN AT THAT TIME.
+        """
+        now = now_timestamp()
+        if nextrunat is None:
+            await self.execute("""UPDATE close_job SET step = ?, attempts = 0, updatedat = ? WHERE id = ?""", (step, now, job_id))
+        else:
+            await self.execute("""UPDATE close_job SET step = ?, attempts = 0, status = 'pending', nextrunat = ?, updatedat = ? WHERE id = ?""", (step, nextrunat, now, job_id))
+
+    async def retry_close_job(self, job_id, attempts, error, nextrunat=None):
+        """
+        RECORDS A FAILED ATTEMPT. THE JOB IS RUN AGAIN AT 'nextrunat', OR MARKED AS 'failed' IF 'nextrunat' IS NONE.
+        """
+        status = 'failed' if nextrunat is None else 'pending'
+        await self.execute("""UPDATE close_job SET status = ?, attempts = ?, lasterror = ?, nextrunat = COALESCE(?, nextrunat), updatedat = ? WHERE id = ?""",
+                           (status, attempts, error, nextrunat, now_timestamp(), job_id))
+
+    async def finish_close_job(self, job_id):
+        await self.execute("""UPDATE close_job SET step = 'done', status = 'done', updatedat = ? WHERE id = ?""", (now_timestamp(), job_id))
+
+    async def resume_close_jobs(self):
+        """
+        PUTS BACK IN THE QUEUE THE JOBS THAT WERE RUNNING WHEN THE BOT STOPPED (CALLED ONCE AT STARTUP).
+
+        RETURNS:
+            INT: THE NUMBER OF RESUMED JOBS.
+        """
+        return await self.execute("""UPDATE close_job SET status = 'pending', updatedat = ? WHERE status = 'running'""", (now_timestamp(),))
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # CHANNEL POOL
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def add_pooled_channel(self, channel_id, guild_id, category_id, createdat):
+        await self.execute("""INSERT OR REPLACE INTO channel_pool (channelid, guildid, categoryid, createdat) VALUES (?, ?, ?, ?)""", (channel_id, guild_id, category_id, createdat))
+
+    async def remove_pooled_channel(self, channel_id):
+        await self.execute("""DELETE FROM channel_pool WHERE channelid = ?""", (channel_id,))
+
+    async def get_pooled_channels(self, guild_id):
+        """
+        RETURNS THE POOLED CHANNELS OF THE GUILD (OLDEST FIRST), AS ROWS WITH 'channelid' AND 'categoryid'.
+        """
+        return await self.fetchall("""SELECT channelid, categoryid FROM channel_pool WHERE guildid = ? ORDER BY createdat, channelid""", (guild_id,))
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # TICKET STATISTICS
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def get_ticket_stats(self, since, closers=10):
+        """
+        RETURNS THE STATISTICS OF THE TICKETS FROM THE DAY 'since' AND OF ALL TIME, READ ONLY FROM THE ROLLUPS (SEE 'read' IN ticket_stats.py).
+        """
+        return await self._run(self._fetch_ticket_stats, since, closers)
+
+    def _fetch_ticket_stats(self, since, closers):
+        return ticket_stats.read(self._conn, since, closers)
+
+    async def rebuild_ticket_stats(self):
+        """
+        RECOMPUTES THE ROLLUPS OF THE STATISTICS FROM THE 'ticket' TABLE, IN ONE TRANSACTION. IT READS EVERY TICKET, SO THE
+        OTHER QUERIES WAIT FOR IT: USE IT ONLY IF THE STATISTICS ARE WRONG (E.G. AFTER EDITING THE DATABASE BY HAND).
+
+        RETURNS:
+            INT: THE NUMBER OF TICKETS COUNTED.
+        """
+        return await self.transaction(ticket_stats.rebuild)
+
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+    # BOT STATE
+    # ──────────────────────────────────────────────────────────────────────────────────────────────────
+
+    async def get_state(self, key):
+        """
+        RETURNS THE VALUE SAVED UNDER THE GIVEN KEY, OR NONE.
+        """
+        row = await self.fetchone("""SELECT value FROM bot_state WHERE key = ?""", (key,))
+        return None if row is None else row["value"]
+
+    async def set_state(self, key, value):
+        await self.execute("""INSERT OR REPLACE INTO bot_state (key, value, updatedat) VALUES (?, ?, ?)""", (key, value, now_timestamp()))
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+db = Database() # The shared instance used by the whole bot
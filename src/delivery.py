@@ -0,0 +1,138 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE DELIVERY OF A TRANSCRIPT TO ALL ITS DESTINATIONS.
+
+A TRANSCRIPT IS SENT TO SEVERAL PLACES: THE LOG CHANNEL, THE DM OF THE TICKET OWNER AND THE OPTIONAL ARCHIVE CHANNELS
+('transcript_archive_channels' IN config.py). THE UPLOADS DO NOT DEPEND ON EACH OTHER, SO 'fan_out' STARTS THEM ALL AT
+THE SAME TIME: THE DELIVERY TAKES AS LONG AS THE SLOWEST UPLOAD, NOT THE SUM OF ALL OF THEM.
+
+- EVERY BUNDLE IS WRITTEN ONCE ON DISK AND NEVER MODIFIED; EVERY UPLOAD (AND EVERY RETRY) OPENS ITS OWN 'discord.File' ON
+  IT, SO THE DESTINATIONS NEVER SHARE A FILE POSITION AND THE BUNDLE IS NOT COPIED IN MEMORY.
+- EVERY DESTINATION HAS ITS OWN RETRY POLICY AND ITS OWN RESULT ('DeliveryResult'): A CLOSED DM CANNOT HIDE A FAILURE OF
+  THE LOG CHANNEL, AND A SLOW DESTINATION DOES NOT DELAY THE OTHERS.
+"""
+
+import aiohttp # The network errors raised by discord.py during an upload
+import asyncio # We use asyncio to send to all the destinations at the same time
+import discord # We use discord to upload the bundle
+import logging # We use logging to report the result of every destination
+import time # We use time to measure how long every upload takes
+
+log = logging.getLogger(__name__)
+
+SENT = "sent" # The transcript was delivered
+BLOCKED = "blocked" # The destination refused it (closed DMs, missing permissions, deleted channel): retrying is useless
+TOO_LARGE = "too_large" # The file is over the upload limit of the server (413): only a smaller file can be delivered
+FAILED = "failed" # Every attempt failed with another error (network, rate limit, Discord 5xx): it can be tried again later
+
+BLOCKED_STATUSES = (403, 404) # Missing permissions, deleted channel or user
+CANNOT_SEND_TO_USER = 50007 # The JSON error code of Discord for closed DMs
+
+def upload_limit(target):
+    """
+    RETURNS THE BIGGEST FILE (IN BYTES) THE BOT CAN SEND TO A DESTINATION: THE LIMIT OF THE SERVER OF A CHANNEL (HIGHER
+    WITH BOOSTS), OR THE DEFAULT LIMIT OF DISCORD FOR A DM (THE BOOSTS OF THE SERVER DO NOT APPLY TO DMS).
+    """
+    guild = None if isinstance(target, (discord.User, discord.Member)) else getattr(target, "guild", None)
+    return discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES if guild is None else guild.filesize_limit
+
+class RetryPolicy:
+    """
+    HOW MANY TIMES AN UPLOAD IS TRIED, AND HOW LONG TO WAIT BETWEEN TWO ATTEMPTS ('delay' SECONDS, DOUBLED EVERY TIME).
+    """
+    def __init__(self, attempts, delay):
+        self.attempts = attempts
+        self.delay = delay
+
+LOG_CHANNEL_POLICY = RetryPolicy(attempts=3, delay=2) # The staff copy: worth a few retries
+OWNER_DM_POLICY = RetryPolicy(attempts=2, delay=2) # DMs usually fail for good (closed DMs), so one retry is enough
+ARCHIVE_CHANNEL_POLICY = RetryPolicy(attempts=3, delay=5) # Extra copies, possibly in another server
+
+class Destination:
+    """
+    A PLACE WHERE THE TRANSCRIPT IS SENT.
+
+    ATTRIBUTES:
+        KEY: A STABLE NAME OF THE DESTINATION (E.G. 'log', 'owner', 'archive:<channel id>'), USED TO REMEMBER WHERE THE
+             TRANSCRIPT WAS ALREADY DELIVERED.
+        TARGET: THE CHANNEL OR USER TO SEND TO (ANYTHING WITH A 'send' METHOD), OR NONE IF IT WAS NOT FOUND.
+        POLICY: THE RETRY POLICY OF THIS DESTINATION.
+    """
+    def __init__(self, key, target, policy):
+        self.key = key
+        self.target = target
+        self.policy = policy
+
+class DeliveryResult:
+    """
+    THE RESULT OF THE DELIVERY TO ONE DESTINATION.
+
+    ATTRIBUTES:
+        KEY: THE KEY OF THE DESTINATION.
+        STATUS: SENT, BLOCKED, TOO_LARGE OR FAILED.
+        ATTEMPTS: THE NUMBER OF UPLOADS TRIED.
+        ERROR: THE LAST ERROR (OR NONE).
+        ELAPSED: THE SECONDS SPENT ON THIS DESTINATION (RETRIES INCLUDED).
+    """
+    def __init__(self, key, status, attempts, error, elapsed):
+        self.key = key
+        self.status = status
+        self.attempts = attempts
+        self.error = error
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return f"<DeliveryResult {self.key}={self.status} attempts={self.attempts} elapsed={self.elapsed:.2f}s error={self.error!r}>"
+
+async def send_to(destination, bundle_path, filename, **message):
+    """
+    UPLOADS THE BUNDLE TO ONE DESTINATION, FOLLOWING ITS RETRY POLICY. NEVER RAISES: THE OUTCOME IS IN THE RESULT.
+    ONLY A REFUSAL OF THE DESTINATION (403, 404, CLOSED DMS) IS BLOCKED. A FILE OVER THE UPLOAD LIMIT (413) IS TOO_LARGE
+    AND IS NOT RETRIED AS IT IS (THE CALLER CAN SEND A SMALLER FILE); ANY OTHER ERROR (429, 5XX, NETWORK) IS RETRIED, THEN
+    FAILED.
+
+    ARGS:
+        DESTINATION: THE DESTINATION.
+        BUNDLE_PATH: THE PATH OF THE BUNDLE ON DISK.
+        FILENAME: THE NAME OF THE FILE SHOWN ON DISCORD.
+        MESSAGE: THE OTHER ARGUMENTS OF 'send' (E.G. embed=...).
+
+    RETURNS:
+        DELIVERYRESULT: THE RESULT OF THE DELIVERY.
+    """
+    start = time.perf_counter()
+    if destination.target is None:
+        return DeliveryResult(destination.key, BLOCKED, 0, "destination not found", 0.0)
+
+    error = None
+    for attempt in range(1, destination.policy.attempts + 1):
+        try:
+            await destination.target.send(file=discord.File(bundle_path, filename=filename), **message)
+            return DeliveryResult(destination.key, SENT, attempt, None, time.perf_counter() - start)
+        except discord.HTTPException as e:
+            if e.status in BLOCKED_STATUSES or e.code == CANNOT_SEND_TO_USER:
+                return DeliveryResult(destination.key, BLOCKED, attempt, repr(e), time.perf_counter() - start)
+            if e.status == 413:
+                return DeliveryResult(destination.key, TOO_LARGE, attempt, repr(e), time.perf_counter() - start)
+            error = e # Rate limited (429), Discord 5xx, ...
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            error = e
+
+        if attempt < destination.policy.attempts:
+            await asyncio.sleep(destination.policy.delay * 2 ** (attempt - 1))
+
+    return DeliveryResult(destination.key, FAILED, destination.policy.attempts, repr(error), time.perf_counter() - start)
+
+async def fan_out(destinations, bundle_path, filename, **message):
+    """
+    SENDS THE BUNDLE TO ALL THE DESTINATIONS AT THE SAME TIME.
+
+    RETURNS:
+        LIST: ONE DELIVERYRESULT PER DESTINATION, IN THE SAME ORDER.
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(*(send_to(destination, bundle_path, filename, **message) for destination in destinations))
+    for result in results:
+        level = logging.INFO if result.status == SENT else logging.WARNING
+        log.log(level, "Transcript %s to '%s' after %d attempts in %.2fs%s", result.status, result.key, result.attempts, result.elapsed, f" ({result.error})" if result.error else "")
+    log.info("Delivered %s to %d destinations in %.2fs", filename, len(destinations), time.perf_counter() - start)
+    return results
@@ -0,0 +1,71 @@
+"""
+IN THIS PYTHON FILE WE DEFINE WHAT THE BOT RECEIVES FROM THE DISCORD GATEWAY AND WHAT IT KEEPS IN MEMORY.
+
+'discord.Intents.all()' MAKES DISCORD SEND EVERY EVENT OF THE SERVER (PRESENCES, TYPING, REACTIONS, ...) AND, WITH THE
+FULL MEMBER CACHE AND THE CHUNKING AT STARTUP, KEEPS EVERY MEMBER IN MEMORY: ON A SERVER WITH HUNDREDS OF THOUSANDS OF
+MEMBERS THAT IS GIGABYTES OF RAM AND A STARTUP OF MINUTES. THE TICKET BOT ONLY NEEDS:
+- guilds:          THE CHANNELS, THE CATEGORIES AND THE ROLES.
+- members:         THE 'GUILD_MEMBER_REMOVE' EVENT (A TICKET OWNER LEFT THE SERVER). PRIVILEGED INTENT.
+- guild_messages:  THE MESSAGE EVENTS OF THE TICKET CHANNELS.
+- message_content: THE TEXT OF THE MESSAGES, FOR THE TRANSCRIPTS. PRIVILEGED INTENT.
+THIS IS THE DEFAULT ('bot_intents' IN config.py). THE MEMBERS ARE NOT CACHED ('member_cache') AND NOT DOWNLOADED AT
+STARTUP ('chunk_guilds_at_startup'): THE INTERACTIONS ALREADY CONTAIN THE MEMBER WHO USED THEM, AND THE FEW OTHER
+MEMBERS THE BOT NEEDS (E.G. THE OWNER OF A CLOSED TICKET) ARE FETCHED WHEN NEEDED ('get_or_fetch_member').
+
+THE MEMORY AND THE STARTUP TIME OF THE PROFILES ARE COMPARED BY 'benchmarks/member_cache.py'.
+"""
+
+import discord # We use discord to build the intents and the member cache flags
+
+from config import bot_intents, chunk_guilds_at_startup, member_cache
+
+def build_intents(names=bot_intents):
+    """
+    RETURNS THE DISCORD.INTENTS WITH THE GIVEN FLAGS ENABLED (["all"] ENABLES ALL OF THEM).
+    """
+    if "all" in names:
+        return discord.Intents.all()
+    return discord.Intents(**{name: True for name in names})
+
+def build_member_cache_flags(intents, policy=member_cache):
+    """
+    RETURNS THE DISCORD.MEMBERCACHEFLAGS OF THE GIVEN POLICY:
+    - "none":   ONLY THE BOT ITSELF IS CACHED.
+    - "joined": THE MEMBERS THAT JOINED (OR WERE DOWNLOADED) SINCE THE STARTUP (NEEDS THE 'members' INTENT).
+    - "all":    EVERYTHING THE INTENTS ALLOW (THE DEFAULT OF DISCORD.PY).
+    """
+    match policy:
+        case "none":
+            return discord.MemberCacheFlags.none()
+        case "joined":
+            return discord.MemberCacheFlags(voice=False, joined=True)
+        case "all":
+            return discord.MemberCacheFlags.from_intents(intents)
+        case _:
+            raise ValueError(f"Unknown member_cache policy {policy!r} (use 'none', 'joined' or 'all')")
+
+def bot_options():
+    """
+    RETURNS THE GATEWAY OPTIONS OF THE BOT (THE KEYWORD ARGUMENTS OF 'commands.Bot').
+    """
+    intents = build_intents()
+    return {
+        "intents": intents,
+        "member_cache_flags": build_member_cache_flags(intents),
+        "chunk_guilds_at_startup": chunk_guilds_at_startup,
+    }
+
+async def get_or_fetch_member(guild, user_id):
+    """
+    RETURNS THE MEMBER FROM THE CACHE OR, IF IT IS NOT CACHED, FROM THE DISCORD API (ONE REST CALL).
+
+    RETURNS:
+        DISCORD.MEMBER OR NONE: THE MEMBER, OR NONE IF THE USER IS NOT IN THE GUILD ANYMORE.
+    """
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    try:
+        return await guild.fetch_member(user_id)
+    except discord.NotFound:
+        return None
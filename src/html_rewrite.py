@@ -0,0 +1,103 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE CPU-BOUND HTML POST-PROCESSING OF THE TRANSCRIPTS.
+
+THESE FUNCTIONS RUN IN A SEPARATE PROCESS (SEE 'transcript.py'), NOT ON THE EVENT LOOP OF THE BOT: REWRITING A BIG
+TRANSCRIPT IS PURE-PYTHON WORK, AND DURING THAT TIME THE BOT WOULD NOT ANSWER HEARTBEATS OR INTERACTIONS. FOR THIS REASON:
+- THEY ONLY RECEIVE AND RETURN BYTES (AND A SMALL DICTIONARY), WHICH ARE CHEAP TO SEND TO ANOTHER PROCESS.
+- THIS FILE MUST NOT IMPORT DISCORD, THE CONFIG OR THE DATABASE, SO THE WORKER PROCESSES STAY LIGHT.
+
+THE TRANSCRIPT IS NOT PARSED INTO A DOM: IT IS SCANNED ONCE, FROM THE FIRST BYTE TO THE LAST, LOOKING ONLY AT THE
+'<div ...>' AND '</div>' TAGS, AND THE ATTACHMENTS MARKUP IS SPLICED IN WHILE THE RESULT IS WRITTEN. THE COST IS LINEAR
+IN THE SIZE OF THE TRANSCRIPT, WHATEVER THE NUMBER OF MESSAGES WITH ATTACHMENTS, AND NO TREE IS ALLOCATED
+(SEE 'benchmarks/html_rewrite.py' FOR THE COMPARISON WITH THE OLD BEAUTIFULSOUP REWRITE).
+"""
+
+import io # We use io to write the result in memory when no output file is given
+import re # We use re to find the div tags of the transcript
+
+DIV_TAG = re.compile(rb"<div\b[^>]*>|</div\s*>", re.IGNORECASE) # An opening or a closing div tag
+MESSAGE_ID = re.compile(rb"""\bdata-message-id\s*=\s*["']?(\d+)""", re.IGNORECASE) # The message id of a div
+ATTACHMENTS_CLASS = re.compile(rb"""\bclass\s*=\s*(?:"[^"]*\bchatlog__attachments\b[^"]*"|'[^']*\bchatlog__attachments\b[^']*'|chatlog__attachments\b)""", re.IGNORECASE)
+
+CONTAINER = 1 # The outermost div of a message that has attachments to add
+ATTACHMENTS = 2 # The '<div class="chatlog__attachments">' inside that message
+
+def inject_attachments(transcript, markup, output=None):
+    """
+    ADDS THE ATTACHMENTS MARKUP TO THE MESSAGES OF A TRANSCRIPT, IN A SINGLE PASS.
+
+    FOR EACH MESSAGE ID IN 'markup', THE FIRST '<div data-message-id="...">' WITH THAT ID IS THE MESSAGE. THE MARKUP IS
+    WRITTEN AT THE END OF THE FIRST '<div class="chatlog__attachments">' INSIDE THE MESSAGE, OR, IF THE MESSAGE HAS NONE,
+    IN A NEW ONE RIGHT BEFORE THE CLOSING TAG OF THE MESSAGE. MESSAGES THAT ARE NOT IN THE TRANSCRIPT ARE IGNORED, AND
+    THE REST OF THE DOCUMENT IS COPIED BYTE FOR BYTE.
+
+    THE MESSAGE CONTENT WRITTEN BY USERS IS HTML-ESCAPED BY CHAT_EXPORTER, SO EVERY '<div' FOUND IN THE TRANSCRIPT IS A
+    REAL TAG: KEEPING A STACK OF THE OPEN DIVS IS ENOUGH TO KNOW WHERE EACH MESSAGE ENDS.
+
+    ARGS:
+        TRANSCRIPT: THE HTML TRANSCRIPT (UTF-8 BYTES).
+        MARKUP: DICTIONARY MESSAGE ID (STR) -> HTML OF THE ATTACHMENTS OF THAT MESSAGE (STR).
+        OUTPUT: OPTIONAL BINARY FILE OBJECT WHERE THE RESULT IS WRITTEN (E.G. AN OPEN FILE ON DISK).
+
+    RETURNS:
+        BYTES OR NONE: THE MODIFIED HTML TRANSCRIPT (UTF-8), OR NONE IF IT WAS WRITTEN TO 'output'.
+    """
+    pending = {message_id.encode("ascii"): html.encode("utf-8") for message_id, html in markup.items()}
+    buffer = io.BytesIO() if output is None else output
+    write = buffer.write
+
+    stack = [] # One entry per open div: (CONTAINER or ATTACHMENTS, message id) for the divs we care about, otherwise None
+    containers = 0 # Number of CONTAINER entries in the stack
+    copied = 0 # Position of the first byte of the transcript that was not written yet
+
+    for tag in DIV_TAG.finditer(transcript):
+        if not pending and not containers:
+            break # Everything was injected: the rest is copied as it is
+
+        if tag.group().startswith(b"</"):
+            if not stack:
+                continue # A stray closing tag: ignore it, like a browser would
+            entry = stack.pop()
+            if entry is None:
+                continue
+
+            kind, message_id = entry
+            if kind == CONTAINER:
+                containers -= 1
+            html = pending.pop(message_id, None)
+            if html is not None:
+                # The markup goes right before '</div>': at the end of the attachments div, or in a new one at the end of the message
+                write(transcript[copied:tag.start()])
+                write(html if kind == ATTACHMENTS else b'<div class="chatlog__attachments">' + html + b'</div>')
+                copied = tag.start()
+            continue
+
+        entry = None
+        found = MESSAGE_ID.search(tag.group())
+        if found and found.group(1) in pending and not _inside(stack, found.group(1)):
+            entry = (CONTAINER, found.group(1))
+            containers += 1
+        elif containers and ATTACHMENTS_CLASS.search(tag.group()):
+            message_id = _innermost_container(stack)
+            if message_id in pending and not _inside(stack, message_id, ATTACHMENTS):
+                entry = (ATTACHMENTS, message_id)
+        stack.append(entry)
+
+    write(transcript[copied:])
+    return buffer.getvalue() if output is None else None
+
+def _inside(stack, message_id, kind=CONTAINER):
+    """
+    RETURNS TRUE IF A DIV OF THE GIVEN KIND FOR THE GIVEN MESSAGE IS STILL OPEN (THE INNER DIVS OF A MESSAGE CAN REPEAT
+    ITS 'data-message-id').
+    """
+    return (kind, message_id) in stack
+
+def _innermost_container(stack):
+    """
+    RETURNS THE MESSAGE ID OF THE LAST OPEN MESSAGE (CONTAINER) DIV, OR NONE.
+    """
+    for entry in reversed(stack):
+        if entry is not None and entry[0] == CONTAINER:
+            return entry[1]
+    return None
@@ -0,0 +1,162 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE LOGGING PIPELINE OF THE BOT.
+
+A LOGGING HANDLER THAT WRITES TO A FILE OR TO THE CONSOLE BLOCKS THE CALLER UNTIL THE LINE IS WRITTEN, AND THE CALLER IS
+THE EVENT LOOP: DURING AN INCIDENT (HUNDREDS OF WARNINGS PER SECOND, A SLOW DISK) EVERY LOG CALL WOULD DELAY ALL THE
+INTERACTIONS OF THE BOT. SO THE LOGGERS ONLY PUT THE RECORDS IN A QUEUE ('QueueHandler'), AND A BACKGROUND THREAD
+('QueueListener') WRITES THEM:
+- logs/bot.log:  ONE JSON OBJECT PER LINE (TIME, LEVEL, LOGGER, MESSAGE AND THE FIELDS BELOW), ROTATED BY SIZE
+                 ('log_max_bytes') OR BY TIME ('log_rotate_when'), KEEPING 'log_backup_count' OLD FILES.
+- THE CONSOLE:   A SHORT COLORED LINE (THE OLD START BANNER OF THE BOT IS NOW MADE OF NORMAL LOG RECORDS).
+
+THE STRUCTURED FIELDS ('ticket_id', 'guild_id', 'user_id', 'job_id', 'latency_ms') ARE TAKEN FROM THE 'extra' OF THE
+LOG CALL OR FROM 'log_context', WHICH SETS THEM FOR EVERY RECORD LOGGED INSIDE THE 'with' BLOCK (AND BY THE TASKS IT
+STARTS), E.G. EVERYTHING LOGGED WHILE A CLOSE JOB RUNS CARRIES THE ID OF ITS TICKET:
+
+    with log_context(ticket_id=ticket.id, guild_id=guild.id):
+        log.info("Transcript ready", extra={"latency_ms": 120})
+
+THE QUEUE IS BOUNDED ('log_queue_size'): IF THE WRITER THREAD CANNOT KEEP UP, THE NEW RECORDS ARE DROPPED (AND COUNTED,
+SEE 'LogQueueHandler') INSTEAD OF GROWING THE MEMORY OF THE BOT WITHOUT LIMIT.
+
+USAGE:
+    listener = setup_logging() # Once, before anything is logged
+    ...
+    listener.stop() # At exit: writes the records still in the queue
+"""
+
+import contextlib # We use contextlib to build the 'log_context' context manager
+import contextvars # We use contextvars to know the fields of the current task
+import json # We use json to write the log lines
+import logging # We use logging as the base of the pipeline
+import logging.handlers # QueueHandler, QueueListener and the rotating file handlers
+import os # We use os to create the 'logs' folder
+import queue # The queue between the bot and the writer thread
+
+from colorama import Fore, init, Style # We use colorama to colorize the console output
+
+from config import log_backup_count, log_file, log_level, log_max_bytes, log_queue_size, log_rotate_when
+
+FIELDS = ("ticket_id", "guild_id", "user_id", "job_id", "latency_ms") # The structured fields of the records
+
+_context = contextvars.ContextVar("log_context", default={})
+
+@contextlib.contextmanager
+def log_context(**fields):
+    """
+    ADDS THE GIVEN FIELDS (SEE 'FIELDS') TO EVERY RECORD LOGGED INSIDE THE 'with' BLOCK.
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+class JsonFormatter(logging.Formatter):
+    """
+    FORMATS A RECORD AS ONE JSON OBJECT (ONE LINE). THE FIELDS THAT ARE NOT SET ARE LEFT OUT.
+    """
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class ConsoleFormatter(logging.Formatter):
+    """
+    FORMATS A RECORD AS A SHORT COLORED LINE FOR THE CONSOLE: [DATE] [LEVEL] MESSAGE.
+    """
+    COLORS = {"DEBUG": Fore.LIGHTBLACK_EX, "INFO": Fore.GREEN, "WARNING": Fore.YELLOW, "ERROR": Fore.RED, "CRITICAL": Fore.RED}
+
+    def format(self, record):
+        line = (f"{Fore.LIGHTBLACK_EX}[{Style.RESET_ALL}{Fore.LIGHTMAGENTA_EX}{self.formatTime(record, '%d/%m/%Y %H:%M:%S')}{Style.RESET_ALL}{Fore.LIGHTBLACK_EX}]{Style.RESET_ALL} "
+                f"{Fore.LIGHTBLACK_EX}[{Style.RESET_ALL}{self.COLORS.get(record.levelname, '')}{record.levelname}{Style.RESET_ALL}{Fore.LIGHTBLACK_EX}]{Style.RESET_ALL} "
+                f"{record.getMessage()}")
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """
+    THE HANDLER OF THE LOGGERS: PUTS THE RECORDS IN THE QUEUE OF THE WRITER THREAD WITHOUT WAITING.
+
+    THE MESSAGE AND THE TRACEBACK ARE FORMATTED HERE (THE ARGUMENTS OF A RECORD MAY CHANGE BEFORE THE THREAD WRITES IT),
+    AND THE FIELDS OF 'log_context' ARE COPIED TO THE RECORD (THE THREAD DOES NOT SEE THE CONTEXT OF THE TASK). IF THE
+    QUEUE IS FULL THE RECORD IS DROPPED, AND THE NEXT RECORD THAT FITS IS PRECEDED BY A WARNING WITH THE NUMBER OF DROPS.
+
+    ATTRIBUTES:
+        DROPPED: THE NUMBER OF RECORDS DROPPED SINCE THE START.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record):
+        for field, value in _context.get().items():
+            if getattr(record, field, None) is None:
+                setattr(record, field, value)
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg, record.args, record.message = message, None, message
+        record.exc_info = None # The traceback objects cannot be used by another thread (exc_text is kept)
+        return record
+
+    def enqueue(self, record):
+        try:
+            if self._unreported:
+                warning = logging.makeLogRecord({"name": __name__, "levelno": logging.WARNING, "levelname": "WARNING",
+                                                 "msg": f"{self._unreported} log records were dropped (the log queue was full)"})
+                self.queue.put_nowait(warning)
+                self._unreported = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+
+def build_file_handler(path=log_file, rotate_when=log_rotate_when, max_bytes=log_max_bytes, backup_count=log_backup_count):
+    """
+    RETURNS THE HANDLER OF THE LOG FILE: ROTATED AT THE GIVEN TIME ('rotate_when', E.G. "midnight") OR, IF IT IS NONE,
+    WHEN THE FILE REACHES 'max_bytes'.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True) # Create the 'logs' folder if it does not already exist
+    if rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(path, when=rotate_when, backupCount=backup_count, encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+def setup_logging(level=log_level):
+    """
+    SENDS ALL THE LOGS OF THE BOT (AND OF DISCORD.PY) THROUGH THE QUEUE TO THE LOG FILE AND THE CONSOLE.
+
+    RETURNS:
+        LOGGING.HANDLERS.QUEUELISTENER: THE RUNNING WRITER THREAD ('stop()' WRITES THE QUEUED RECORDS AND STOPS IT).
+    """
+    init() # Initialize colorama
+    file_handler = build_file_handler()
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(ConsoleFormatter())
+
+    log_queue = queue.Queue(maxsize=log_queue_size)
+    root = logging.getLogger()
+    root.setLevel(level)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(LogQueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    listener.start()
+    return listener
@@ -0,0 +1,106 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE FULL-TEXT SEARCH OF THE CLOSED TICKETS ('/ticket-search').
+
+ONCE A TICKET IS CLOSED ITS CHANNEL IS DELETED, AND THE CONVERSATION ONLY LIVES IN THE TRANSCRIPT (AN HTML FILE), WHICH
+CANNOT BE SEARCHED. SO, WHEN THE CLOSE JOB RENDERS THE TRANSCRIPT (SEE close_jobs.py), THE SAME MESSAGES ARE ALSO SAVED IN
+THE DATABASE AND INDEXED WITH SQLITE FTS5 (AN INVERTED INDEX: A SEARCH READS ONLY THE ROWS THAT CONTAIN THE WORDS, SO IT
+TAKES MILLISECONDS EVEN WITH HUNDREDS OF THOUSANDS OF MESSAGES):
+- 'message': ONE ROW PER MESSAGE (TICKET, AUTHOR, DATE, TEXT AND NAMES OF THE ATTACHMENTS), WITH AN INDEX ON 'ticketid'.
+- 'message_fts': THE FTS5 INDEX OF THE TEXT, THE AUTHOR AND THE ATTACHMENT NAMES. IT IS AN "EXTERNAL CONTENT" TABLE: IT
+  DOES NOT STORE THE TEXT A SECOND TIME, IT READS IT FROM 'message' (FOR THE SNIPPETS), AND THE TRIGGERS OF MIGRATION 10
+  KEEP IT IN SYNC WITH EVERY INSERT AND DELETE OF 'message'.
+THE TEXT OF A MESSAGE IS ITS CONTENT AND THE TEXT OF ITS EMBEDS (THE ANSWERS OF THE TICKET MODAL ARE IN THE EMBED OF THE
+BOT). THE RESULTS ARE SORTED BY RELEVANCE (BM25: RARE WORDS AND SHORT MESSAGES COUNT MORE).
+
+THE RELEVANCE IS COMPUTED FOR EVERY MATCHING MESSAGE BEFORE THE FIRST PAGE CAN BE CHOSEN: A RARE WORD (A USERNAME, AN
+ORDER ID, AN ERROR CODE) MATCHES A FEW ROWS AND TAKES A MILLISECOND, BUT A COMMON WORD CAN MATCH HALF OF THE MESSAGES
+(~300 MS WITH 300,000 MESSAGES). SO ONLY THE 'RANKED_MATCHES' MOST RECENT MATCHES ARE RANKED ('search'): THE ROWID OF
+THE OLDEST OF THEM IS FOUND IN THE INDEX (NO RANKING NEEDED) AND THE OLDER MATCHES ARE SKIPPED. A SEARCH WITH FEWER
+MATCHES IS RANKED ENTIRELY; A VERY COMMON WORD SHOWS THE MOST RELEVANT OF ITS RECENT MESSAGES (~15 MS).
+
+THE FUNCTIONS THAT TAKE A CONNECTION DO NOT COMMIT: THEY ARE CALLED BY 'Database' (SEE database.py).
+"""
+
+import discord # We use discord to escape the markdown of the snippets
+
+PAGE_SIZE = 5 # Results shown on each page of /ticket-search
+RANKED_MATCHES = 5000 # The most recent matches sorted by relevance (see above)
+SNIPPET_WORDS = 16 # Words around the match shown in a snippet
+HIGHLIGHT = ("\x02", "\x03") # Markers around the matched words, replaced with bold once the snippet is escaped
+
+def message_rows(ticket_id, history):
+    """
+    RETURNS THE ROWS OF 'message' OF A TICKET: ONE TUPLE (ticketid, messageid, authorid, authorname, createdat, content,
+    attachments) PER MESSAGE THAT HAS TEXT OR ATTACHMENTS, OLDEST FIRST.
+
+    ARGS:
+        TICKET_ID: THE CHANNEL ID OF THE TICKET.
+        HISTORY: THE HISTORY RETURNED BY 'fetch_history' (SEE transcript.py).
+    """
+    rows = []
+    for message in reversed(history.messages): # Oldest first
+        parts = [message.content]
+        for embed in message.embeds:
+            parts += [embed.title, embed.description] + [f"{field.name}: {field.value}" for field in embed.fields]
+        content = "\n".join(part for part in parts if part)
+        attachments = " ".join(attachment.filename for attachment in message.attachments)
+        if content or attachments:
+            rows.append((ticket_id, message.id, message.author.id, message.author.name, int(message.created_at.timestamp()), content, attachments))
+    return rows
+
+def match_expression(query):
+    """
+    TURNS THE TEXT WRITTEN BY A STAFF MEMBER INTO AN FTS5 QUERY: EVERY WORD MUST BE PRESENT ('refund paypal' FINDS THE
+    MESSAGES WITH BOTH WORDS) AND A WORD ENDING WITH '*' IS A PREFIX ('pay*' FINDS "pay", "paypal", "payment", ...).
+    EVERY WORD IS QUOTED, SO CHARACTERS LIKE '-', ':' OR '"' ARE SEARCHED AS TEXT INSTEAD OF BEING READ AS FTS5 SYNTAX.
+
+    RETURNS:
+        STR OR NONE: THE EXPRESSION FOR 'MATCH', OR NONE IF THE QUERY HAS NO WORDS.
+    """
+    terms = []
+    for word in query.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+def format_snippet(snippet):
+    """
+    ESCAPES THE MARKDOWN OF A SNIPPET (IT IS TEXT WRITTEN BY THE USERS) AND SHOWS THE MATCHED WORDS IN BOLD.
+    """
+    text = discord.utils.escape_markdown(" ".join(snippet.split()))
+    return text.replace(HIGHLIGHT[0], "**").replace(HIGHLIGHT[1], "**")
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def index(conn, ticket_id, rows):
+    """
+    REPLACES THE INDEXED MESSAGES OF A TICKET (SO THE TRANSCRIPT STEP CAN BE RUN AGAIN WITHOUT DUPLICATES).
+
+    RETURNS:
+        INT: THE NUMBER OF INDEXED MESSAGES.
+    """
+    conn.execute("""DELETE FROM message WHERE ticketid = ?""", (ticket_id,))
+    conn.executemany("""INSERT INTO message (ticketid, messageid, authorid, authorname, createdat, content, attachments) VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+    return len(rows)
+
+def search(conn, expression, limit, offset=0):
+    """
+    RETURNS THE MESSAGES THAT MATCH AN FTS5 EXPRESSION (SEE 'match_expression'), THE MOST RELEVANT FIRST, AS ROWS WITH
+    'ticketid', 'ticketname' (NONE IF THE TRANSCRIPT WAS NOT ARCHIVED), 'authorname', 'createdat' AND 'snippet' (THE
+    WORDS AROUND THE MATCH IN THE COLUMN THAT MATCHES BEST, WITH THE MATCHED WORDS BETWEEN THE 'HIGHLIGHT' MARKERS).
+
+    ARGS:
+        LIMIT: THE MAXIMUM NUMBER OF ROWS (ASK FOR ONE MORE THAN A PAGE TO KNOW IF THERE IS A NEXT PAGE).
+        OFFSET: THE NUMBER OF RESULTS TO SKIP (THE PREVIOUS PAGES).
+    """
+    oldest = conn.execute("""SELECT rowid FROM message_fts WHERE message_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?""", (expression, RANKED_MATCHES - 1)).fetchone()
+    return conn.execute(f"""SELECT message.ticketid, transcript.ticketname, message.authorname, message.createdat,
+                               snippet(message_fts, -1, ?, ?, '…', {SNIPPET_WORDS}) AS snippet
+                            FROM message_fts
+                            JOIN message ON message.id = message_fts.rowid
+                            LEFT JOIN transcript ON transcript.ticketid = message.ticketid
+                            WHERE message_fts MATCH ? AND message_fts.rowid >= ?
+                            ORDER BY message_fts.rank
+                            LIMIT ? OFFSET ?""", (*HIGHLIGHT, expression, 0 if oldest is None else oldest[0], limit, offset)).fetchall()
@@ -0,0 +1,398 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE INSTRUMENTATION OF THE BOT: THE DISCORD REST CALLS, THE DATABASE QUERIES, THE SLASH
+COMMANDS AND THE VIEW CALLBACKS.
+
+REST CALLS
+EVERY REST CALL COSTS LATENCY AND RATE-LIMIT BUDGET, SO WE COUNT THEM. DISCORD.PY SENDS THEM THROUGH TWO METHODS:
+- 'HTTPClient.request': CHANNELS, MESSAGES, PINS, PERMISSIONS, ... (EVERYTHING DONE WITH THE BOT TOKEN).
+- 'AsyncWebhookAdapter.request': THE INTERACTION RESPONSES AND FOLLOWUPS (DEFER, SEND_MESSAGE, FOLLOWUP.SEND, ...).
+'install_rest_call_counter' WRAPS BOTH OF THEM ONCE, AND EVERY CALL IS COUNTED BY ROUTE (E.G. 'POST /channels/{channel_id}/messages')
+IN THE GLOBAL COUNTER 'rest_calls' AND IN EVERY SCOPE THAT IS ACTIVE WHEN THE CALL IS MADE:
+
+    with rest_calls.scope() as calls:
+        ... # e.g. open a ticket
+    print(calls.total, calls.by_route)
+
+THE SCOPES FOLLOW THE ASYNCIO CONTEXT, SO THE CALLS MADE BY TASKS STARTED INSIDE THE 'with' BLOCK (E.G. WITH
+'asyncio.gather') ARE COUNTED TOO, AND TWO TICKETS OPENED AT THE SAME TIME ARE COUNTED SEPARATELY.
+A CALL THAT DISCORD.PY RETRIES BY ITSELF (E.G. AFTER A 429) IS COUNTED ONCE; THE RESPONSES OF THE RETRIES (AND THE 429s)
+ARE COUNTED BY THE AIOHTTP TRACE OF 'build_http_trace'.
+
+METRICS REGISTRY
+'registry' HOLDS COUNTERS AND LATENCY HISTOGRAMS WITH FIXED BUCKETS. RECORDING AN EVENT IS A DICTIONARY LOOKUP, A
+BISECT AND TWO ADDITIONS (ABOUT A MICROSECOND), SO THEY ARE ALWAYS ON:
+- THE SLASH COMMANDS: 'command_started' (THE 'interaction_check' OF THE COMMAND TREE) AND 'command_finished' (THE
+  COMPLETION EVENT AND THE ERROR HANDLER).
+- THE VIEW CALLBACKS AND THE MODALS: THE '@instrumented(name)' DECORATOR.
+- THE DATABASE QUERIES: 'record_db_query' (CALLED BY 'Database._run').
+- THE REST CALLS: THE WRAPPER OF 'install_rest_call_counter'.
+FOR EVERY COMMAND AND CALLBACK (A "HANDLER") WE ALSO RECORD HOW MANY DATABASE QUERIES AND REST CALLS IT MADE.
+
+THE METRICS ARE SHOWN BY '/ticket-metrics' ('summary') AND, IF 'metrics_port' IS SET IN config.py, SERVED IN THE
+PROMETHEUS TEXT FORMAT ON http://metrics_host:metrics_port/metrics ('start_metrics_server').
+"""
+
+import aiohttp # We use aiohttp to trace the HTTP responses of Discord
+import bisect # We use bisect to find the bucket of a histogram
+import collections # We use collections.Counter to count the calls by route
+import contextlib # We use contextlib to build the 'scope' context manager
+import contextvars # We use contextvars to know which scopes are active in the current task
+import discord # We use discord to recognize the autocomplete interactions
+import functools # We use functools to keep the name of the wrapped methods
+import logging # We use logging to report the address of the metrics endpoint
+import time # We use time to measure the durations
+
+from aiohttp import web
+from config import metrics_host, metrics_port
+from discord.http import HTTPClient
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+log = logging.getLogger(__name__)
+
+_scopes = contextvars.ContextVar("rest_call_scopes", default=())
+
+class RestCallCounter:
+    """
+    A COUNT OF REST CALLS.
+
+    ATTRIBUTES:
+        BY_ROUTE: COLLECTIONS.COUNTER ROUTE ('METHOD /path/{parameter}') -> NUMBER OF CALLS.
+    """
+    def __init__(self):
+        self.by_route = collections.Counter()
+
+    @property
+    def total(self):
+        return sum(self.by_route.values())
+
+    def record(self, route):
+        """
+        COUNTS ONE CALL TO THE GIVEN ROUTE HERE AND IN THE ACTIVE SCOPES.
+        """
+        self.by_route[route] += 1
+        for scope in _scopes.get():
+            scope.by_route[route] += 1
+
+    @contextlib.contextmanager
+    def scope(self):
+        """
+        COUNTS SEPARATELY THE CALLS MADE INSIDE THE 'with' BLOCK (AND BY THE TASKS IT STARTS).
+
+        RETURNS:
+            RESTCALLCOUNTER: THE COUNTER OF THE BLOCK (STILL READABLE AFTER THE BLOCK).
+        """
+        counter = RestCallCounter()
+        token = _scopes.set(_scopes.get() + (counter,))
+        try:
+            yield counter
+        finally:
+            _scopes.reset(token)
+
+rest_calls = RestCallCounter() # The calls made since the bot started
+
+def _counted(request):
+    @functools.wraps(request)
+    async def wrapper(self, route, *args, **kwargs):
+        name = f"{route.method} {route.path}"
+        rest_calls.record(name)
+        handler = _handler.get()
+        if handler is not None:
+            handler.rest_calls += 1
+        start = time.perf_counter()
+        try:
+            return await request(self, route, *args, **kwargs)
+        finally:
+            rest_request_seconds.observe(time.perf_counter() - start, name)
+
+    wrapper.counted = True
+    return wrapper
+
+def install_rest_call_counter():
+    """
+    WRAPS THE REST METHODS OF DISCORD.PY SO EVERY CALL IS COUNTED. CALLING IT MORE THAN ONCE DOES NOTHING.
+    """
+    for client in (HTTPClient, AsyncWebhookAdapter):
+        if not getattr(client.request, "counted", False):
+            client.request = _counted(client.request)
+
+
+def build_http_trace():
+    """
+    RETURNS THE AIOHTTP TRACE THAT COUNTS EVERY HTTP RESPONSE OF DISCORD BY STATUS (THE 'http_trace' OPTION OF THE BOT).
+    UNLIKE THE REST CALLS, THE RETRIES ARE COUNTED TOO, SO THE 429s SHOW HOW OFTEN DISCORD RATE-LIMITS US.
+    """
+    async def on_request_end(session, context, params):
+        status = params.response.status
+        http_responses_total.inc(str(status))
+        if status == 429:
+            rate_limited_total.inc(params.response.headers.get("X-RateLimit-Scope", "unknown"))
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# METRICS REGISTRY
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30) # Seconds
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50) # Queries or calls per handler
+
+class Counter:
+    """
+    A COUNTER FOR EVERY COMBINATION OF LABEL VALUES.
+
+    ATTRIBUTES:
+        VALUES: DICTIONARY TUPLE OF LABEL VALUES -> COUNT.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, labels, value
+
+class Histogram:
+    """
+    A HISTOGRAM WITH FIXED BUCKETS FOR EVERY COMBINATION OF LABEL VALUES. EVERY SERIES IS A LIST: THE COUNT OF EVERY
+    BUCKET (NOT CUMULATIVE, THE LAST ONE IS +Inf) FOLLOWED BY THE SUM OF THE OBSERVED VALUES.
+
+    ATTRIBUTES:
+        BUCKETS: THE UPPER BOUNDS OF THE BUCKETS (INCLUDED), SORTED.
+        VALUES: DICTIONARY TUPLE OF LABEL VALUES -> SERIES.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self.values = {}
+
+    def observe(self, value, *labels):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels):
+        series = self.values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def mean(self, *labels):
+        count = self.count(*labels)
+        return self.values[labels][-1] / count if count else 0
+
+    def quantile(self, q, *labels):
+        """
+        RETURNS THE UPPER BOUND OF THE BUCKET THAT CONTAINS THE GIVEN QUANTILE (E.G. 0.99), INF IF IT IS ABOVE THE LAST
+        BUCKET, OR NONE IF NOTHING WAS OBSERVED.
+        """
+        series = self.values.get(labels)
+        count = sum(series[:-1]) if series else 0
+        if not count:
+            return None
+        seen = 0
+        for bound, bucket in zip(self.buckets + (float("inf"),), series):
+            seen += bucket
+            if seen >= q * count:
+                return bound
+
+    def samples(self):
+        for labels, series in self.values.items():
+            seen = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), series):
+                seen += bucket
+                yield f"{self.name}_bucket", labels + ("+Inf" if bound == float("inf") else repr(bound),), seen
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, seen
+
+class MetricsRegistry:
+    """
+    THE METRICS OF THE BOT, RENDERED IN THE PROMETHEUS TEXT FORMAT BY 'render'.
+    """
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(name, help, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DURATION_BUCKETS):
+        metric = Histogram(name, help, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        RETURNS ALL THE METRICS IN THE PROMETHEUS TEXT EXPOSITION FORMAT.
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                labelnames = metric.labelnames + ("le",) if name.endswith("_bucket") else metric.labelnames
+                text = ",".join(f'{key}="{_escape(value)}"' for key, value in zip(labelnames, labels))
+                lines.append(f"{name}{{{text}}} {value}" if text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry = MetricsRegistry() # The metrics of the bot since the start
+
+handler_seconds = registry.histogram("ticket_bot_handler_seconds", "Duration of the slash commands and of the view callbacks.", ("kind", "name"))
+handler_total = registry.counter("ticket_bot_handler_total", "Slash commands and view callbacks by result (ok, denied, error).", ("kind", "name", "status"))
+handler_db_queries = registry.histogram("ticket_bot_handler_db_queries", "Database queries made by a slash command or a view callback.", ("kind", "name"), COUNT_BUCKETS)
+handler_rest_calls = registry.histogram("ticket_bot_handler_rest_calls", "Discord REST calls made by a slash command or a view callback.", ("kind", "name"), COUNT_BUCKETS)
+db_query_seconds = registry.histogram("ticket_bot_db_query_seconds", "Duration of the database queries, including the wait for the database thread.", ("operation",))
+rest_request_seconds = registry.histogram("ticket_bot_rest_request_seconds", "Duration of the Discord REST calls, including the retries and the rate limit waits.", ("route",))
+http_responses_total = registry.counter("ticket_bot_http_responses_total", "HTTP responses of Discord by status, including the retries.", ("status",))
+rate_limited_total = registry.counter("ticket_bot_rate_limited_total", "429 responses of Discord by rate limit scope.", ("scope",))
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# HANDLERS (SLASH COMMANDS AND VIEW CALLBACKS)
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+_handler = contextvars.ContextVar("metrics_handler", default=None)
+
+class HandlerStats:
+    """
+    THE MEASURES OF ONE RUN OF A HANDLER (COUNTED IN THE ASYNCIO CONTEXT OF THE RUN, LIKE THE REST CALL SCOPES).
+    """
+    __slots__ = ("kind", "name", "start", "db_queries", "rest_calls")
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.rest_calls = 0
+
+    def finish(self, status):
+        handler_seconds.observe(time.perf_counter() - self.start, self.kind, self.name)
+        handler_total.inc(self.kind, self.name, status)
+        handler_db_queries.observe(self.db_queries, self.kind, self.name)
+        handler_rest_calls.observe(self.rest_calls, self.kind, self.name)
+
+def record_db_query(operation, seconds):
+    """
+    RECORDS ONE DATABASE QUERY (AND COUNTS IT IN THE CURRENT HANDLER).
+    """
+    db_query_seconds.observe(seconds, operation)
+    handler = _handler.get()
+    if handler is not None:
+        handler.db_queries += 1
+
+async def command_started(interaction):
+    """
+    THE 'interaction_check' OF THE COMMAND TREE: STARTS MEASURING THE SLASH COMMAND (IT RUNS IN THE TASK OF THE COMMAND).
+
+    RETURNS:
+        BOOL: ALWAYS TRUE (EVERY INTERACTION IS PROCESSED).
+    """
+    if interaction.type is not discord.InteractionType.autocomplete:
+        stats = HandlerStats("command", interaction.command.qualified_name if interaction.command else "unknown")
+        interaction.extras["metrics"] = stats
+        _handler.set(stats)
+    return True
+
+def command_finished(interaction, status):
+    """
+    RECORDS THE END OF A SLASH COMMAND STARTED BY 'command_started' ("ok", "denied" OR "error").
+    """
+    stats = interaction.extras.pop("metrics", None)
+    if stats is not None:
+        stats.finish(status)
+
+def instrumented(name):
+    """
+    DECORATOR THAT MEASURES AN ASYNC VIEW CALLBACK OR A MODAL SUBMIT.
+
+    USAGE:
+        @instrumented("close_button")
+        async def callback(self, interaction): ...
+    """
+    def decorator(callback):
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            stats = HandlerStats("view", name)
+            token = _handler.set(stats)
+            status = "error"
+            try:
+                result = await callback(*args, **kwargs)
+                status = "ok"
+                return result
+            finally:
+                _handler.reset(token)
+                stats.finish(status)
+        return wrapper
+    return decorator
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# OUTPUT
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def _ms(seconds):
+    if seconds is None:
+        return "-"
+    if seconds == float("inf"):
+        return f">{DURATION_BUCKETS[-1]:g}s"
+    return f"≤{seconds * 1000:g}ms"
+
+def summary():
+    """
+    RETURNS THE SUMMARY SHOWN BY '/ticket-metrics'.
+
+    RETURNS:
+        DICT: TITLE OF THE SECTION -> LIST OF LINES (THE HANDLERS ARE SORTED BY NUMBER OF RUNS).
+    """
+    handlers = []
+    for labels in sorted(handler_seconds.values, key=handler_seconds.count, reverse=True):
+        kind, name = labels
+        errors = sum(value for (k, n, status), value in handler_total.values.items() if (k, n) == labels and status != "ok")
+        handlers.append(f"`{'/' if kind == 'command' else ''}{name}` {handler_seconds.count(*labels)} runs ({errors} failed) · "
+                        f"p50 {_ms(handler_seconds.quantile(0.5, *labels))} · p99 {_ms(handler_seconds.quantile(0.99, *labels))} · "
+                        f"{handler_db_queries.mean(*labels):.1f} queries · {handler_rest_calls.mean(*labels):.1f} REST calls")
+
+    queries = sum(db_query_seconds.count(*labels) for labels in db_query_seconds.values)
+    database = [f"`{operation}` {db_query_seconds.count(operation)} · p50 {_ms(db_query_seconds.quantile(0.5, operation))} · p99 {_ms(db_query_seconds.quantile(0.99, operation))}"
+                for (operation,) in sorted(db_query_seconds.values)]
+
+    statuses = ", ".join(f"{status}: {count}" for (status,), count in sorted(http_responses_total.values.items()))
+    limited = ", ".join(f"{scope}: {count}" for (scope,), count in sorted(rate_limited_total.values.items()))
+    discord_api = [f"REST calls: {rest_calls.total}", f"HTTP responses: {statuses or '-'}", f"Rate limited (429): {limited or '0'}"]
+
+    return {"Handlers": handlers or ["-"], f"Database ({queries} queries)": database or ["-"], "Discord API": discord_api}
+
+async def _serve_metrics(request):
+    return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8", headers={"X-Content-Type-Options": "nosniff"})
+
+async def start_metrics_server(host=metrics_host, port=metrics_port):
+    """
+    SERVES THE METRICS IN THE PROMETHEUS TEXT FORMAT ON http://host:port/metrics. DOES NOTHING IF 'port' IS NONE.
+
+    RETURNS:
+        AIOHTTP.WEB.APPRUNNER OR NONE: THE RUNNING SERVER ('await runner.cleanup()' STOPS IT).
+    """
+    if port is None:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", _serve_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    log.info("Metrics served on http://%s:%d/metrics", host, port)
+    return runner
@@ -0,0 +1,292 @@
+"""
+IN THIS PYTHON FILE NAMED "MIGRATIONS.PY" WE DEFINE THE VERSIONED SCHEMA OF THE TICKET DATABASE.
+
+THE SCHEMA IS NOT CREATED IN ONE SHOT: IT IS BUILT BY AN ORDERED LIST OF MIGRATIONS. EACH MIGRATION HAS A VERSION NUMBER
+AND THE DATABASE REMEMBERS THE LAST VERSION IT RECEIVED IN 'PRAGMA user_version' (AN INTEGER STORED IN THE FILE HEADER).
+AT STARTUP 'apply_migrations' RUNS ONLY THE MIGRATIONS THAT ARE NEWER THAN THAT VERSION, SO:
+- A NEW DATABASE RECEIVES ALL THE MIGRATIONS, ONE AFTER THE OTHER.
+- AN EXISTING DATABASE RECEIVES ONLY THE MISSING ONES, AND ITS DATA IS KEPT.
+
+TO CHANGE THE SCHEMA, NEVER EDIT AN EXISTING MIGRATION: APPEND A NEW FUNCTION AND ADD IT AT THE END OF 'MIGRATIONS'.
+"""
+
+import logging # We use logging to record which migrations were applied
+
+from timeutils import parse_display_date # Used to convert the old text dates into timestamps
+
+log = logging.getLogger(__name__)
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def migration_001_create_ticket(conn):
+    """
+    CREATES THE 'ticket' TABLE. 'IF NOT EXISTS' KEEPS DATABASES CREATED BEFORE THE MIGRATIONS EXISTED WORKING.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS ticket(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticketname TEXT NOT NULL,
+                ticketid INT NOT NULL,
+                categoryname TEXT NOT NULL,
+                categoryid INT NOT NULL,
+                openername TEXT NOT NULL,
+                openerid INT NOT NULL,
+                closurename TEXT NOT NULL,
+                closureid INT NOT NULL,
+                dateopened TEXT NOT NULL,
+                dateclosure TEXT NOT NULL,
+                statusticket TEXT NOT NULL
+        )""")
+
+def migration_002_ticket_indexes(conn):
+    """
+    ADDS THE INDEXES USED BY THE TICKET LOOKUPS, SO THEY NO LONGER SCAN THE WHOLE TABLE.
+    - 'idx_ticket_ticketid' FOR LOOKUPS BY CHANNEL ID (OPEN OR CLOSED TICKETS).
+    - 'idx_ticket_opener_status' FOR "DOES THIS USER ALREADY HAVE AN OPEN TICKET?".
+    - 'idx_ticket_open' IS A PARTIAL INDEX THAT ONLY CONTAINS THE OPEN TICKETS: IT STAYS SMALL NO MATTER HOW MANY
+      CLOSED TICKETS PILE UP, AND IT ANSWERS EVERY "WHERE ticketid = ? AND statusticket = 'open'" QUERY.
+    """
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_ticketid ON ticket(ticketid)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_opener_status ON ticket(openerid, statusticket)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_open ON ticket(ticketid) WHERE statusticket = 'open'")
+
+def migration_003_epoch_dates(conn):
+    """
+    REPLACES THE TEXT DATES ('dateopened' AND 'dateclosure', STORED AS "DD/MM/YYYY HH:MM:SS") WITH INTEGER UNIX
+    TIMESTAMPS ('openedat' AND 'closedat'), WHICH SORT CORRECTLY AND CAN BE USED IN INDEXED RANGE QUERIES.
+
+    SQLITE CANNOT CHANGE THE TYPE OF A COLUMN, SO THE TABLE IS REBUILT: WE CREATE THE NEW TABLE, COPY (AND CONVERT)
+    EVERY ROW, DROP THE OLD TABLE AND RENAME THE NEW ONE. THE OLD TEXT DATES WERE WRITTEN IN LOCAL TIME, SO THEY ARE
+    CONVERTED WITH THE LOCAL TIMEZONE. 'closedat' IS NULL WHILE THE TICKET IS OPEN. THE COLUMN ORDER IS UNCHANGED.
+    """
+    conn.execute("""CREATE TABLE ticket_new(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticketname TEXT NOT NULL,
+                ticketid INT NOT NULL,
+                categoryname TEXT NOT NULL,
+                categoryid INT NOT NULL,
+                openername TEXT NOT NULL,
+                openerid INT NOT NULL,
+                closurename TEXT NOT NULL,
+                closureid INT NOT NULL,
+                openedat INTEGER NOT NULL,
+                closedat INTEGER,
+                statusticket TEXT NOT NULL
+        )""")
+
+    rows = conn.execute("SELECT id, ticketname, ticketid, categoryname, categoryid, openername, openerid, closurename, closureid, dateopened, dateclosure, statusticket FROM ticket")
+    conn.executemany("INSERT INTO ticket_new VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                     (row[:9] + (parse_display_date(row[9]) or 0, parse_display_date(row[10]), row[11]) for row in rows))
+
+    conn.execute("DROP TABLE ticket")
+    conn.execute("ALTER TABLE ticket_new RENAME TO ticket")
+
+    # THE INDEXES OF MIGRATION 2 WERE DROPPED WITH THE OLD TABLE, SO WE CREATE THEM AGAIN
+    migration_002_ticket_indexes(conn)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_openedat ON ticket(openedat)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ticket_closedat ON ticket(closedat)")
+
+def migration_004_transcript_archive(conn):
+    """
+    CREATES THE 'transcript' TABLE: THE INDEX OF THE TRANSCRIPTS SAVED IN THE LOCAL ARCHIVE (SEE 'transcript_archive.py').
+    ONE ROW PER TICKET, KEYED BY THE CHANNEL ID OF THE TICKET ('ticketid'), WITH THE NAME OF THE COMPRESSED FILE AND THE
+    NAMES OF THE ATTACHMENTS (JSON LIST) IT REFERENCES IN THE ATTACHMENT STORE.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS transcript(
+                ticketid INTEGER PRIMARY KEY,
+                ticketname TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                attachments TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                compressedsize INTEGER NOT NULL,
+                createdat INTEGER NOT NULL
+        )""")
+
+def migration_005_close_jobs(conn):
+    """
+    CREATES THE 'close_job' TABLE: THE PERSISTENT QUEUE OF THE TICKETS BEING CLOSED (SEE 'close_jobs.py').
+    'step' IS THE NEXT STEP TO RUN (lock, transcript, deliver, delete, done), 'status' IS pending, running, done OR
+    failed, AND 'nextrunat' IS THE TIMESTAMP AFTER WHICH A PENDING JOB CAN RUN (USED FOR THE RETRY BACKOFF AND THE
+    DELAY BEFORE THE CHANNEL IS DELETED). 'idx_close_job_due' ANSWERS "WHICH PENDING JOBS ARE DUE?" WITHOUT A SCAN.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS close_job(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticketid INTEGER NOT NULL,
+                guildid INTEGER NOT NULL,
+                closername TEXT NOT NULL,
+                closerid INTEGER NOT NULL,
+                reason TEXT NOT NULL,
+                step TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lasterror TEXT,
+                nextrunat INTEGER NOT NULL,
+                createdat INTEGER NOT NULL,
+                updatedat INTEGER NOT NULL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_close_job_due ON close_job(status, nextrunat)")
+
+def migration_006_transcript_deliveries(conn):
+    """
+    CREATES THE 'delivery' TABLE: THE RESULT OF THE DELIVERY OF EACH TRANSCRIPT TO EACH DESTINATION (SEE 'delivery.py').
+    WHEN A CLOSE JOB RETRIES ITS DELIVERY, THE DESTINATIONS THAT ALREADY RECEIVED THE TRANSCRIPT ARE SKIPPED.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS delivery(
+                ticketid INTEGER NOT NULL,
+                destination TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL,
+                lasterror TEXT,
+                updatedat INTEGER NOT NULL,
+                PRIMARY KEY (ticketid, destination)
+        )""")
+
+def migration_007_channel_pool(conn):
+    """
+    CREATES THE 'channel_pool' TABLE: THE HIDDEN CHANNELS READY TO BECOME TICKETS (SEE 'channel_pool.py'), SO THEY ARE
+    REUSED AFTER A RESTART.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS channel_pool(
+                channelid INTEGER PRIMARY KEY,
+                guildid INTEGER NOT NULL,
+                categoryid INTEGER NOT NULL,
+                createdat INTEGER NOT NULL
+        )""")
+
+def migration_008_bot_state(conn):
+    """
+    CREATES THE 'bot_state' TABLE: SMALL VALUES THE BOT REMEMBERS BETWEEN RESTARTS (E.G. THE HASH OF THE LAST COMMAND SYNC,
+    SEE 'command_sync.py').
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS bot_state(
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                updatedat INTEGER NOT NULL
+        )""")
+
+def migration_009_ticket_stats(conn):
+    """
+    CREATES THE ROLLUP TABLES OF THE TICKET STATISTICS (SEE 'ticket_stats.py'), EMPTY: 'Database' FILLS THEM FROM THE
+    EXISTING TICKETS AFTER THE MIGRATIONS (A MIGRATION MUST NOT CALL CODE THAT CAN CHANGE LATER).
+    'day' IS THE TIMESTAMP OF 00:00 (LOCAL TIME) OF THE DAY, OR 0 FOR THE ALL-TIME TOTALS; 'bucket' IS THE INDEX OF THE
+    UPPER BOUND OF A TIME TO CLOSE IN 'CLOSE_TIME_BUCKETS'.
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS ticket_stats_day(
+                day INTEGER NOT NULL,
+                categoryid INTEGER NOT NULL,
+                categoryname TEXT NOT NULL,
+                opened INTEGER NOT NULL DEFAULT 0,
+                closed INTEGER NOT NULL DEFAULT 0,
+                closeseconds INTEGER NOT NULL DEFAULT 0,
+                opennow INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, categoryid)
+        )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS ticket_stats_close_time(
+                day INTEGER NOT NULL,
+                categoryid INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                tickets INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, categoryid, bucket)
+        )""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS ticket_stats_closer(
+                closerid INTEGER PRIMARY KEY,
+                closername TEXT NOT NULL,
+                closed INTEGER NOT NULL DEFAULT 0,
+                closeseconds INTEGER NOT NULL DEFAULT 0
+        )""")
+
+def migration_010_message_search(conn):
+    """
+    CREATES THE 'message' TABLE (THE MESSAGES OF THE CLOSED TICKETS) AND ITS FULL-TEXT INDEX 'message_fts' (SEE
+    'message_search.py'). 'message_fts' IS AN FTS5 "EXTERNAL CONTENT" TABLE THAT READS THE TEXT FROM 'message': THE
+    TRIGGERS ADD AND REMOVE THE WORDS OF EVERY MESSAGE INSERTED OR DELETED, SO THE INDEX IS ALWAYS IN SYNC.
+    'unicode61 remove_diacritics 2' MAKES THE SEARCH IGNORE CASE AND ACCENTS ("perche" FINDS "perché"), AND THE PREFIX
+    INDEXES OF 2 AND 3 CHARACTERS MAKE THE PREFIX SEARCHES ("pay*") READ ONE LIST INSTEAD OF MERGING THE LISTS OF EVERY
+    WORD THAT STARTS WITH THE PREFIX (ABOUT 6 TIMES FASTER, FOR AN INDEX ABOUT 3 TIMES BIGGER).
+    """
+    conn.execute("""CREATE TABLE IF NOT EXISTS message(
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticketid INTEGER NOT NULL,
+                messageid INTEGER NOT NULL,
+                authorid INTEGER NOT NULL,
+                authorname TEXT NOT NULL,
+                createdat INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                attachments TEXT NOT NULL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_message_ticketid ON message(ticketid)")
+    conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS message_fts USING fts5(
+                content, authorname, attachments,
+                content='message', content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS message_fts_insert AFTER INSERT ON message BEGIN
+                INSERT INTO message_fts (rowid, content, authorname, attachments) VALUES (new.id, new.content, new.authorname, new.attachments);
+        END""")
+    conn.execute("""CREATE TRIGGER IF NOT EXISTS message_fts_delete AFTER DELETE ON message BEGIN
+                INSERT INTO message_fts (message_fts, rowid, content, authorname, attachments) VALUES ('delete', old.id, old.content, old.authorname, old.attachments);
+        END""")
+
+def migration_011_ticket_stats_all_time(conn):
+    """
+    MOVES THE ALL-TIME TOTALS OF THE STATISTICS FROM 'day' = 0 TO 'day' = -1: ON A UTC HOST 0 IS ALSO THE START OF
+    1970-01-01, THE DAY OF THE OLD TICKETS WHOSE TEXT DATE COULD NOT BE CONVERTED (SEE MIGRATION 3), SO THEY WERE COUNTED
+    TWICE. ADDS 'timedcloses' TO 'ticket_stats_closer' (THE CLOSES WHOSE TIME TO CLOSE IS KNOWN, THE DIVISOR OF THE
+    AVERAGE). THE OLD ROWS CANNOT BE SPLIT, SO THEY ARE DELETED: 'Database' REBUILDS THE EMPTY ROLLUPS AFTER THE MIGRATIONS.
+    """
+    conn.execute("ALTER TABLE ticket_stats_closer ADD COLUMN timedcloses INTEGER NOT NULL DEFAULT 0")
+    for table in ("ticket_stats_day", "ticket_stats_close_time", "ticket_stats_closer"):
+        conn.execute(f"DELETE FROM {table}")
+
+"""
+THE ORDERED LIST OF MIGRATIONS. THE POSITION IN THE LIST (STARTING FROM 1) IS THE SCHEMA VERSION.
+"""
+MIGRATIONS = [
+    migration_001_create_ticket,
+    migration_002_ticket_indexes,
+    migration_003_epoch_dates,
+    migration_004_transcript_archive,
+    migration_005_close_jobs,
+    migration_006_transcript_deliveries,
+    migration_007_channel_pool,
+    migration_008_bot_state,
+    migration_009_ticket_stats,
+    migration_010_message_search,
+    migration_011_ticket_stats_all_time,
+]
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def get_schema_version(conn):
+    """
+    RETURNS THE SCHEMA VERSION STORED IN THE DATABASE (0 FOR A DATABASE THAT NEVER RECEIVED A MIGRATION).
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn):
+    """
+    APPLIES, IN ORDER, ALL THE MIGRATIONS THAT ARE NEWER THAN THE SCHEMA VERSION OF THE DATABASE.
+
+    EACH MIGRATION RUNS IN ITS OWN TRANSACTION TOGETHER WITH THE VERSION UPDATE: IF IT FAILS, NOTHING IS CHANGED AND THE
+    NEXT START WILL TRY AGAIN FROM THE SAME VERSION.
+
+    ARGS:
+        CONN: AN OPEN SQLITE3 CONNECTION.
+
+    RETURNS:
+        LIST: THE NAMES OF THE MIGRATIONS THAT WERE APPLIED (EMPTY IF THE DATABASE WAS ALREADY UP TO DATE).
+    """
+    applied = []
+    current = get_schema_version(conn)
+
+    for version, migration in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+
+        with conn:
+            conn.execute("BEGIN") # Python does not open a transaction by itself before CREATE/ALTER statements
+            migration(conn)
+            conn.execute(f"PRAGMA user_version = {version:d}")
+
+        log.info("Applied database migration %d (%s)", version, migration.__name__)
+        applied.append(migration.__name__)
+
+    return applied
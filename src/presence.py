@@ -0,0 +1,86 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE PRESENCE OF THE BOT (THE "Playing ..." TEXT UNDER ITS NAME).
+
+THE PRESENCE SHOWS THE NUMBER OF OPEN TICKETS ('presence_text' IN config.py). A PRESENCE UPDATE IS A GATEWAY MESSAGE,
+AND DISCORD ALLOWS ONLY A FEW GATEWAY MESSAGES PER MINUTE (THE SAME BUDGET USED BY THE HEARTBEATS), SO THE PRESENCE IS
+NOT CHANGED ON A TIMER: IT IS CHANGED ONLY WHEN A TICKET IS OPENED OR CLOSED (THE INDEX OF THE OPEN TICKETS CALLS
+'PresenceUpdater.notify', SEE ticket_index.py), AT MOST ONCE EVERY 'presence_min_interval' SECONDS (A BURST OF OPENS
+BECOMES ONE UPDATE WITH THE FINAL COUNT), AND NEVER IF THE TEXT IS THE SAME ONE ALREADY SHOWN.
+"""
+
+import aiohttp # The connection errors raised while the gateway is reconnecting
+import asyncio # We use asyncio to run the update task
+import discord # We use discord to build the activity
+import logging # We use logging to report the failed updates
+
+from config import presence_min_interval, presence_text
+from database import db
+
+log = logging.getLogger(__name__)
+
+class PresenceUpdater:
+    """
+    KEEPS THE PRESENCE OF THE BOT IN SYNC WITH THE NUMBER OF OPEN TICKETS.
+
+    ATTRIBUTES:
+        MIN_INTERVAL: THE MINIMUM SECONDS BETWEEN TWO PRESENCE UPDATES.
+        TEXT: THE TEMPLATE OF THE PRESENCE ('{count}' IS REPLACED WITH THE NUMBER OF OPEN TICKETS).
+        SHOWN: THE TEXT CURRENTLY SHOWN (NONE BEFORE THE FIRST UPDATE).
+        UPDATES: THE NUMBER OF PRESENCE UPDATES SENT.
+
+    USAGE:
+        CALL 'presence.start(bot)' ONCE THE BOT IS READY.
+    """
+    def __init__(self, min_interval=presence_min_interval, text=presence_text):
+        self.min_interval = min_interval
+        self.text = text
+        self.shown = None
+        self.updates = 0
+        self.bot = None
+        self._changed = asyncio.Event()
+        self._task = None
+
+    def start(self, bot):
+        """
+        SHOWS THE CURRENT COUNT AND STARTS FOLLOWING THE OPEN TICKETS. CALLING IT MORE THAN ONCE DOES NOTHING.
+        """
+        if self._task is not None:
+            return
+        self.bot = bot
+        db.open_tickets.add_listener(self.notify)
+        self._changed.set()
+        self._task = asyncio.create_task(self._run(), name="presence")
+
+    def notify(self):
+        """
+        TELLS THE UPDATER THAT THE NUMBER OF OPEN TICKETS MAY HAVE CHANGED (CALLED BY THE INDEX OF THE OPEN TICKETS).
+        """
+        self._changed.set()
+
+    def render(self):
+        """
+        RETURNS THE TEXT OF THE PRESENCE FOR THE CURRENT NUMBER OF OPEN TICKETS.
+        """
+        return self.text.format(count=len(db.open_tickets))
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+
+            try:
+                text = self.render()
+                if text == self.shown:
+                    continue # Same text (e.g. a ticket opened and another one closed): nothing to send
+                await self.bot.change_presence(activity=discord.Game(text))
+                self.shown = text
+                self.updates += 1
+            except (aiohttp.ClientError, ConnectionError, discord.ConnectionClosed) as e:
+                log.warning("Unable to update the presence: %r", e)
+                self._changed.set() # Try again after the interval
+            except Exception:
+                log.exception("Unexpected error while updating the presence") # The updater keeps running (e.g. a wrong 'presence_text')
+
+            await asyncio.sleep(self.min_interval) # The changes in the meantime are sent together at the next update
+
+presence = PresenceUpdater() # The shared instance used by the bot
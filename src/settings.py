@@ -0,0 +1,124 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE SERVER SETTINGS OF THE BOT: THE IDS OF THE GUILD, OF THE ROLES, OF THE TICKET
+CATEGORIES AND OF THE CHANNELS, READ FROM config.py.
+
+THE IDS ARE SET IN ONE PLACE (config.py) INSTEAD OF BEING SCATTERED IN THE CODE, AND ARE KEPT IN A SINGLE IMMUTABLE
+OBJECT ('Settings') WITH FROZENSETS, SO A PERMISSION CHECK ONLY LOOKS UP THE ALLOWED ROLE IDS (SEE authorization.py)
+INSTEAD OF SCANNING A LIST OF ROLE OBJECTS:
+- THE SETTINGS ARE READ FROM config.py ONCE, WHEN THIS FILE IS IMPORTED.
+- 'settings.resolve(guild)' (IN on_ready) KEEPS ONLY THE IDS THAT EXIST IN THE GUILD AND WARNS ABOUT THE OTHER ONES.
+- 'settings.reload(guild)' (THE '/settings-reload' COMMAND) READS config.py AGAIN AND RESOLVES IT: THE NEW IDS ARE USED
+  IMMEDIATELY, WITHOUT A RESTART. ONLY THE VALUES OF THIS FILE ARE RELOADED (E.G. NOT THE NUMBER OF CLOSE JOB WORKERS).
+
+THE CODE ALWAYS READS 'settings.current', WHICH IS REPLACED AS A WHOLE BY A RELOAD: A CHECK NEVER SEES HALF OF THE OLD
+SETTINGS AND HALF OF THE NEW ONES.
+"""
+
+import dataclasses # We use dataclasses to build the immutable settings object
+import importlib # We use importlib to read config.py again
+import logging # We use logging to report the IDs that do not exist
+
+import config
+
+log = logging.getLogger(__name__)
+
+@dataclasses.dataclass(frozen=True)
+class Settings:
+    """
+    THE SERVER SETTINGS OF THE BOT.
+
+    ATTRIBUTES:
+        GUILD_ID: THE ID OF THE SERVER OF THE BOT.
+        STAFF_ROLE_IDS: THE ROLES THAT SEE AND MANAGE THE TICKETS.
+        ADMIN_ROLE_IDS: THE ROLES THAT CAN CONFIGURE THE BOT (/ticket-setup, /sync, /settings-reload).
+        TICKET_CATEGORIES: DICTIONARY DROPDOWN VALUE -> CATEGORY ID WHERE THE TICKETS OF THAT TYPE ARE OPENED.
+        TICKET_CATEGORY_IDS: ALL THE CATEGORIES THAT CONTAIN TICKETS (THE ONES ABOVE AND THE EXTRA ONES FOR /ticket-move).
+        TRANSCRIPT_CHANNEL_ID: THE CHANNEL THAT RECEIVES THE TRANSCRIPTS.
+        SETUP_CHANNEL_ID: THE CHANNEL WHERE /ticket-setup SENDS THE TICKET MENU.
+    """
+    guild_id: int
+    staff_role_ids: frozenset
+    admin_role_ids: frozenset
+    ticket_categories: dict
+    ticket_category_ids: frozenset
+    transcript_channel_id: int
+    setup_channel_id: int
+
+    @classmethod
+    def from_config(cls, module):
+        """
+        BUILDS THE SETTINGS FROM THE VALUES OF config.py.
+        """
+        return cls(
+            guild_id=module.guild_id,
+            staff_role_ids=frozenset(module.staff_role_ids),
+            admin_role_ids=frozenset(module.admin_role_ids),
+            ticket_categories=dict(module.ticket_categories),
+            ticket_category_ids=frozenset(module.ticket_categories.values()) | frozenset(module.extra_ticket_category_ids),
+            transcript_channel_id=module.transcript_channel_id,
+            setup_channel_id=module.setup_channel_id,
+        )
+
+    def resolve(self, guild):
+        """
+        RETURNS A COPY WITHOUT THE ROLES AND THE CATEGORIES THAT DO NOT EXIST IN THE GUILD (EACH ONE IS LOGGED).
+        """
+        def existing(ids, get, kind):
+            missing = {item_id for item_id in ids if get(item_id) is None}
+            for item_id in missing:
+                log.warning("The %s %d in config.py was not found in %s: it is ignored", kind, item_id, guild)
+            return ids - missing
+
+        for channel_id, kind in ((self.transcript_channel_id, "transcript channel"), (self.setup_channel_id, "setup channel")):
+            if guild.get_channel(channel_id) is None:
+                log.warning("The %s %d in config.py was not found in %s", kind, channel_id, guild)
+
+        ticket_category_ids = existing(self.ticket_category_ids, guild.get_channel, "ticket category")
+        return dataclasses.replace(
+            self,
+            staff_role_ids=existing(self.staff_role_ids, guild.get_role, "staff role"),
+            admin_role_ids=existing(self.admin_role_ids, guild.get_role, "admin role"),
+            ticket_categories={value: category_id for value, category_id in self.ticket_categories.items() if category_id in ticket_category_ids},
+            ticket_category_ids=ticket_category_ids,
+        )
+
+    def staff_roles(self, guild):
+        """
+        RETURNS THE STAFF ROLES OF THE GUILD (E.G. FOR THE PERMISSIONS OF A NEW TICKET).
+        """
+        return [role for role in map(guild.get_role, self.staff_role_ids) if role is not None]
+
+    def staff_mentions(self):
+        """
+        RETURNS THE TEXT THAT MENTIONS ALL THE STAFF ROLES.
+        """
+        return "".join(f"<@&{role_id}>" for role_id in sorted(self.staff_role_ids))
+
+class SettingsStore:
+    """
+    HOLDS THE CURRENT SETTINGS ('current') AND REPLACES THEM ON A RELOAD.
+    """
+    def __init__(self):
+        self.current = Settings.from_config(config)
+
+    def resolve(self, guild):
+        """
+        CHECKS THE CURRENT SETTINGS AGAINST THE GUILD (CALLED IN on_ready) AND RETURNS THEM.
+        """
+        self.current = self.current.resolve(guild)
+        return self.current
+
+    def reload(self, guild=None):
+        """
+        READS config.py AGAIN AND REPLACES THE CURRENT SETTINGS (RESOLVED AGAINST THE GUILD, IF GIVEN). IF config.py HAS AN
+        ERROR, THE EXCEPTION IS RAISED AND THE CURRENT SETTINGS ARE KEPT.
+
+        RETURNS:
+            SETTINGS: THE NEW SETTINGS.
+        """
+        loaded = Settings.from_config(importlib.reload(config))
+        self.current = loaded if guild is None else loaded.resolve(guild)
+        log.info("Settings reloaded: %s", self.current)
+        return self.current
+
+settings = SettingsStore() # The shared instance used by the whole bot
@@ -0,0 +1,100 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE IN-MEMORY INDEX OF THE OPEN TICKETS.
+
+QUESTIONS LIKE "IS THIS CHANNEL AN OPEN TICKET?" OR "DOES THIS USER ALREADY HAVE AN OPEN TICKET?" ARE ASKED BY MANY
+EVENTS AND BUTTONS. INSTEAD OF ASKING THE DATABASE EVERY TIME, WE KEEP THE OPEN TICKETS IN TWO DICTIONARIES, SO THE
+ANSWER IS IMMEDIATE AND DOES NOT TOUCH THE DISK.
+
+THE DATABASE IS STILL THE SOURCE OF TRUTH: THE INDEX IS LOADED FROM IT AT STARTUP AND IS UPDATED BY 'database.py' RIGHT
+AFTER EVERY WRITE (OPEN, CLOSE, RENAME, MOVE, DELETE), SO YOU SHOULD NEVER MODIFY IT DIRECTLY.
+
+OTHER PARTS OF THE BOT CAN REACT TO THE CHANGES OF THE SET OF OPEN TICKETS WITH 'add_listener' (E.G. THE PRESENCE, SEE
+presence.py): A LISTENER IS A FUNCTION WITHOUT ARGUMENTS, CALLED AFTER EVERY LOAD, ADD AND REMOVE. IT MUST BE FAST AND
+MUST NOT RAISE (IT RUNS INSIDE THE DATABASE WRITE).
+"""
+
+class TicketIndex:
+    """
+    THE OPEN TICKETS, INDEXED BY CHANNEL ID AND BY OPENER ID.
+
+    EACH TICKET IS A DICTIONARY WITH THE SAME KEYS AS THE COLUMNS OF THE 'ticket' TABLE (ticketname, ticketid, openerid, ...).
+
+    ATTRIBUTES:
+        BY_CHANNEL: DICTIONARY CHANNEL ID -> TICKET.
+        BY_OPENER: DICTIONARY OPENER ID -> CHANNEL ID.
+        LISTENERS: THE FUNCTIONS CALLED WHEN A TICKET IS OPENED OR CLOSED (OR THE INDEX IS RELOADED).
+    """
+    def __init__(self):
+        self.by_channel = {}
+        self.by_opener = {}
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.by_channel)
+
+    def __contains__(self, channel_id):
+        return channel_id in self.by_channel
+
+    def load(self, rows):
+        """
+        REPLACES THE WHOLE INDEX WITH THE GIVEN ROWS (THE OPEN TICKETS READ FROM THE DATABASE).
+        """
+        self.by_channel = {}
+        self.by_opener = {}
+        for row in rows:
+            self._index(row)
+        self._changed()
+
+    def get(self, channel_id):
+        """
+        RETURNS THE OPEN TICKET OF THE GIVEN CHANNEL, OR NONE IF THE CHANNEL IS NOT AN OPEN TICKET.
+        """
+        return self.by_channel.get(channel_id)
+
+    def get_by_opener(self, opener_id):
+        """
+        RETURNS THE OPEN TICKET OF THE GIVEN USER, OR NONE IF THE USER HAS NO OPEN TICKET.
+        """
+        channel_id = self.by_opener.get(opener_id)
+        return None if channel_id is None else self.by_channel.get(channel_id)
+
+    def add(self, row):
+        """
+        ADDS (OR REPLACES) AN OPEN TICKET.
+        """
+        self._index(row)
+        self._changed()
+
+    def update(self, channel_id, **fields):
+        """
+        CHANGES SOME FIELDS OF AN OPEN TICKET (E.G. update(id, ticketname="new-name")). DOES NOTHING IF IT IS NOT INDEXED.
+        """
+        ticket = self.by_channel.get(channel_id)
+        if ticket is not None:
+            ticket.update(fields)
+
+    def remove(self, channel_id):
+        """
+        REMOVES AN OPEN TICKET (BECAUSE IT WAS CLOSED OR ITS CHANNEL WAS DELETED) AND RETURNS IT (OR NONE).
+        """
+        ticket = self.by_channel.pop(channel_id, None)
+        if ticket is not None and self.by_opener.get(ticket["openerid"]) == channel_id:
+            del self.by_opener[ticket["openerid"]]
+        if ticket is not None:
+            self._changed()
+        return ticket
+
+    def add_listener(self, listener):
+        """
+        CALLS 'listener()' EVERY TIME A TICKET IS OPENED OR CLOSED (OR THE INDEX IS RELOADED).
+        """
+        self.listeners.append(listener)
+
+    def _index(self, row):
+        ticket = dict(row)
+        self.by_channel[ticket["ticketid"]] = ticket
+        self.by_opener[ticket["openerid"]] = ticket["ticketid"]
+
+    def _changed(self):
+        for listener in self.listeners:
+            listener()
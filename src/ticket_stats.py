@@ -0,0 +1,224 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE TICKET STATISTICS: ROLLUP TABLES UPDATED A LITTLE AT EVERY OPEN, CLOSE, MOVE AND
+DELETE, SO '/ticket-stats' NEVER READS THE 'ticket' TABLE.
+
+COUNTING "TICKETS OPENED PER CATEGORY" OR "MEDIAN TIME TO CLOSE" FROM THE 'ticket' TABLE MEANS READING EVERY TICKET EVER
+OPENED, AND THE TABLE ONLY GROWS. INSTEAD, EVERY WRITE OF A TICKET ALSO ADDS ITS CONTRIBUTION TO THE ROLLUPS, IN THE SAME
+TRANSACTION (SEE database.py), SO THEY CAN NEVER DISAGREE WITH THE TICKETS:
+- 'ticket_stats_day': PER DAY (00:00 LOCAL TIME, SEE timeutils.py) AND PER CATEGORY, THE TICKETS OPENED AND CLOSED AND
+  THE TOTAL SECONDS THEY TOOK TO BE CLOSED. THE ROWS WITH 'day' = 'ALL_TIME' (-1, NOT THE START OF ANY DAY) ARE THE
+  TOTALS OF ALL TIME, WITH THE NUMBER OF TICKETS OPEN NOW ('opennow'), SO THE TOTALS ARE ONE ROW PER CATEGORY HOWEVER
+  LONG THE HISTORY IS.
+- 'ticket_stats_close_time': THE SAME KEYS, WITH A HISTOGRAM OF THE TIMES TO CLOSE ('CLOSE_TIME_BUCKETS'). A MEDIAN CANNOT
+  BE UPDATED ONE TICKET AT A TIME, BUT A HISTOGRAM CAN, AND THE MEDIAN IS READ FROM IT (THE UPPER BOUND OF ITS BUCKET).
+- 'ticket_stats_closer': PER STAFF MEMBER, THE TICKETS THEY CLOSED AND, FOR THE 'timedcloses' OF THEM WHOSE OPENING
+  DATE IS KNOWN, THE TOTAL SECONDS THEY TOOK TO BE CLOSED.
+A TICKET COUNTS IN ITS CURRENT CATEGORY (A MOVE MOVES IT, WITH ITS OPEN DAY) AND ON THE DAY IT WAS OPENED OR CLOSED; A
+TICKET WHOSE CHANNEL WAS DELETED BY HAND IS NOT COUNTED (ITS ROW IS DELETED, SEE 'on_guild_channel_delete'). AN OLD
+TICKET WHOSE TEXT DATE COULD NOT BE CONVERTED HAS 'openedat' = 0 (SEE MIGRATION 3): IT COUNTS IN THE ALL-TIME TOTALS ONLY,
+AND ITS CLOSE HAS NO TIME TO CLOSE.
+
+THE FUNCTIONS TAKE AN OPEN CONNECTION AND DO NOT COMMIT: THEY ARE CALLED BY 'Database' INSIDE ITS TRANSACTIONS.
+'rebuild' RECOMPUTES EVERYTHING FROM THE 'ticket' TABLE (AT STARTUP IF THE ROLLUPS ARE EMPTY, AND
+'/ticket-stats-rebuild'); IT IS THE ONLY ONE THAT READS THE WHOLE TABLE.
+"""
+
+import bisect # We use bisect to find the bucket of a time to close
+import collections # We use collections.Counter to sum the rollups of the rebuild
+
+from timeutils import start_of_day # The day of a timestamp
+
+ALL_TIME = -1 # The 'day' of the all-time rows (a real day is the start of a known ticket date, never -1)
+CLOSE_TIME_BUCKETS = (300, 900, 1800, 3600, 7200, 14400, 28800, 43200, 86400, 172800, 259200, 604800, 1209600, 2592000) # Upper bounds in seconds (5m ... 30d, then "more")
+
+def close_time_bucket(seconds):
+    """
+    RETURNS THE BUCKET OF A TIME TO CLOSE (THE INDEX OF THE FIRST UPPER BOUND >= 'seconds', LEN(CLOSE_TIME_BUCKETS) IF NONE).
+    """
+    return bisect.bisect_left(CLOSE_TIME_BUCKETS, seconds)
+
+def format_duration(seconds):
+    """
+    RETURNS A SHORT READABLE DURATION ("45s", "20m", "3h", "2d 4h").
+    """
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m"
+    if seconds < 86400:
+        return f"{seconds // 3600}h" + (f" {seconds % 3600 // 60}m" if seconds % 3600 // 60 else "")
+    return f"{seconds // 86400}d" + (f" {seconds % 86400 // 3600}h" if seconds % 86400 // 3600 else "")
+
+def median_close_time(histogram):
+    """
+    RETURNS THE MEDIAN TIME TO CLOSE OF A HISTOGRAM (DICTIONARY BUCKET -> TICKETS) AS A READABLE UPPER BOUND
+    ("≤ 2h", "> 30d"), OR NONE IF IT IS EMPTY.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen * 2 >= total:
+            break
+    if bucket >= len(CLOSE_TIME_BUCKETS):
+        return f"> {format_duration(CLOSE_TIME_BUCKETS[-1])}"
+    return f"≤ {format_duration(CLOSE_TIME_BUCKETS[bucket])}"
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# INCREMENTAL UPDATES (INSIDE THE TRANSACTION OF THE TICKET WRITE)
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def _add_day(conn, day, categoryid, categoryname, opened=0, closed=0, closeseconds=0, opennow=0):
+    conn.execute("""INSERT INTO ticket_stats_day (day, categoryid, categoryname, opened, closed, closeseconds, opennow) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (day, categoryid) DO UPDATE SET categoryname = excluded.categoryname, opened = opened + excluded.opened,
+                    closed = closed + excluded.closed, closeseconds = closeseconds + excluded.closeseconds, opennow = opennow + excluded.opennow""",
+                 (day, categoryid, categoryname, opened, closed, closeseconds, opennow))
+
+def _add_close_time(conn, day, categoryid, bucket, tickets):
+    conn.execute("""INSERT INTO ticket_stats_close_time (day, categoryid, bucket, tickets) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (day, categoryid, bucket) DO UPDATE SET tickets = tickets + excluded.tickets""",
+                 (day, categoryid, bucket, tickets))
+
+def _days(timestamp):
+    """
+    RETURNS THE DAYS A DATE COUNTS IN: ITS OWN DAY AND 'ALL_TIME', OR ONLY 'ALL_TIME' IF THE DATE IS UNKNOWN (0).
+    """
+    return (start_of_day(timestamp), ALL_TIME) if timestamp else (ALL_TIME,)
+
+def record_open(conn, categoryid, categoryname, openedat):
+    """
+    COUNTS A NEW OPEN TICKET.
+    """
+    for day in _days(openedat):
+        _add_day(conn, day, categoryid, categoryname, opened=1, opennow=int(day == ALL_TIME))
+
+def record_close(conn, categoryid, categoryname, closerid, closername, openedat, closedat):
+    """
+    COUNTS A TICKET THAT WAS CLOSED, WITH ITS TIME TO CLOSE ('closedat' - 'openedat') IF ITS OPENING DATE IS KNOWN.
+    """
+    seconds = max(closedat - openedat, 0) if openedat else 0
+    for day in _days(closedat):
+        _add_day(conn, day, categoryid, categoryname, closed=1, closeseconds=seconds, opennow=-int(day == ALL_TIME))
+        if openedat:
+            _add_close_time(conn, day, categoryid, close_time_bucket(seconds), 1)
+    conn.execute("""INSERT INTO ticket_stats_closer (closerid, closername, closed, timedcloses, closeseconds) VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT (closerid) DO UPDATE SET closername = excluded.closername, closed = closed + 1,
+                    timedcloses = timedcloses + excluded.timedcloses, closeseconds = closeseconds + excluded.closeseconds""",
+                 (closerid, closername, int(bool(openedat)), seconds))
+
+def record_move(conn, oldcategoryid, oldcategoryname, categoryid, categoryname, openedat):
+    """
+    MOVES AN OPEN TICKET (AND THE DAY IT WAS OPENED) FROM ONE CATEGORY TO ANOTHER.
+    """
+    for day in _days(openedat):
+        opennow = int(day == ALL_TIME)
+        _add_day(conn, day, oldcategoryid, oldcategoryname, opened=-1, opennow=-opennow)
+        _add_day(conn, day, categoryid, categoryname, opened=1, opennow=opennow)
+
+def record_delete(conn, categoryid, categoryname, openedat):
+    """
+    FORGETS AN OPEN TICKET WHOSE ROW WAS DELETED (ITS CHANNEL WAS DELETED BY HAND).
+    """
+    for day in _days(openedat):
+        _add_day(conn, day, categoryid, categoryname, opened=-1, opennow=-int(day == ALL_TIME))
+
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+# REBUILD AND READ
+# ──────────────────────────────────────────────────────────────────────────────────────────────────────
+
+def rebuild(conn):
+    """
+    RECOMPUTES ALL THE ROLLUPS FROM THE 'ticket' TABLE (ONE PASS OVER THE ROWS, SUMMED IN MEMORY: THE SUMS ARE AS SMALL AS
+    THE ROLLUPS). USE IT IF THE TICKETS WERE CHANGED OUTSIDE THE BOT.
+
+    RETURNS:
+        INT: THE NUMBER OF TICKETS COUNTED.
+    """
+    days = collections.defaultdict(collections.Counter) # (day, categoryid) -> opened, closed, closeseconds, opennow
+    names = {} # categoryid -> categoryname (the most recent ticket wins)
+    close_times = collections.Counter() # (day, categoryid, bucket) -> tickets
+    closers = collections.defaultdict(collections.Counter) # closerid -> closed, timedcloses, closeseconds
+    closer_names = {}
+    tickets = 0
+
+    for row in conn.execute("""SELECT categoryid, categoryname, closureid, closurename, openedat, closedat, statusticket FROM ticket ORDER BY id"""):
+        tickets += 1
+        categoryid, openedat, closedat = row["categoryid"], row["openedat"], row["closedat"]
+        names[categoryid] = row["categoryname"]
+        for day in _days(openedat):
+            days[day, categoryid]["opened"] += 1
+        if row["statusticket"] == "open":
+            days[ALL_TIME, categoryid]["opennow"] += 1
+            continue
+        if closedat is None: # A closed ticket whose old text date could not be converted (see migration 3)
+            continue
+
+        seconds = max(closedat - openedat, 0) if openedat else 0
+        for day in _days(closedat):
+            days[day, categoryid]["closed"] += 1
+            days[day, categoryid]["closeseconds"] += seconds
+            if openedat:
+                close_times[day, categoryid, close_time_bucket(seconds)] += 1
+        closers[row["closureid"]]["closed"] += 1
+        closers[row["closureid"]]["timedcloses"] += int(bool(openedat))
+        closers[row["closureid"]]["closeseconds"] += seconds
+        closer_names[row["closureid"]] = row["closurename"]
+
+    for table in ("ticket_stats_day", "ticket_stats_close_time", "ticket_stats_closer"):
+        conn.execute(f"DELETE FROM {table}")
+    conn.executemany("""INSERT INTO ticket_stats_day (day, categoryid, categoryname, opened, closed, closeseconds, opennow) VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                     [(day, categoryid, names[categoryid], sums["opened"], sums["closed"], sums["closeseconds"], sums["opennow"]) for (day, categoryid), sums in days.items()])
+    conn.executemany("""INSERT INTO ticket_stats_close_time (day, categoryid, bucket, tickets) VALUES (?, ?, ?, ?)""",
+                     [key + (count,) for key, count in close_times.items()])
+    conn.executemany("""INSERT INTO ticket_stats_closer (closerid, closername, closed, timedcloses, closeseconds) VALUES (?, ?, ?, ?, ?)""",
+                     [(closerid, closer_names[closerid], sums["closed"], sums["timedcloses"], sums["closeseconds"]) for closerid, sums in closers.items()])
+    return tickets
+
+def _period(conn, since):
+    """
+    RETURNS THE CATEGORIES AND THE TOTAL OF THE DAYS FROM 'since' (ALL TIME IF 'since' IS 'ALL_TIME'), AS DICTIONARIES
+    WITH 'name', 'opened', 'closed', 'opennow' (ALL TIME ONLY) AND 'median' (THE MEDIAN TIME TO CLOSE, OR NONE).
+    """
+    days = "day = ?" if since == ALL_TIME else "day >= ?"
+    params = (since,)
+    categories = {}
+    for row in conn.execute(f"""SELECT categoryid, MAX(categoryname), SUM(opened), SUM(closed), SUM(opennow) FROM ticket_stats_day WHERE {days} GROUP BY categoryid""", params):
+        categories[row[0]] = {"name": row[1], "opened": row[2], "closed": row[3], "opennow": row[4], "histogram": collections.Counter()}
+
+    total = {"name": "Total", "opened": 0, "closed": 0, "opennow": 0, "histogram": collections.Counter()}
+    for row in conn.execute(f"""SELECT categoryid, bucket, SUM(tickets) FROM ticket_stats_close_time WHERE {days} GROUP BY categoryid, bucket""", params):
+        if row[0] in categories:
+            categories[row[0]]["histogram"][row[1]] += row[2]
+        total["histogram"][row[1]] += row[2]
+
+    for category in categories.values():
+        for key in ("opened", "closed", "opennow"):
+            total[key] += category[key]
+    for stats in (*categories.values(), total):
+        stats["median"] = median_close_time(stats.pop("histogram"))
+    return categories, total
+
+def read(conn, since, closers=10):
+    """
+    READS THE STATISTICS SHOWN BY '/ticket-stats' FROM THE ROLLUPS ONLY: THE ROWS READ DEPEND ON THE NUMBER OF DAYS,
+    CATEGORIES AND STAFF MEMBERS, NEVER ON THE NUMBER OF TICKETS.
+
+    ARGS:
+        SINCE: THE FIRST DAY OF THE PERIOD (A 'start_of_day' TIMESTAMP).
+        CLOSERS: HOW MANY STAFF MEMBERS ARE RETURNED (THE ONES WHO CLOSED THE MOST TICKETS).
+
+    RETURNS:
+        DICT: 'period' AND 'all_time' (EACH A DICTIONARY WITH 'categories', CATEGORY ID -> STATS, AND 'total'), AND
+        'closers' (ROWS WITH 'closerid', 'closername', 'closed', 'timedcloses' AND 'closeseconds').
+    """
+    stats = {}
+    for key, start in (("period", since), ("all_time", ALL_TIME)):
+        categories, total = _period(conn, start)
+        stats[key] = {"categories": categories, "total": total}
+    for categoryid, category in stats["period"]["categories"].items(): # The current name (a category can be renamed)
+        category["name"] = stats["all_time"]["categories"].get(categoryid, category)["name"]
+    stats["closers"] = conn.execute("""SELECT closerid, closername, closed, timedcloses, closeseconds FROM ticket_stats_closer ORDER BY closed DESC, closerid LIMIT ?""", (closers,)).fetchall()
+    return stats
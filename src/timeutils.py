@@ -0,0 +1,50 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE HELPERS USED TO STORE AND SHOW DATES.
+
+THE DATABASE STORES EVERY DATE AS A UNIX TIMESTAMP (AN INTEGER: THE SECONDS SINCE 01/01/1970 UTC). INTEGERS SORT
+CORRECTLY, CAN BE INDEXED AND CAN BE COMPARED DIRECTLY IN SQL (E.G. "closedat >= ?"), WHICH IS NOT TRUE FOR TEXT DATES
+LIKE "31/12/2024 10:00:00". THE HUMAN-READABLE FORMAT IS PRODUCED ONLY WHEN A DATE IS SHOWN (EMBEDS, MESSAGES, ...).
+"""
+
+import time # We use time to get the current timestamp
+from datetime import datetime # We use datetime to convert timestamps into readable dates
+
+DISPLAY_FORMAT = "%d/%m/%Y %H:%M:%S" # The format used to show dates (the same format the bot always used)
+
+def now_timestamp():
+    """
+    RETURNS THE CURRENT DATE AS A UNIX TIMESTAMP (INT).
+    """
+    return int(time.time())
+
+def parse_display_date(text):
+    """
+    CONVERTS A DATE WRITTEN IN 'DISPLAY_FORMAT' (LOCAL TIME) INTO A UNIX TIMESTAMP.
+
+    RETURNS:
+        INT OR NONE: THE TIMESTAMP, OR NONE IF THE TEXT IS EMPTY OR NOT A VALID DATE.
+    """
+    try:
+        return int(datetime.strptime(text, DISPLAY_FORMAT).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+def format_timestamp(timestamp, fallback="-"):
+    """
+    CONVERTS A UNIX TIMESTAMP INTO A READABLE DATE (LOCAL TIME). USE IT ONLY TO SHOW DATES, NEVER TO STORE THEM.
+
+    ARGS:
+        TIMESTAMP: THE UNIX TIMESTAMP (OR NONE).
+        FALLBACK: THE TEXT RETURNED WHEN THERE IS NO DATE (E.G. A TICKET THAT IS STILL OPEN HAS NO CLOSING DATE).
+    """
+    if timestamp is None:
+        return fallback
+    return datetime.fromtimestamp(timestamp).strftime(DISPLAY_FORMAT)
+
+def start_of_day(timestamp=None):
+    """
+    RETURNS THE TIMESTAMP OF 00:00 (LOCAL TIME) OF THE DAY THAT CONTAINS 'timestamp' (DEFAULT: NOW).
+    USED TO GROUP THE TICKET STATISTICS BY DAY (SEE ticket_stats.py).
+    """
+    day = datetime.fromtimestamp(now_timestamp() if timestamp is None else timestamp)
+    return int(day.replace(hour=0, minute=0, second=0, microsecond=0).timestamp())
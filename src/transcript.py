@@ -0,0 +1,217 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE TRANSCRIPT PIPELINE USED WHEN A TICKET IS CLOSED.
+
+THE HISTORY OF THE TICKET CHANNEL IS FETCHED FROM DISCORD EXACTLY ONCE ('fetch_history'). THE SAME LIST OF MESSAGES IS
+THEN USED BOTH TO RENDER THE HTML WITH CHAT_EXPORTER ('render_transcript') AND TO EMBED THE ATTACHMENTS, SO A LONG
+TICKET COSTS ONE PAGINATED HISTORY FETCH INSTEAD OF THREE.
+
+THE ATTACHMENTS ARE DOWNLOADED CONCURRENTLY ('download_attachments'), SO CLOSING A TICKET WITH MANY FILES TAKES ABOUT AS
+LONG AS ITS SLOWEST FILE, NOT THE SUM OF ALL OF THEM. THEY ARE STREAMED TO THE ON-DISK ATTACHMENT STORE (SEE
+'attachment_store.py'), SO THE MEMORY USED BY A CLOSE DOES NOT DEPEND ON THE SIZE OF THE FILES.
+
+THE HTML REWRITE THAT ADDS THE ATTACHMENTS TO THE TRANSCRIPT IS CPU-BOUND, SO IT RUNS IN A POOL OF WORKER PROCESSES
+('rewrite_transcript', SEE 'html_rewrite.py'): THE EVENT LOOP ONLY SENDS THE TRANSCRIPT BYTES AND WAITS FOR THE RESULT.
+"""
+
+import aiohttp
+import asyncio # We use asyncio to download the attachments concurrently
+import html # We use html to escape the names and links of the attachments
+import logging # We use logging to report how many history pages were fetched
+import multiprocessing # We use multiprocessing to choose how the worker processes are started
+import time # We use time to measure how long the downloads take
+import chat_exporter # We use chat_exporter to render the messages as HTML
+import discord # We use discord for the default upload limit
+
+from attachment_store import BUNDLE_ATTACHMENTS_FOLDER, FileTooLarge, store
+from concurrent.futures import ProcessPoolExecutor # The pool of processes used for the HTML rewrite
+from config import transcript_download_concurrency, transcript_download_timeout, transcript_max_file_bytes, transcript_max_total_bytes, transcript_process_workers
+from html_rewrite import inject_attachments # The CPU-bound rewrite executed in the worker processes
+
+log = logging.getLogger(__name__)
+
+HISTORY_PAGE_SIZE = 100 # Discord returns at most 100 messages per history request
+HTML_RESERVE = 1024 * 1024 # Bytes of the upload limit left for the compressed HTML of the bundle (see 'download_attachments')
+
+class History:
+    """
+    THE MESSAGES OF A CHANNEL, FETCHED ONCE.
+
+    ATTRIBUTES:
+        MESSAGES: THE MESSAGES, NEWEST FIRST (THE ORDER RETURNED BY DISCORD).
+        PAGES: THE NUMBER OF HISTORY REQUESTS (API PAGES) THAT WERE NEEDED TO FETCH THEM.
+    """
+    def __init__(self, messages, pages):
+        self.messages = messages
+        self.pages = pages
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+async def fetch_history(channel):
+    """
+    FETCHES THE WHOLE HISTORY OF A CHANNEL WITH A SINGLE PAGINATED WALK.
+
+    DISCORD.PY REQUESTS THE HISTORY IN PAGES OF 100 MESSAGES AND STOPS AT THE FIRST PAGE THAT RETURNS LESS THAN 100,
+    SO THE NUMBER OF PAGES IS (MESSAGES // 100) + 1.
+
+    ARGS:
+        CHANNEL: THE DISCORD CHANNEL OBJECT FOR THE TICKET.
+
+    RETURNS:
+        HISTORY: THE MESSAGES (NEWEST FIRST) AND THE NUMBER OF API PAGES FETCHED.
+    """
+    messages = [message async for message in channel.history(limit=None)]
+    history = History(messages, len(messages) // HISTORY_PAGE_SIZE + 1)
+    log.info("Fetched the history of #%s: %d messages in %d API pages", channel.name, len(history), history.pages)
+    return history
+
+async def render_transcript(channel, history):
+    """
+    RENDERS THE HTML TRANSCRIPT OF THE CHANNEL FROM AN ALREADY FETCHED HISTORY (NO OTHER HISTORY REQUEST IS MADE).
+
+    ARGS:
+        CHANNEL: THE DISCORD CHANNEL OBJECT FOR THE TICKET.
+        HISTORY: THE HISTORY RETURNED BY 'fetch_history'.
+
+    RETURNS:
+        STR OR NONE: THE HTML TRANSCRIPT, OR NONE IF THE CHANNEL HAS NO MESSAGES.
+    """
+    if not history.messages:
+        return None # chat_exporter would fetch the history by itself if it received an empty list
+
+    # chat_exporter reverses the list in place (newest first -> oldest first), so we give it a copy
+    return await chat_exporter.raw_export(channel, list(history.messages), military_time=True)
+
+async def download_attachments(history, upload_limit=discord.utils.DEFAULT_FILE_SIZE_LIMIT_BYTES, concurrency=transcript_download_concurrency,
+                               max_file_bytes=transcript_max_file_bytes, max_total_bytes=transcript_max_total_bytes, timeout=transcript_download_timeout):
+    """
+    DOWNLOADS THE ATTACHMENTS OF ALL THE MESSAGES CONCURRENTLY INTO THE ATTACHMENT STORE.
+
+    AT MOST 'concurrency' FILES ARE DOWNLOADED AT THE SAME TIME. BEFORE STARTING, THE FILES ARE CHOSEN FROM THE OLDEST
+    MESSAGE TO THE NEWEST UNTIL 'max_total_bytes' IS REACHED; FILES BIGGER THAN 'max_file_bytes', FILES OVER THE TOTAL
+    BUDGET AND FILES THAT FAIL OR TAKE MORE THAN 'timeout' SECONDS ARE NOT DOWNLOADED (THEIR VALUE IS NONE), SO THE
+    TRANSCRIPT CAN FALL BACK TO A PLAIN LINK.
+    BY DEFAULT (NONE IN config.py) THE LIMITS FOLLOW THE UPLOAD LIMIT OF THE SERVER: A FILE THAT COULD NOT BE SENT IN THE
+    BUNDLE IS NOT DOWNLOADED, AND 'HTML_RESERVE' BYTES OF THE BUNDLE ARE LEFT FOR THE HTML.
+
+    ARGS:
+        HISTORY: THE HISTORY RETURNED BY 'fetch_history'.
+        UPLOAD_LIMIT: THE UPLOAD LIMIT OF THE SERVER IN BYTES ('guild.filesize_limit').
+
+    RETURNS:
+        DICT: ATTACHMENT ID -> NAME OF THE FILE IN THE ATTACHMENT STORE (OR NONE IF THE FILE WAS NOT DOWNLOADED).
+    """
+    max_file_bytes = upload_limit - HTML_RESERVE if max_file_bytes is None else max_file_bytes
+    max_total_bytes = upload_limit - HTML_RESERVE if max_total_bytes is None else max_total_bytes
+    results = {}
+    selected = []
+    budget = max_total_bytes
+
+    for message in reversed(history.messages): # Oldest first
+        for attachment in message.attachments:
+            results[attachment.id] = None
+            if attachment.size <= max_file_bytes and attachment.size <= budget:
+                budget -= attachment.size
+                selected.append(attachment)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def download(session, attachment):
+        async with semaphore:
+            try:
+                results[attachment.id] = await store.save(session, attachment.url, attachment.filename, max_file_bytes, timeout)
+            except (aiohttp.ClientError, asyncio.TimeoutError, FileTooLarge, OSError) as e:
+                log.warning("Unable to download the attachment %s (%s), it will be linked instead", attachment.filename, str(e) or "timeout")
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(download(session, attachment) for attachment in selected))
+    log.info("Downloaded %d/%d attachments (%d bytes) in %.2fs", sum(data is not None for data in results.values()), len(results),
+             max_total_bytes - budget, time.perf_counter() - start)
+    return results
+
+def attachment_markup(history, files):
+    """
+    BUILDS THE HTML OF THE ATTACHMENTS OF EACH MESSAGE: AN IMAGE, A VIDEO OR A DOWNLOAD LINK POINTING TO 'attachments/<name>'
+    (THE FOLDER OF THE TRANSCRIPT BUNDLE), OR A PLAIN LINK TO THE ORIGINAL FILE IF IT WAS NOT DOWNLOADED.
+
+    ARGS:
+        HISTORY: THE HISTORY RETURNED BY 'fetch_history'.
+        FILES: THE STORED ATTACHMENTS, RETURNED BY 'download_attachments'.
+
+    RETURNS:
+        DICT: MESSAGE ID (STR) -> HTML OF ITS ATTACHMENTS (ONLY MESSAGES WITH ATTACHMENTS ARE INCLUDED).
+    """
+    markup = {}
+    for message in history:
+        tags = []
+        for attachment in message.attachments:
+            filename = html.escape(attachment.filename)
+            name = files.get(attachment.id)
+            if name is None:
+                # Not downloaded (too large, over the budget or failed): link the original file
+                tags.append(f'<a href="{html.escape(attachment.url)}" target="_blank" style="display:block; margin-top:10px; font-weight:bold; color:#00b0f4;">📂 {filename} (Link)</a>')
+                continue
+
+            content_type = html.escape(attachment.content_type or "application/octet-stream")
+            file_path = f"{BUNDLE_ATTACHMENTS_FOLDER}/{name}"
+            file_type = content_type.split('/')[0]
+
+            if file_type == 'image':
+                tags.append(f'<img src="{file_path}" alt="{filename}" style="max-width:100%; display:block; margin-top:10px; border-radius:5px;"/>')
+            elif file_type == 'video':
+                tags.append(f'<video controls style="max-width:100%; display:block; margin-top:10px; border-radius:5px;"><source src="{file_path}" type="{content_type}"/></video>')
+            else:
+                tags.append(f'<a href="{file_path}" download="{filename}" style="display:block; margin-top:10px; font-weight:bold; color:#00b0f4;">📂 {filename} (Download)</a>')
+
+        if tags:
+            markup[str(message.id)] = "".join(tags)
+    return markup
+
+_pool = None
+
+def get_process_pool():
+    """
+    RETURNS THE POOL OF WORKER PROCESSES (CREATED THE FIRST TIME IT IS NEEDED).
+
+    THE WORKERS ARE STARTED WITH 'spawn' (A FRESH INTERPRETER) INSTEAD OF 'fork': FORKING A PROCESS THAT IS RUNNING
+    THREADS (THE DATABASE THREAD, THE EVENT LOOP, ...) CAN LEAVE LOCKS HELD FOREVER IN THE CHILD.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=transcript_process_workers, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def shutdown_process_pool():
+    """
+    STOPS THE WORKER PROCESSES (IF THEY WERE STARTED).
+    """
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+async def rewrite_transcript(transcript, markup):
+    """
+    ADDS THE ATTACHMENTS MARKUP TO THE TRANSCRIPT IN A WORKER PROCESS, WITHOUT BLOCKING THE EVENT LOOP.
+
+    ARGS:
+        TRANSCRIPT: THE HTML TRANSCRIPT (STR OR UTF-8 BYTES).
+        MARKUP: THE DICTIONARY RETURNED BY 'attachment_markup'.
+
+    RETURNS:
+        BYTES: THE MODIFIED HTML TRANSCRIPT (UTF-8).
+    """
+    if isinstance(transcript, str):
+        transcript = transcript.encode("utf-8")
+    if not markup:
+        return transcript # Nothing to add: no need to parse the document at all
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    result = await loop.run_in_executor(get_process_pool(), inject_attachments, transcript, markup)
+    log.info("Rewrote a %d bytes transcript (%d messages with attachments) in %.2fs", len(transcript), len(markup), time.perf_counter() - start)
+    return result
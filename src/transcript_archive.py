@@ -0,0 +1,93 @@
+"""
+IN THIS PYTHON FILE WE DEFINE THE LOCAL ARCHIVE OF THE TRANSCRIPTS.
+
+WHEN A TICKET IS CLOSED ITS CHANNEL IS DELETED, SO THE TRANSCRIPT CANNOT BE GENERATED AGAIN LATER. FOR THIS REASON EVERY
+TRANSCRIPT IS ALSO SAVED ON DISK, COMPRESSED WITH GZIP ('data/transcripts/<ticket id>.html.gz'), AND INDEXED IN THE
+'transcript' TABLE OF THE DATABASE (SEE 'database.py'). THE ATTACHMENTS ARE NOT COPIED: THE ARCHIVED HTML REFERENCES THE
+FILES OF THE ATTACHMENT STORE (SEE 'attachment_store.py'), SO A TRANSCRIPT BUNDLE CAN BE REBUILT AT ANY TIME FROM ONE
+COMPRESSED FILE AND THE STORE ('/ticket-transcript').
+
+ALL THE FUNCTIONS OF THIS FILE DO BLOCKING FILE I/O: CALL THEM WITH 'asyncio.to_thread'.
+"""
+
+import gzip # We use gzip to compress the transcripts
+import os # We use os to build paths and move files
+import tempfile # We use tempfile to write into a temporary file before moving it to its final name
+
+from attachment_store import store # The attachments referenced by the archived transcripts
+from config import transcript_archive_path
+
+COMPRESS_LEVEL = 6 # The gzip level: HTML compresses ~10x already at 6, higher levels are much slower for little gain
+
+class TranscriptArchive:
+    """
+    A FOLDER OF GZIP-COMPRESSED TRANSCRIPTS, ONE FILE PER TICKET.
+
+    ATTRIBUTES:
+        ROOT: THE FOLDER WHERE THE TRANSCRIPTS ARE SAVED.
+    """
+    def __init__(self, root=transcript_archive_path):
+        self.root = root
+
+    def path(self, filename):
+        return os.path.join(self.root, filename)
+
+    def save(self, ticket_id, html):
+        """
+        COMPRESSES AND SAVES THE TRANSCRIPT OF A TICKET (AN EXISTING TRANSCRIPT OF THE SAME TICKET IS REPLACED).
+        THE FILE IS WRITTEN UNDER A TEMPORARY NAME AND THEN RENAMED, SO A HALF-WRITTEN TRANSCRIPT IS NEVER ARCHIVED.
+
+        ARGS:
+            TICKET_ID: THE CHANNEL ID OF THE TICKET.
+            HTML: THE TRANSCRIPT HTML (STR OR UTF-8 BYTES).
+
+        RETURNS:
+            TUPLE: (FILENAME, COMPRESSED SIZE IN BYTES).
+        """
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+
+        os.makedirs(self.root, exist_ok=True)
+        filename = f"{ticket_id}.html.gz"
+        with tempfile.NamedTemporaryFile(dir=self.root, suffix=".tmp", delete=False) as temp:
+            try:
+                with gzip.GzipFile(filename=f"{ticket_id}.html", mode="wb", fileobj=temp, compresslevel=COMPRESS_LEVEL) as compressed:
+                    compressed.write(html)
+            except BaseException:
+                temp.close()
+                os.remove(temp.name)
+                raise
+
+        os.replace(temp.name, self.path(filename))
+        return filename, os.path.getsize(self.path(filename))
+
+    def open(self, filename):
+        """
+        OPENS AN ARCHIVED TRANSCRIPT FOR READING. THE RETURNED FILE OBJECT DECOMPRESSES THE HTML WHILE IT IS READ, SO THE
+        WHOLE TRANSCRIPT IS NEVER LOADED IN MEMORY.
+
+        RETURNS:
+            FILE: A BINARY FILE OBJECT (USE IT IN A 'with' BLOCK).
+        """
+        return gzip.open(self.path(filename), "rb")
+
+    def exists(self, filename):
+        return os.path.exists(self.path(filename))
+
+    def build_bundle(self, archived, output_path, max_bytes=None):
+        """
+        WRITES THE ZIP BUNDLE OF AN ARCHIVED TRANSCRIPT (SEE 'AttachmentStore.build_bundle'). THE HTML IS DECOMPRESSED
+        WHILE IT IS COPIED INTO THE ZIP, SO IT IS NEVER LOADED IN MEMORY.
+
+        ARGS:
+            ARCHIVED: THE ROW RETURNED BY 'db.get_transcript'.
+            OUTPUT_PATH: THE PATH OF THE ZIP FILE TO CREATE.
+            MAX_BYTES: THE UPLOAD LIMIT OF THE DESTINATION (NONE: NO LIMIT).
+
+        RETURNS:
+            STR: OUTPUT_PATH.
+        """
+        with self.open(archived["filename"]) as html:
+            return store.build_bundle(html, archived["attachments"], output_path, max_bytes)
+
+archive = TranscriptArchive() # The shared instance used by the transcript pipeline